@@ -0,0 +1,133 @@
+"""
+Build bipsea as one self-contained zipapp for hosts without pip (`make zipapp`).
+
+    python scripts/build-zipapp.py build [-o dist/bipsea.pyz] [-p INTERPRETER]
+    python scripts/build-zipapp.py bench [-o dist/bipsea.pyz] [-r RUNS]
+
+The archive holds bipsea, its wordlists, and its pure-Python dependencies minus
+their tests. Every module is precompiled to an unchecked-hash .pyc beside its
+source, where zipimport looks first, so nothing compiles at startup; entries are
+stored, not deflated, so nothing inflates either. bipsea's lazy imports mean each
+subcommand loads only the modules it uses. The bytecode is for the building
+Python; other versions fall back to the sources. Not built with -O: bipsea's key
+validation uses asserts.
+
+Nothing in the archive needs site-packages, so `python3 -IS bipsea.pyz` (isolated,
+no site) skips site's startup work and any stray installed packages; on Linux
+`-p "/usr/bin/python3 -IS"` bakes that into the shebang. bench times cold starts
+of the zipapp, with and without -IS, against the installed `bipsea` script.
+"""
+
+import argparse
+import importlib.util
+import py_compile
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipapp
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+TARGET = ROOT / "dist" / "bipsea.pyz"
+INTERPRETER = "/usr/bin/env python3"
+# bipsea first, from this checkout; then its runtime dependencies (six is ecdsa's)
+PACKAGES = ("bipsea", "click", "base58", "ecdsa", "six")
+EXCLUDE = re.compile(r"(^|/)(__pycache__|tests?)/|(^|/)(test_\w+|testing)\.py$")
+MAIN = """from bipsea.bipsea import cli
+
+cli(prog_name="bipsea")
+"""
+MASTER = (
+    "xprv9s21ZrQH143K2LBWUUQRFXhucrQqBpKdRRxNVq2zBqsx8HVqFk2uYo8kmbaLLHRdqtQpUm98uKf"
+    "u3vca1LqdGhUtyoFnCNkfmXRyPXLjbKb"
+)
+COMMANDS = (
+    ("--version",),
+    ("mnemonic",),
+    ("derive", "-a", "base85", "-x", MASTER),
+)
+
+
+def build(target: Path = TARGET, interpreter: str = INTERPRETER) -> Path:
+    with tempfile.TemporaryDirectory() as staging:
+        staging = Path(staging)
+        for name in PACKAGES:
+            copy(name, staging)
+        (staging / "__main__.py").write_text(MAIN)
+        for source in staging.rglob("*.py"):
+            py_compile.compile(
+                str(source),
+                cfile=str(source) + "c",
+                dfile=str(source.relative_to(staging)),
+                doraise=True,
+                invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+            )
+        target.parent.mkdir(parents=True, exist_ok=True)
+        zipapp.create_archive(
+            staging, target, interpreter=interpreter, compressed=False
+        )
+
+    return target
+
+
+def copy(name: str, staging: Path):
+    if name == "bipsea":
+        source = ROOT / "src" / "bipsea"
+    else:
+        spec = importlib.util.find_spec(name)
+        if spec is None:
+            raise SystemExit(f"{name} is not installed; try `make install-dist`")
+        if spec.submodule_search_locations:
+            source = Path(spec.origin).parent
+        else:
+            shutil.copy2(spec.origin, staging)
+            return
+    for path in source.rglob("*"):
+        relative = f"{name}/{path.relative_to(source).as_posix()}"
+        if path.is_file() and not EXCLUDE.search(relative):
+            (staging / relative).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(path, staging / relative)
+
+
+def bench(target: Path = TARGET, runs: int = 10):
+    installed = shutil.which("bipsea")
+    if installed is None:
+        raise SystemExit("bipsea is not installed; try `make install-dist`")
+    ways = {
+        "installed": [installed],
+        "zipapp": [sys.executable, str(target)],
+        "zipapp -IS": [sys.executable, "-IS", str(target)],
+    }
+    print(f"{'command':<24}" + "".join(f"{w + ' ms':>14}" for w in ways))
+    for command in COMMANDS:
+        medians = [median_ms(prefix + list(command), runs) for prefix in ways.values()]
+        label = " ".join(command)[:23]
+        print(f"{label:<24}" + "".join(f"{m:>14.1f}" for m in medians))
+
+
+def median_ms(args, runs: int) -> float:
+    subprocess.run(args, check=True, capture_output=True)  # warm the page cache
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+
+    return statistics.median(times) * 1e3
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("action", choices=["build", "bench"])
+    parser.add_argument("-o", "--output", type=Path, default=TARGET)
+    parser.add_argument("-p", "--python", default=INTERPRETER, help="for the shebang")
+    parser.add_argument("-r", "--runs", type=int, default=10)
+    arguments = parser.parse_args()
+    if arguments.action == "build":
+        print(build(arguments.output, arguments.python))
+    else:
+        bench(arguments.output, arguments.runs)
@@ -0,0 +1,282 @@
+"""
+Bitcoin addresses for public keys, in bulk.
+
+    p2pkh   legacy: base58check of HASH160(key)                  1...
+    p2wpkh  segwit v0: bech32 of HASH160(key) (BIP-173)          bc1q...
+    p2tr    taproot, key path only: bech32m of the x-only key
+            tweaked by BIP-341's TapTweak (BIP-86, BIP-350)      bc1p...
+
+to_addresses() streams addresses for ExtendedKeys (private ones are neutered),
+SEC1 compressed keys, or affine points, CHUNK_SIZE at a time: one hash160_many()
+per chunk for p2pkh and p2wpkh, and for p2tr the tweaks t * G come from the
+generator table and share one modular inversion per chunk.
+"""
+
+import hashlib
+import logging
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import base58
+
+from . import secp256k1
+from .bip32 import (
+    CKDpriv,
+    derive_public_children,
+    derive_public_points,
+    to_derivation_path,
+    to_public_keys,
+)
+from .bip32types import TYPED_CHILD_KEY_COUNT, DerivationPath, ExtendedKey
+from .hash160 import hash160_many
+from .util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+ADDRESS_TYPES = ("p2pkh", "p2wpkh", "p2tr")
+CHUNK_SIZE = 256
+P2PKH_VERSIONS = {"mainnet": b"\x00", "testnet": b"\x6f"}
+HRPS = {"mainnet": "bc", "testnet": "tb"}
+# https://github.com/bitcoin/bips/blob/master/bip-0350.mediawiki
+BECH32_CONSTANTS = {0: 1, 1: 0x2BC830A3}  # witness version -> bech32, bech32m
+CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+GENERATOR = (0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3)
+TAP_TWEAK = hashlib.sha256(b"TapTweak").digest() * 2  # BIP-340 tagged hash prefix
+
+Key = Union[ExtendedKey, bytes, secp256k1.Affine]
+
+
+def to_addresses(
+    keys: Iterable[Key],
+    address_type: str = "p2wpkh",
+    network: str = "mainnet",
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[str]:
+    """one address per key, in order; network is mainnet or testnet"""
+    if address_type not in ADDRESS_TYPES:
+        raise ValueError(f"Expected one of {ADDRESS_TYPES}, got {address_type}")
+    if network not in HRPS:
+        raise ValueError(f"Expected mainnet or testnet, got {network}")
+    keys = iter(keys)
+    while True:
+        chunk = list(islice(keys, chunk_size))
+        if not chunk:
+            return
+        if address_type == "p2pkh":
+            version = P2PKH_VERSIONS[network]
+            for key_hash in hash160_many(_public_keys(chunk)):
+                yield base58.b58encode_check(version + key_hash).decode("ascii")
+        elif address_type == "p2wpkh":
+            for key_hash in hash160_many(_public_keys(chunk)):
+                yield segwit_address(HRPS[network], 0, key_hash)
+        else:
+            for output_key in taproot_output_keys(_points(chunk)):
+                yield segwit_address(HRPS[network], 1, output_key)
+
+
+def derive_addresses(
+    parent: ExtendedKey,
+    child_numbers: Iterable[int],
+    address_type: str = "p2wpkh",
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[str]:
+    """addresses of parent's (unhardened) children, on parent's network; the
+    children are never serialized, just their points"""
+    child_numbers = iter(child_numbers)
+    network = parent.get_network()
+    while True:
+        chunk = list(islice(child_numbers, chunk_size))
+        if not chunk:
+            return
+        points = derive_public_points(parent, chunk)
+        yield from to_addresses(points, address_type, network, chunk_size)
+
+
+def descend(key: ExtendedKey, path: Union[DerivationPath, str]) -> ExtendedKey:
+    """the key at path below key, which is m (not necessarily a master);
+    hardened segments need a private key"""
+    for index in to_derivation_path(path):
+        if key.is_private():
+            depth = int.from_bytes(key.depth, "big") + 1
+            if depth > 255:
+                raise ValueError("Cannot derive past depth 255")
+            key = CKDpriv(
+                key.data, key.chain_code, index, depth.to_bytes(1, "big"), key.version
+            )
+        else:
+            (key,) = derive_public_children(key, [index])
+
+    return key
+
+
+def parse_range(text: str) -> range:
+    """inclusive FIRST-LAST (or a single index) of unhardened child numbers"""
+    first, _, last = text.partition("-")
+    try:
+        first, last = int(first), int(last or first)
+    except ValueError:
+        raise ValueError(f"Expected FIRST-LAST, got {text}")
+    if not 0 <= first <= last < TYPED_CHILD_KEY_COUNT:
+        raise ValueError(f"Expected 0 <= FIRST <= LAST < 2**31, got {text}")
+
+    return range(first, last + 1)
+
+
+def to_programs(
+    points: Sequence[secp256k1.Affine], address_type: str = "p2wpkh"
+) -> List[bytes]:
+    """what each point's address encodes: HASH160 of the compressed key for p2pkh
+    and p2wpkh, the 32-byte output key for p2tr"""
+    if address_type == "p2tr":
+        return taproot_output_keys(points)
+
+    return hash160_many(secp256k1.compress(point) for point in points)
+
+
+def taproot_output_keys(points: Sequence[secp256k1.Affine]) -> List[bytes]:
+    """BIP-86 x-only output keys: P + int(TapTweak(x(P))) * G, with P the point of
+    even y at x; one inversion in all"""
+    tweaked = []
+    for x, y in points:
+        internal = x.to_bytes(32, "big")
+        tweak = int.from_bytes(hashlib.sha256(TAP_TWEAK + internal).digest(), "big")
+        if tweak >= secp256k1.N:
+            raise ValueError(f"Invalid tweak for key {internal.hex()}")
+        even = (x, y if y % 2 == 0 else secp256k1.P - y)
+        tweaked.append(secp256k1.add_affine(secp256k1.multiply_g(tweak), even))
+    output_keys = []
+    for point in secp256k1.to_affine_many(tweaked):
+        if point is None:
+            raise ValueError("Tweaked key is the point at infinity")
+        output_keys.append(point[0].to_bytes(32, "big"))
+
+    return output_keys
+
+
+def segwit_address(hrp: str, witness_version: int, program: bytes) -> str:
+    """bech32 (v0) or bech32m (v1+) address"""
+    data = [witness_version] + _to_5_bits(program)
+    checksum = _polymod(data + [0] * 6, _hrp_state(hrp))
+    checksum ^= BECH32_CONSTANTS[min(witness_version, 1)]
+    data += [(checksum >> 5 * (5 - i)) & 31 for i in range(6)]
+
+    return hrp + "1" + "".join(CHARSET[d] for d in data)
+
+
+def decode_address(address: str) -> Tuple[str, str, bytes]:
+    """(address_type, network, program) where program is the key hash for p2pkh
+    and p2wpkh, the x-only output key for p2tr"""
+    lowered = address.lower()
+    hrp, separator, data = lowered.rpartition("1")
+    if separator and hrp in HRPS.values():
+        if address not in (lowered, address.upper()):
+            raise ValueError(f"Mixed case address: {address}")
+        if any(c not in CHARSET for c in data) or len(data) < 7:
+            raise ValueError(f"Invalid bech32 address: {address}")
+        values = [CHARSET.index(c) for c in data]
+        witness_version = values[0]
+        constant = BECH32_CONSTANTS.get(min(witness_version, 1))
+        if _polymod(values, _hrp_state(hrp)) != constant:
+            raise ValueError(f"Invalid checksum: {address}")
+        program = _from_5_bits(values[1:-6])
+        types = {(0, 20): "p2wpkh", (1, 32): "p2tr"}
+        if program is None or (witness_version, len(program)) not in types:
+            raise ValueError(f"Unsupported witness program: {address}")
+        network = next(n for n, h in HRPS.items() if h == hrp)
+        return types[(witness_version, len(program))], network, program
+
+    raw = base58.b58decode_check(address)
+    networks = {version: network for network, version in P2PKH_VERSIONS.items()}
+    if len(raw) != 21 or raw[:1] not in networks:
+        raise ValueError(f"Unsupported address: {address}")
+
+    return "p2pkh", networks[raw[:1]], raw[1:]
+
+
+def _public_keys(chunk: Sequence[Key]) -> List[bytes]:
+    """SEC1 compressed keys; private ExtendedKeys are neutered in one batch"""
+    keys = [_compressed(key) for key in chunk]
+    private = [i for i, key in enumerate(keys) if key is None]
+    for i, public in zip(private, to_public_keys(chunk[i].data for i in private)):
+        keys[i] = public
+
+    return keys
+
+
+def _points(chunk: Sequence[Key]) -> List[secp256k1.Affine]:
+    """affine points; private ExtendedKeys share one inversion"""
+    # bulk keys are mostly seen once, so keep them out of decompress's cache
+    lift = secp256k1.lift
+    points = []
+    private = []
+    for key in chunk:
+        if isinstance(key, tuple) and not isinstance(key, ExtendedKey):
+            points.append(key)
+        elif isinstance(key, ExtendedKey) and key.is_private():
+            private.append(len(points))
+            points.append(None)
+        else:
+            points.append(lift(_compressed(key)))
+    products = [
+        secp256k1.multiply_g(int.from_bytes(chunk[i].data, "big")) for i in private
+    ]
+    for i, point in zip(private, secp256k1.to_affine_many(products)):
+        points[i] = point
+
+    return points
+
+
+def _compressed(key: Key) -> Optional[bytes]:
+    """None for private ExtendedKeys"""
+    if isinstance(key, ExtendedKey):
+        return None if key.is_private() else key.data
+    if isinstance(key, tuple):
+        return secp256k1.compress(key)
+    key = bytes(key)
+    if len(key) != 33 or key[0] not in (2, 3):
+        raise ValueError(f"Expected a 33-byte compressed key, got {key.hex()}")
+
+    return key
+
+
+def _to_5_bits(data: bytes) -> List[int]:
+    """regroup bytes into 5-bit values, zero padded"""
+    value = int.from_bytes(data, "big")
+    bits = 8 * len(data)
+    padding = -bits % 5
+    value <<= padding
+    count = (bits + padding) // 5
+
+    return [(value >> 5 * (count - 1 - i)) & 31 for i in range(count)]
+
+
+def _from_5_bits(values: List[int]) -> Optional[bytes]:
+    """inverse of _to_5_bits; None if the padding is more than 4 bits or nonzero"""
+    value = 0
+    for v in values:
+        value = value << 5 | v
+    bits = 5 * len(values)
+    padding = bits % 8
+    if padding > 4 or value & ((1 << padding) - 1):
+        return None
+
+    return (value >> padding).to_bytes(bits // 8, "big")
+
+
+@lru_cache(maxsize=None)
+def _hrp_state(hrp: str) -> int:
+    """checksum state after the expanded human-readable part"""
+    return _polymod([ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp], 1)
+
+
+def _polymod(values: Iterable[int], state: int) -> int:
+    for value in values:
+        top = state >> 25
+        state = (state & 0x1FFFFFF) << 5 ^ value
+        for i in range(5):
+            if (top >> i) & 1:
+                state ^= GENERATOR[i]
+
+    return state
@@ -0,0 +1,238 @@
+"""
+On-disk address -> (account, chain, index) index for watch-only reverse lookup.
+
+    header   MAGIC (6 bytes), FORMAT_VERSION (1), KINDS index (1)
+    segment  account, chain, start, stop (4 bytes each), count (8),
+             then count records sorted by key: key (20), child index (4)
+
+Keys are HASH160(public key) (kind hash160: p2pkh and p2wpkh addresses, public
+keys), or the first 20 bytes of the BIP-86 output key (kind p2tr). Integers are
+big-endian. extend() appends one sorted segment per SEGMENT_SIZE children of
+the range it derives, picking up where the last extend() of that (account,
+chain) stopped, so gap limits can grow without rewriting the file. AddressIndex
+mmaps the file and binary searches each segment: O(log n) per segment, and
+compact() merges each (account, chain) into a single segment.
+
+extend() compacts by itself once the file holds more than MAX_EXTRA_SEGMENTS
+segments beyond one per (account, chain). Each segment adds a binary search
+(about 3us) to every lookup, while compacting rewrites the file at about 2us a
+record, a fraction of the 500us it took to derive it; so many small extend()s
+(a growing gap limit, say) cost lookups at most MAX_EXTRA_SEGMENTS searches
+more, and a file no more than one rewrite per MAX_EXTRA_SEGMENTS extends.
+"""
+
+import heapq
+import logging
+import mmap
+import os
+import struct
+from collections import namedtuple
+from typing import Iterator, List, Optional, Tuple, Union
+
+from . import secp256k1
+from .addresses import decode_address, descend, taproot_output_keys, to_programs
+from .bip32 import derive_public_points
+from .bip32types import TYPED_CHILD_KEY_COUNT, ExtendedKey
+from .hash160 import hash160
+from .util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+MAGIC = b"BIPIDX"
+FORMAT_VERSION = 1
+KINDS = ("hash160", "p2tr")
+HEADER_SIZE = len(MAGIC) + 2
+SEGMENT = struct.Struct(">IIIIQ")  # account, chain, start, stop, count
+KEY_SIZE = 20
+RECORD = struct.Struct(f">{KEY_SIZE}sI")  # key, child index
+SEGMENT_SIZE = 2**20  # records, bounds extend()'s memory
+CHUNK_SIZE = 1024  # children derived at a time
+MAX_EXTRA_SEGMENTS = 16  # before extend() compacts
+READ_SIZE = 4096  # records a segment, bounds compact()'s memory
+
+Location = namedtuple("Location", ["account", "chain", "index"])
+Segment = namedtuple(
+    "Segment", ["account", "chain", "start", "stop", "count", "offset"]
+)
+
+
+def create(path: str, kind: str = "hash160"):
+    """a new, empty index; raises FileExistsError rather than overwrite one"""
+    if kind not in KINDS:
+        raise ValueError(f"Expected one of {KINDS}, got {kind}")
+    with open(path, "xb") as file:
+        file.write(MAGIC + bytes([FORMAT_VERSION, KINDS.index(kind)]))
+
+
+def extend(
+    path: str,
+    account_key: ExtendedKey,
+    account: int,
+    chain: int,
+    stop: int,
+    max_extra_segments: Optional[int] = MAX_EXTRA_SEGMENTS,
+) -> int:
+    """index children [s, stop) of account_key's chain, where s is where this
+    (account, chain) left off (0 the first time); returns the number added.
+    Compacts once there are more than max_extra_segments extra segments (see
+    AddressIndex.extra_segments), or never for None."""
+    if not (0 <= account < 2**32 and 0 <= chain < TYPED_CHILD_KEY_COUNT):
+        raise ValueError(f"Invalid account or chain: {account}, {chain}")
+    if stop > TYPED_CHILD_KEY_COUNT:
+        raise ValueError(f"Expected stop <= 2**31, got {stop}")
+    with AddressIndex(path) as index:
+        kind = index.kind
+        start = index.stop(account, chain)
+    parent = descend(account_key, f"m/{chain}")
+    added = 0
+    with open(path, "ab") as file:
+        for first in range(start, stop, SEGMENT_SIZE):
+            last = min(first + SEGMENT_SIZE, stop)
+            records = []
+            for chunk in range(first, last, CHUNK_SIZE):
+                numbers = range(chunk, min(chunk + CHUNK_SIZE, last))
+                keys = to_keys(derive_public_points(parent, numbers), kind)
+                records.extend(zip(keys, numbers))
+            records.sort()
+            file.write(SEGMENT.pack(account, chain, first, last, len(records)))
+            file.write(b"".join(RECORD.pack(*record) for record in records))
+            added += len(records)
+    if added and max_extra_segments is not None:
+        with AddressIndex(path) as index:
+            extra = index.extra_segments()
+        if extra > max_extra_segments:
+            compact(path)
+
+    return added
+
+
+def compact(path: str):
+    """rewrite the index with one segment per (account, chain), merging the
+    segments READ_SIZE records at a time rather than in memory"""
+    with AddressIndex(path) as index:
+        groups = {}
+        for segment in index.segments:
+            groups.setdefault((segment.account, segment.chain), []).append(segment)
+        temporary = f"{path}.compact"
+        with open(temporary, "wb") as file:
+            file.write(index.header)
+            for (account, chain), segments in groups.items():
+                start = min(s.start for s in segments)
+                stop = max(s.stop for s in segments)
+                count = sum(s.count for s in segments)
+                file.write(SEGMENT.pack(account, chain, start, stop, count))
+                merged = heapq.merge(*(index.records(s) for s in segments))
+                file.writelines(RECORD.pack(key, child) for key, child in merged)
+    os.replace(temporary, path)
+
+
+def to_keys(points: List[secp256k1.Affine], kind: str) -> List[bytes]:
+    address_type = "p2tr" if kind == "p2tr" else "p2wpkh"
+    return [program[:KEY_SIZE] for program in to_programs(points, address_type)]
+
+
+class AddressIndex:
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.header = self._map[:HEADER_SIZE]
+            if len(self.header) < HEADER_SIZE or not self.header.startswith(MAGIC):
+                raise ValueError(f"Not a bipsea address index: {path}")
+            version, kind = self.header[-2:]
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported address index version: {version}")
+            if kind >= len(KINDS):
+                raise ValueError(f"Unsupported address index kind: {kind}")
+            self.kind = KINDS[kind]
+            self.segments = list(self._read_segments(path))
+        except ValueError:
+            self.close()
+            raise
+
+    def __len__(self) -> int:
+        return sum(s.count for s in self.segments)
+
+    def extra_segments(self) -> int:
+        """segments beyond one per (account, chain): what compact() removes"""
+        groups = {(s.account, s.chain) for s in self.segments}
+        return len(self.segments) - len(groups)
+
+    def stop(self, account: int, chain: int) -> int:
+        """first child number not yet indexed for (account, chain)"""
+        stops = [
+            s.stop for s in self.segments if (s.account, s.chain) == (account, chain)
+        ]
+        return max(stops, default=0)
+
+    def lookup(self, query: Union[str, bytes]) -> List[Location]:
+        """where an address, or a compressed public key (bytes or 66 hex digits),
+        was derived from; [] if nowhere we indexed"""
+        return self.find(self.key(query))
+
+    def key(self, query: Union[str, bytes]) -> bytes:
+        if isinstance(query, str) and len(query) != 66:
+            address_type, _, program = decode_address(query)
+            if (address_type == "p2tr") != (self.kind == "p2tr"):
+                raise ValueError(f"A {self.kind} index has no {address_type} addresses")
+            return program[:KEY_SIZE]
+        public_key = bytes.fromhex(query) if isinstance(query, str) else bytes(query)
+        point = secp256k1.decompress(public_key)
+        if self.kind == "p2tr":
+            return taproot_output_keys([point])[0][:KEY_SIZE]
+
+        return hash160(public_key)
+
+    def find(self, key: bytes) -> List[Location]:
+        """every location of key, by binary search in each segment"""
+        found = []
+        data, size = self._map, RECORD.size
+        for segment in self.segments:
+            low, high = 0, segment.count
+            while low < high:
+                middle = (low + high) // 2
+                start = segment.offset + middle * size
+                end = start + KEY_SIZE
+                if data[start:end] < key:
+                    low = middle + 1
+                else:
+                    high = middle
+            for position in range(low, segment.count):
+                start = segment.offset + position * size
+                end = start + size
+                record_key, child = RECORD.unpack(data[start:end])
+                if record_key != key:
+                    break
+                found.append(Location(segment.account, segment.chain, child))
+
+        return found
+
+    def records(self, segment: Segment) -> Iterator[Tuple[bytes, int]]:
+        """(key, child index) pairs of one segment, in key order, READ_SIZE
+        records at a time"""
+        for first in range(0, segment.count, READ_SIZE):
+            start = segment.offset + first * RECORD.size
+            end = start + min(READ_SIZE, segment.count - first) * RECORD.size
+            yield from RECORD.iter_unpack(self._map[start:end])
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self) -> "AddressIndex":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read_segments(self, path: str) -> Iterator[Segment]:
+        offset = HEADER_SIZE
+        while offset < len(self._map):
+            end = offset + SEGMENT.size
+            if end > len(self._map):
+                raise ValueError(f"Truncated address index: {path}")
+            account, chain, start, stop, count = SEGMENT.unpack(self._map[offset:end])
+            offset = end + count * RECORD.size
+            if offset > len(self._map):
+                raise ValueError(f"Truncated address index: {path}")
+            yield Segment(account, chain, start, stop, count, end)
@@ -0,0 +1,163 @@
+"""
+asyncio API: the CPU-bound steps (PBKDF2 seeds, EC derivations, BIP-85 applications)
+run in an executor so they don't block the event loop.
+
+    async with Runner.processes(4) as runner:
+        seed = await runner.to_master_seed(words, passphrase)
+        secret = await runner.derive_application(master, "base85", 20)
+
+PBKDF2 (hashlib) releases the GIL, so threads scale seeds; the EC arithmetic is pure
+Python and holds the GIL, so derivations scale with processes. At most `limit` calls
+are in the executor at once; others wait, cancellably, on a semaphore. Cancelling a
+call that has reached the executor discards its result when it finishes.
+The module-level functions share a Runner on the loop's default executor.
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Optional, TypeVar, Union
+
+from .bip32 import to_master_key as to_master_key_sync
+from .bip32types import DerivationPath, ExtendedKey
+from .bip39 import to_master_seed as to_master_seed_sync
+from .bip85 import apply_85 as apply_85_sync
+from .bip85 import derive as derive_sync
+from .bip85 import derive_application as derive_application_sync
+from .util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+T = TypeVar("T")
+
+
+class Runner:
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        limit: Optional[int] = None,
+        owns_executor: bool = False,
+    ):
+        """executor None is the loop's default executor; limit None is no limit"""
+        if limit is not None and limit < 1:
+            raise ValueError(f"Expected limit >= 1, got {limit}")
+        self.executor = executor
+        self.limit = limit
+        self.owns_executor = owns_executor
+        # per event loop, created inside it (semaphores bind to their loop)
+        self._semaphore = None
+        self._loop = None
+
+    @classmethod
+    def threads(cls, workers: Optional[int] = None) -> "Runner":
+        workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        return cls(ThreadPoolExecutor(workers), limit=workers, owns_executor=True)
+
+    @classmethod
+    def processes(cls, workers: Optional[int] = None) -> "Runner":
+        workers = workers or os.cpu_count() or 1
+        return cls(ProcessPoolExecutor(workers), limit=workers, owns_executor=True)
+
+    async def run(self, function: Callable[..., T], *args, **kwargs) -> T:
+        """function(*args, **kwargs) in the executor; must be picklable (e.g.
+        module-level) for process executors"""
+        loop = asyncio.get_running_loop()
+        call = partial(function, *args, **kwargs)
+        if self.limit is None:
+            return await loop.run_in_executor(self.executor, call)
+        if self._loop is not loop:
+            self._semaphore, self._loop = asyncio.Semaphore(self.limit), loop
+        async with self._semaphore:
+            return await loop.run_in_executor(self.executor, call)
+
+    async def to_master_seed(self, mnemonic: List[str], passphrase: str) -> bytes:
+        return await self.run(to_master_seed_sync, mnemonic, passphrase)
+
+    async def to_master_key(
+        self, seed: bytes, mainnet: bool = True, private: bool = True
+    ) -> ExtendedKey:
+        return await self.run(to_master_key_sync, seed, mainnet, private)
+
+    async def derive(
+        self,
+        master: ExtendedKey,
+        path: Union[DerivationPath, str],
+        private: bool = True,
+    ) -> ExtendedKey:
+        return await self.run(derive_sync, master, path, private)
+
+    async def apply_85(
+        self, derived_key: ExtendedKey, path: Union[DerivationPath, str]
+    ) -> Dict[str, Union[bytes, str]]:
+        return await self.run(apply_85_sync, derived_key, path)
+
+    async def derive_application(
+        self,
+        master: ExtendedKey,
+        application: str,
+        number: Optional[int] = None,
+        index: int = 0,
+        special: int = 10,
+        language: str = "english",
+    ) -> str:
+        """what `bipsea derive` prints, in one executor call"""
+        return await self.run(
+            derive_application_sync,
+            master,
+            application,
+            number,
+            index,
+            special,
+            language,
+        )
+
+    def close(self, wait: bool = True):
+        """shuts down the executor if this runner created it"""
+        if self.owns_executor:
+            self.executor.shutdown(wait=wait)
+
+    async def __aenter__(self) -> "Runner":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+DEFAULT_RUNNER = Runner()
+
+
+async def to_master_seed(mnemonic: List[str], passphrase: str) -> bytes:
+    return await DEFAULT_RUNNER.to_master_seed(mnemonic, passphrase)
+
+
+async def to_master_key(
+    seed: bytes, mainnet: bool = True, private: bool = True
+) -> ExtendedKey:
+    return await DEFAULT_RUNNER.to_master_key(seed, mainnet, private)
+
+
+async def derive(
+    master: ExtendedKey, path: Union[DerivationPath, str], private: bool = True
+) -> ExtendedKey:
+    return await DEFAULT_RUNNER.derive(master, path, private)
+
+
+async def apply_85(
+    derived_key: ExtendedKey, path: Union[DerivationPath, str]
+) -> Dict[str, Union[bytes, str]]:
+    return await DEFAULT_RUNNER.apply_85(derived_key, path)
+
+
+async def derive_application(
+    master: ExtendedKey,
+    application: str,
+    number: Optional[int] = None,
+    index: int = 0,
+    special: int = 10,
+    language: str = "english",
+) -> str:
+    return await DEFAULT_RUNNER.derive_application(
+        master, application, number, index, special, language
+    )
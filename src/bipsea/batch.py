@@ -0,0 +1,144 @@
+"""
+Stream many records through one CLI command (`--batch`).
+
+Each input line is either a plain value for the command's main input (e.g. a mnemonic)
+or a JSON object keyed by the command's long option names ({"xprv": ..., "index": 3}).
+Command-line options are the defaults for every record. Each output line is a JSON
+object with the input line number and either the result or an error, so one bad
+record doesn't stop the stream. Results are keyed by the next command's input, so
+batches chain: `bipsea validate --batch | bipsea xprv --batch | bipsea derive ...`.
+Records that arrive with an "error" pass through untouched.
+"""
+
+import json
+import logging
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import click
+
+from .serve import Warm
+from .util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+BATCH_OPTIONS = ("batch", "workers")  # not settable per record
+CHUNK_SIZE = 256  # records per worker task, to amortize pickling
+IN_FLIGHT = 4  # chunks queued per worker; bounds memory for endless streams
+
+# kwargs is None if and only if error is not None
+Record = namedtuple("Record", ["line", "kwargs", "error"])
+
+_process_warm = None
+
+
+def read_records(
+    lines: Iterable[str], command: click.Command, main: str, defaults: Dict
+) -> Iterator[Record]:
+    """main is the long option name that plain (non-JSON) lines fill in"""
+    params = option_params(command)
+    for number, line in enumerate(lines, 1):
+        text = line.strip()
+        if not text:
+            continue
+        try:
+            record = json.loads(text) if text.startswith("{") else {main: text}
+            if not isinstance(record, dict):
+                raise ValueError("Expected a JSON object")
+            number = record.pop("line", number)
+            if "error" in record:
+                yield Record(number, None, record["error"])
+                continue
+            kwargs = dict(defaults)
+            for key, value in record.items():
+                if key not in params:
+                    raise ValueError(f"Unexpected field {key!r}")
+                param = params[key]
+                kwargs[param.name] = (
+                    None if value is None else param.type.convert(value, param, None)
+                )
+            yield Record(number, kwargs, None)
+        except (click.ClickException, ValueError) as error:
+            yield Record(number, None, describe(error))
+
+
+def process_records(
+    function: Callable[..., object],
+    records: Iterable[Record],
+    output: str,
+    warm: Optional[Warm] = None,
+    workers: int = 0,
+) -> Iterator[Dict]:
+    """function(**kwargs, warm=warm) for each record, in input order; workers > 0
+    spreads chunks of records across that many processes (function must be
+    importable at module level)"""
+    chunks = chunked(records, CHUNK_SIZE)
+    if not workers:
+        warm = Warm() if warm is None else warm
+        for chunk in chunks:
+            yield from process_chunk(function, output, chunk, warm)
+        return
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(process_chunk, function, output, chunk))
+            if len(pending) >= workers * IN_FLIGHT:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def process_chunk(
+    function: Callable[..., object],
+    output: str,
+    chunk: List[Record],
+    warm: Optional[Warm] = None,
+) -> List[Dict]:
+    global _process_warm
+    if warm is None:
+        if _process_warm is None:
+            _process_warm = Warm()
+        warm = _process_warm
+
+    results = []
+    for record in chunk:
+        if record.error is not None:
+            results.append({"line": record.line, "error": record.error})
+            continue
+        try:
+            value = function(**record.kwargs, warm=warm)
+            if not isinstance(value, dict):  # e.g. derive --format json
+                value = str(value)
+            results.append({"line": record.line, output: value})
+        except (click.ClickException, ValueError) as error:
+            results.append({"line": record.line, "error": describe(error)})
+
+    return results
+
+
+def option_params(command: click.Command) -> Dict[str, click.Option]:
+    """long option name (without --) to option, e.g. "from" -> --from"""
+    params = {}
+    for param in command.params:
+        if isinstance(param, click.Option) and param.name not in BATCH_OPTIONS:
+            longest = max(param.opts, key=len)
+            params[longest.lstrip("-")] = param
+
+    return params
+
+
+def describe(error: Exception) -> str:
+    if isinstance(error, click.ClickException):
+        return error.format_message()
+
+    return str(error)
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
@@ -0,0 +1,239 @@
+"""
+Micro-benchmarks of bipsea's hot paths on this machine (`bipsea bench`).
+
+Every case runs against fixed inputs for at least min_time seconds (and MIN_RUNS
+calls) and reports ops/s and per-call latency percentiles. Memory is the
+tracemalloc peak of one more call, made separately since tracing slows calls down.
+JSON output carries the bipsea and Python versions and the host, so results can be
+compared across versions and machines.
+"""
+
+import gc
+import logging
+import os
+import platform
+import re
+import statistics
+import time
+import tracemalloc
+from collections import namedtuple
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, Optional
+
+from .util import LOGGER_NAME, __version__
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+MIN_RUNS = 5
+MIN_TIME = 0.5  # seconds per case
+DRNG_SIZES = (64, 4096, 2**20)  # bytes
+BULK = 256  # keys per call of the bulk cases; divide their latency by this
+# BIP-85 test vector master key
+MASTER = (
+    "xprv9s21ZrQH143K2LBWUUQRFXhucrQqBpKdRRxNVq2zBqsx8HVqFk2uYo8kmbaLLHRdqtQpUm98uKf"
+    "u3vca1LqdGhUtyoFnCNkfmXRyPXLjbKb"
+)
+MNEMONIC = (
+    "elder major green sting survey canoe inmate funny bright jewel anchor volcano"
+)
+ENTROPY = bytes(range(128, 160))  # high bit set, so all 256 bits count
+SCALAR = int.from_bytes(ENTROPY, "big")
+
+# latencies are in microseconds, memory in bytes
+Result = namedtuple(
+    "Result", ["name", "runs", "ops_per_sec", "p50", "p90", "p99", "peak_memory"]
+)
+
+
+def cases() -> Dict[str, Callable[[], Callable[[], object]]]:
+    """name -> setup, which prepares the case's inputs (untimed) and returns the
+    zero-argument callable to time; run() sets up only the cases it runs"""
+    from . import secp256k1
+    from .addresses import derive_addresses
+    from .bip32 import (
+        CKDpriv,
+        CKDpub,
+        derive_public_children,
+        to_master_key,
+        to_public_key,
+        to_public_keys,
+    )
+    from .bip32types import (
+        TYPED_CHILD_KEY_COUNT,
+        VERSIONS,
+        parse_ext_key,
+        parse_raw_key,
+    )
+    from .bip39 import entropy_to_words, to_master_seed, validate_mnemonic_words
+    from .bip85 import DRNG, apply_85, derive, to_entropy, to_path
+    from .bip85types import APPLICATIONS, MIN_BITS
+    from .hash160 import hash160, hash160_many, python_ripemd160
+
+    words = MNEMONIC.split()
+    public_version = VERSIONS["mainnet"]["public"]
+
+    @lru_cache(maxsize=None)
+    def master():
+        return parse_ext_key(MASTER)
+
+    @lru_cache(maxsize=None)
+    def public():
+        return to_public_key(master().data)
+
+    def child():
+        # pass the parent's fingerprint so that CKD* time only the derivation
+        return dict(chain_code=master().chain_code, depth=bytes([1]), finger=bytes(4))
+
+    def xpub():
+        return str(master()._replace(data=public(), version=public_version))
+
+    def drng_read(size):
+        seed = to_entropy(derive(master(), to_path("drng")).data[1:])
+        return lambda: DRNG(seed).read(size)
+
+    def applied(path):
+        return _bind(apply_85, derive(master(), path), path)
+
+    setups = {
+        "to_master_seed": lambda: _bind(to_master_seed, words, ""),
+        "to_master_key": lambda: _bind(
+            to_master_key, to_master_seed(words, ""), mainnet=True, private=True
+        ),
+        "CKDpriv": lambda: _bind(
+            CKDpriv,
+            master().data,
+            child_number=0,
+            version=master().version,
+            **child(),
+        ),
+        "CKDpriv[hardened]": lambda: _bind(
+            CKDpriv,
+            master().data,
+            child_number=TYPED_CHILD_KEY_COUNT,
+            version=master().version,
+            **child(),
+        ),
+        "CKDpub": lambda: _bind(
+            CKDpub,
+            public(),
+            child_number=bytes(4),
+            version=public_version,
+            **child(),
+        ),
+        "CKDpub[secp256k1]": lambda: _bind(
+            CKDpub,
+            public(),
+            child_number=bytes(4),
+            version=public_version,
+            backend="secp256k1",
+            **child(),
+        ),
+        "secp256k1.multiply_add": lambda: _bind(
+            secp256k1.multiply_add, SCALAR, secp256k1.G
+        ),
+        f"derive_public_children[{BULK}]": lambda: _bind(
+            derive_public_children, master(), range(BULK)
+        ),
+        f"derive_addresses[{BULK}, p2wpkh]": lambda: _bind(
+            _consume, derive_addresses, master(), range(BULK), "p2wpkh"
+        ),
+        f"derive_addresses[{BULK}, p2tr]": lambda: _bind(
+            _consume, derive_addresses, master(), range(BULK), "p2tr"
+        ),
+        "to_public_key": lambda: _bind(to_public_key, master().data),
+        "hash160": lambda: _bind(hash160, public()),
+        f"hash160_many[{BULK}]": lambda: _bind(hash160_many, [public()] * BULK),
+        "python_ripemd160": lambda: _bind(python_ripemd160, public()[1:]),
+        f"to_public_keys[{BULK}]": lambda: _bind(
+            to_public_keys, [master().data] * BULK
+        ),
+        "parse_ext_key": lambda: _bind(parse_ext_key, MASTER),
+        # after the first run the point comes from secp256k1.decompress's cache
+        "parse_ext_key[xpub]": lambda: _bind(parse_ext_key, xpub()),
+        "ExtendedKey.__str__": lambda: _bind(str, master()),
+        "parse_raw_key": lambda: _bind(
+            parse_raw_key, master().to_raw(True), False, True
+        ),
+        "ExtendedKey.to_raw": lambda: _bind(master().to_raw, checksum=True),
+        "entropy_to_words": lambda: _bind(entropy_to_words, 24, ENTROPY, "english"),
+        "validate_mnemonic_words": lambda: _bind(
+            validate_mnemonic_words, words, "english"
+        ),
+    }
+    for application in APPLICATIONS:
+        if application == "drng":
+            continue  # apply_85 doesn't do drng, see DRNG.read below
+        # RSA at its smallest size; the default takes seconds per key
+        rsa = application == "rsa"
+        path = to_path(application, MIN_BITS if rsa else None)
+        name = f"{application}-{MIN_BITS}" if rsa else application
+        setups[f"apply_85[{name}]"] = _bind(applied, path)
+    for size in DRNG_SIZES:
+        setups[f"DRNG.read[{size}]"] = _bind(drng_read, size)
+
+    return setups
+
+
+def run(pattern: Optional[str] = None, min_time: float = MIN_TIME) -> Iterator[Result]:
+    """pattern is a regular expression searched for in case names"""
+    for name, setup in cases().items():
+        if pattern is None or re.search(pattern, name):
+            yield measure(name, setup(), min_time)
+
+
+def measure(
+    name: str, function: Callable[[], object], min_time: float = MIN_TIME
+) -> Result:
+    function()  # warm up caches and lazy imports
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        deadline = time.perf_counter() + min_time
+        while len(samples) < MIN_RUNS or time.perf_counter() < deadline:
+            start = time.perf_counter_ns()
+            function()
+            samples.append(time.perf_counter_ns() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    percentiles = statistics.quantiles(samples, n=100, method="inclusive")
+
+    return Result(
+        name=name,
+        runs=len(samples),
+        ops_per_sec=len(samples) * 1e9 / sum(samples),
+        p50=percentiles[49] / 1e3,
+        p90=percentiles[89] / 1e3,
+        p99=percentiles[98] / 1e3,
+        peak_memory=peak,
+    )
+
+
+def environment() -> Dict:
+    return {
+        "bipsea": __version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def _bind(function: Callable, *args, **kwargs) -> Callable[[], object]:
+    return lambda: function(*args, **kwargs)
+
+
+def _consume(function: Callable, *args) -> list:
+    return list(function(*args))
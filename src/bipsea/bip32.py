@@ -6,20 +6,31 @@ https://github.com/bitcoin/bips/blob/master/bip-0032.mediawiki HDW
 import hashlib
 import hmac
 import logging
-from typing import List
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Iterable, List, Optional, Union
 
 from ecdsa import SECP256k1, SigningKey, VerifyingKey
-from ecdsa.ellipticcurve import INFINITY
+from ecdsa.ellipticcurve import INFINITY, PointJacobi
 from ecdsa.keys import VerifyingKey as VerifyingKeyType
 
-from .bip32types import VERSIONS, ExtendedKey
+from . import secp256k1
+from .bip32types import segment_to_index  # noqa: F401 (moved; keep importable)
+from .bip32types import TYPED_CHILD_KEY_COUNT, VERSIONS, DerivationPath, ExtendedKey
+from .hash160 import hash160
 from .util import LOGGER_NAME
 
 logger = logging.getLogger(LOGGER_NAME)
 
+# elliptic curve engine for CKDpub: python-ecdsa, or the pure-Python one in
+# secp256k1.py (faster; see set_ec_backend)
+EC_BACKENDS = ("ecdsa", "secp256k1")
+ec_backend = "ecdsa"
 
-# same count for hardened and unhardened children
-TYPED_CHILD_KEY_COUNT = 2**31
+# pre-keyed HMACs for recently seen keys (chain codes, mostly) since siblings share
+# their parent's chain code
+HMAC_CACHE_SIZE = 256
 
 
 def to_master_key(seed: bytes, mainnet: bool, private: bool) -> ExtendedKey:
@@ -40,23 +51,88 @@ def to_master_key(seed: bytes, mainnet: bool, private: bool) -> ExtendedKey:
     )
 
 
-def derive_key(master: ExtendedKey, path: List[str], private: bool) -> ExtendedKey:
-    indexes = [segment_to_index(s) for s in path[1:]]
+class DerivationCache:
+    """Private keys derived from ONE master, keyed by DerivationPath, plus the
+    fingerprints of those keys (so siblings don't recompute their parent's public
+    key). maxsize=None is unbounded, else least recently used keys are evicted.
+    Safe to share between threads."""
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self.maxsize = maxsize
+        self.keys = OrderedDict()
+        self.fingers = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, path: DerivationPath) -> bool:
+        return path in self.keys
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def get(self, path: DerivationPath) -> Optional[ExtendedKey]:
+        """None if path isn't cached"""
+        with self._lock:
+            key = self.keys.get(path)
+            if key is not None:
+                self.keys.move_to_end(path)
+            return key
+
+    def put(self, path: DerivationPath, key: ExtendedKey):
+        with self._lock:
+            self.keys[path] = key
+            self.keys.move_to_end(path)
+            if self.maxsize is not None and len(self.keys) > self.maxsize:
+                evicted, _ = self.keys.popitem(last=False)
+                self.fingers.pop(evicted, None)
+
+    def finger(self, path: DerivationPath, key: ExtendedKey) -> bytes:
+        """fingerprint of key, which lives at path"""
+        finger = self.fingers.get(path)
+        if finger is None:
+            finger = fingerprint(key.data)  # outside the lock: an EC multiplication
+            with self._lock:
+                self.fingers[path] = finger
+        return finger
+
+
+def derive_key(
+    master: ExtendedKey,
+    path: Union[DerivationPath, str, List[str]],
+    private: bool,
+    cache: Optional[DerivationCache] = None,
+) -> ExtendedKey:
+    """path is a DerivationPath, a string like m/0h/1, or a list of its segments.
+    Pass the same cache for many paths from the same master to reuse ancestors."""
+    path = to_derivation_path(path)
+    indexes = [(index, index >= TYPED_CHILD_KEY_COUNT) for index in path]
+    start, cached = 0, None
+    if cache is not None:
+        # leave at least one step to derive if we'll need the grandparent below
+        deepest = len(indexes) if private else len(indexes) - 1
+        # get(), not `in` then get(), since another thread may evict in between
+        for start in range(deepest, -1, -1):
+            cached = cache.get(path[:start]) if start else None
+            if cached is not None:
+                break
     key_chain = [
         (
-            master
-            if indexes or private
-            else N(
-                private_key=master.data,
-                chain_code=master.chain_code,
-                child_number=master.child_number,
-                depth=bytes(1),
-                finger=master.finger,
-                version=VERSIONS[master.get_network()]["public"],
+            cached
+            if start
+            else (
+                master
+                if indexes or private
+                else N(
+                    private_key=master.data,
+                    chain_code=master.chain_code,
+                    child_number=master.child_number,
+                    depth=bytes(1),
+                    finger=master.finger,
+                    version=VERSIONS[master.get_network()]["public"],
+                )
             )
         )
     ]
-    for depth, (index, _) in enumerate(indexes, 1):
+    for depth, (index, _) in enumerate(indexes[start:], start + 1):
         parent = key_chain[-1]
         key_chain.append(
             CKDpriv(
@@ -65,8 +141,13 @@ def derive_key(master: ExtendedKey, path: List[str], private: bool) -> ExtendedK
                 child_number=index,
                 depth=depth.to_bytes(1, "big"),
                 version=parent.version,
+                finger=(
+                    None if cache is None else cache.finger(path[: depth - 1], parent)
+                ),
             )
         )
+        if cache is not None:
+            cache.put(path[:depth], key_chain[-1])
     # only use N() or CKDpub() if public at the highest depth (final segment)
     # so as to avoid complex, hard-to-read flow control with look-ahead since once
     # we harden a child anywhere in the chain we can't recover the private key
@@ -104,20 +185,29 @@ def CKDpriv(
     child_number: int,
     depth: bytes,
     version: bytes,
+    finger: Optional[bytes] = None,
+    public_key: Optional[bytes] = None,
 ) -> ExtendedKey:
+    """finger is the fingerprint of private_key (the parent), and public_key its
+    compressed public key; pass them to share them between siblings, else they
+    are computed as needed"""
     if version not in [VERSIONS[net]["private"] for net in ("mainnet", "testnet")]:
         raise ValueError(f"Expected a private version, got version={version}")
 
     hardened = child_number >= TYPED_CHILD_KEY_COUNT
     secret_int = int.from_bytes(private_key[1:], "big")
-    data = (
-        private_key
-        if hardened
-        else VerifyingKey.from_public_point(
+    if public_key is None and not hardened:
+        public_key = VerifyingKey.from_public_point(
             secret_int * SECP256k1.generator,
             curve=SECP256k1,
         ).to_string("compressed")
-    )
+    if finger is None:
+        finger = (
+            fingerprint(private_key)
+            if public_key is None
+            else public_fingerprint(public_key)
+        )
+    data = private_key if hardened else public_key
     derived = hmac_sha512(
         key=chain_code,
         data=data + child_number.to_bytes(4, "big"),
@@ -135,7 +225,7 @@ def CKDpriv(
         chain_code=derived[32:],
         child_number=child_number.to_bytes(4, "big"),
         depth=depth,
-        finger=fingerprint(private_key),
+        finger=finger,
         version=version,
     )
 
@@ -161,6 +251,14 @@ def N(
     )
 
 
+def set_ec_backend(name: str):
+    """default engine for CKDpub, one of EC_BACKENDS"""
+    global ec_backend
+    if name not in EC_BACKENDS:
+        raise ValueError(f"Expected one of {EC_BACKENDS}, got {name}")
+    ec_backend = name
+
+
 def CKDpub(
     public_key: bytes,
     chain_code: bytes,
@@ -168,7 +266,12 @@ def CKDpub(
     depth: bytes,
     finger: bytes,
     version: bytes,
+    backend: Optional[str] = None,
 ) -> ExtendedKey:
+    """backend None is the default (see set_ec_backend)"""
+    backend = backend or ec_backend
+    if backend not in EC_BACKENDS:
+        raise ValueError(f"Expected one of {EC_BACKENDS}, got {backend}")
     if version not in [VERSIONS[net]["public"] for net in ("mainnet", "testnet")]:
         raise ValueError(f"Expected a public version, got version={version}")
 
@@ -176,20 +279,32 @@ def CKDpub(
     if child_number_int >= TYPED_CHILD_KEY_COUNT:
         raise ValueError(f"Cannot call CKDpub() for hardened child: {child_number_int}")
 
-    parent_point = VerifyingKey.from_string(public_key, curve=SECP256k1).pubkey.point
+    parent_point = secp256k1.decompress(public_key)
 
     derived = hmac_sha512(
         key=chain_code,
         data=public_key + child_number,
     )
     parse_256_IL = int.from_bytes(derived[:32], "big")
-    child_point = VerifyingKey.from_public_point(
-        SECP256k1.generator * parse_256_IL + parent_point, curve=SECP256k1
-    )
-    validate_public_child_params(parse_256_IL, child_point, child_number)
+    if backend == "secp256k1":
+        validate_public_child_params(parse_256_IL, None, child_number)  # IL < n
+        child_point = secp256k1.to_affine(
+            secp256k1.multiply_add(parse_256_IL, parent_point)
+        )
+        if child_point is None:
+            validate_public_child_params(parse_256_IL, INFINITY, child_number)
+        data = secp256k1.compress(child_point)
+    else:
+        child_point = VerifyingKey.from_public_point(
+            SECP256k1.generator * parse_256_IL
+            + PointJacobi(SECP256k1.curve, *parent_point, 1, SECP256k1.order),
+            curve=SECP256k1,
+        )
+        validate_public_child_params(parse_256_IL, child_point, child_number)
+        data = child_point.to_string("compressed")
 
     return ExtendedKey(
-        data=child_point.to_string("compressed"),
+        data=data,
         chain_code=derived[32:],
         child_number=child_number_int.to_bytes(4, "big"),
         depth=depth,
@@ -198,6 +313,86 @@ def CKDpub(
     )
 
 
+def derive_public_children(
+    parent: ExtendedKey, child_numbers: Iterable[int]
+) -> List[ExtendedKey]:
+    """[CKDpub(parent, i) for i in child_numbers] (neutering parent if private),
+    with the children kept in Jacobian coordinates and serialized together so that
+    one modular inversion covers them all"""
+    child_numbers = list(child_numbers)
+    public_key, chain_codes, points = _derive_public(parent, child_numbers)
+    depth = (int.from_bytes(parent.depth, "big") + 1).to_bytes(1, "big")
+    finger = public_fingerprint(public_key)
+    version = VERSIONS[parent.get_network()]["public"]
+
+    return [
+        ExtendedKey(
+            data=secp256k1.compress(child_point),
+            chain_code=chain_code,
+            child_number=child_number.to_bytes(4, "big"),
+            depth=depth,
+            finger=finger,
+            version=version,
+        )
+        for child_number, chain_code, child_point in zip(
+            child_numbers, chain_codes, points
+        )
+    ]
+
+
+def derive_public_points(
+    parent: ExtendedKey, child_numbers: Iterable[int]
+) -> List[secp256k1.Affine]:
+    """affine public points of derive_public_children(parent, child_numbers), for
+    callers that need no more than the points (addresses, say)"""
+    _, _, points = _derive_public(parent, list(child_numbers))
+
+    return points
+
+
+def _derive_public(parent: ExtendedKey, child_numbers: List[int]):
+    """(parent public key, child chain codes, child points)"""
+    hardened = [i for i in child_numbers if i >= TYPED_CHILD_KEY_COUNT]
+    if hardened:
+        raise ValueError(f"Cannot derive public hardened children: {hardened[:3]}")
+    if int.from_bytes(parent.depth, "big") >= 255:
+        raise ValueError("Cannot derive past depth 255")
+    public_key = to_public_key(parent.data) if parent.is_private() else parent.data
+    parent_point = secp256k1.decompress(public_key)
+
+    points, chain_codes = [], []
+    for child_number in child_numbers:
+        derived = hmac_sha512(
+            key=parent.chain_code, data=public_key + child_number.to_bytes(4, "big")
+        )
+        parse_256_IL = int.from_bytes(derived[:32], "big")
+        validate_public_child_params(parse_256_IL, None, child_number)  # IL < n
+        points.append(
+            secp256k1.add_affine(secp256k1.multiply_g(parse_256_IL), parent_point)
+        )
+        chain_codes.append(derived[32:])
+    points = secp256k1.to_affine_many(points)
+    for child_number, child_point in zip(child_numbers, points):
+        if child_point is None:
+            validate_public_child_params(0, INFINITY, child_number)
+
+    return public_key, chain_codes, points
+
+
+def to_public_keys(secret_keys: Iterable[bytes]) -> List[bytes]:
+    """[to_public_key(k) for k in secret_keys], serialized together so that one
+    modular inversion covers them all"""
+    points = []
+    for secret_key in secret_keys:
+        assert len(secret_key) == 33
+        secret_int = int.from_bytes(secret_key[1:], "big")
+        if not (0 < secret_int < secp256k1.N):
+            raise ValueError("Invalid private key")
+        points.append(secp256k1.multiply_g(secret_int))
+
+    return [secp256k1.compress(p) for p in secp256k1.to_affine_many(points)]
+
+
 def to_public_key(secret_key: bytes, as_point=False):
     """returns compressed ecdsa public key"""
     # ecdsa from_/to_string are actually from_/to_bytes b/c of some kind of
@@ -211,33 +406,36 @@ def to_public_key(secret_key: bytes, as_point=False):
     return compressed
 
 
-def segment_to_index(segment: str) -> (bytes, bool):
-    """for internal (non-m) derivation path segments which should all be integers
-    once the optional hardened symbol is dropped"""
-    # As of BIP-44 we can use ' for hardened paths
-    # https://github.com/bitcoin/bips/blob/master/bip-0044.mediawiki
-    hardened = segment[-1] in ("h", "H", "'")
-    if hardened:
-        segment = segment[:-1]
-    index = int(segment)
-    assert index <= (TYPED_CHILD_KEY_COUNT - 1)
-    if hardened:
-        index += TYPED_CHILD_KEY_COUNT
+def to_derivation_path(path: Union[DerivationPath, str, List[str]]) -> DerivationPath:
+    if isinstance(path, (DerivationPath, str)):
+        return DerivationPath.parse(path)
 
-    return (index, hardened)
+    return DerivationPath.parse("/".join(path))
 
 
 def fingerprint(private_key: bytes) -> bytes:
-    pub_key = to_public_key(private_key)
-    ripemd = hashlib.new("ripemd160")
-    ripemd.update(hashlib.sha256(pub_key).digest())
-    fingerprint = ripemd.digest()[:4]
+    return public_fingerprint(to_public_key(private_key))
 
-    return fingerprint
+
+def public_fingerprint(pub_key: bytes) -> bytes:
+    """fingerprint from a compressed public key (no EC multiplication)"""
+    return hash160(pub_key)[:4]
 
 
 def hmac_sha512(key: bytes, data: bytes) -> bytes:
-    return hmac.new(key=key, msg=data, digestmod="sha512").digest()
+    """hmac.new(key, data, "sha512") from a cached, pre-keyed HMAC object, which
+    skips the key padding and two block compressions of every fresh HMAC"""
+    mac = keyed_hmac_sha512(key).copy()
+    mac.update(data)
+
+    return mac.digest()
+
+
+@lru_cache(maxsize=HMAC_CACHE_SIZE)
+def keyed_hmac_sha512(key: bytes) -> "hmac.HMAC":
+    """HMAC-SHA512 object that has absorbed key. Shared across callers: .copy()
+    before update()."""
+    return hmac.new(key, digestmod=hashlib.sha512)
 
 
 def validate_private_child_params(parse_256_IL: int, child_key: int, child_number: int):
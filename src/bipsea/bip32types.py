@@ -1,14 +1,28 @@
+import hashlib
 import logging
+import re
 from collections import namedtuple
+from functools import lru_cache
+from typing import Iterable, Union
 
 import base58
-from ecdsa import SECP256k1, SigningKey, VerifyingKey
+from ecdsa import SECP256k1, SigningKey
 from ecdsa.errors import MalformedPointError
 
+from .secp256k1 import decompress
 from .util import LOGGER_NAME
 
 logger = logging.getLogger(LOGGER_NAME)
 
+# serialized extended key, without and with the double-SHA256 checksum
+RAW_KEY_SIZE = 78
+CHECKSUM_SIZE = 4
+
+# same count for hardened and unhardened children
+TYPED_CHILD_KEY_COUNT = 2**31
+
+HARDENED_SYMBOLS = ("h", "H", "'")
+SEGMENT_PATTERN = re.compile(r"^\d+['hH]?$")
 
 VERSIONS = {
     "mainnet": {
@@ -48,9 +62,8 @@ class ExtendedKey(
     def is_private(self) -> bool:
         return self.data[:1] == bytes.fromhex("00")
 
-    def __str__(self) -> str:
-        # return super().__str__()
-        key_ = (
+    def __bytes__(self) -> bytes:
+        return (
             self.version
             + self.depth
             + self.finger
@@ -59,8 +72,15 @@ class ExtendedKey(
             + self.data
         )
 
+    def to_raw(self, checksum: bool = False) -> bytes:
+        """78 bytes, or 82 with the checksum (base58check without the base58)"""
+        raw = bytes(self)
+
+        return raw + raw_checksum(raw) if checksum else raw
+
+    def __str__(self) -> str:
         encoded = base58.b58encode_check(
-            key_, alphabet=base58.BITCOIN_ALPHABET
+            bytes(self), alphabet=base58.BITCOIN_ALPHABET
         ).decode()
         # https://github.com/bitcoin/bips/pull/1584
         assert len(encoded) == 111
@@ -92,56 +112,83 @@ def parse_ext_key(key: str, validate: bool = True):
     master - bip32 extended key, base 58
     """
     master_dec = base58.b58decode_check(key, alphabet=base58.BITCOIN_ALPHABET)
-    assert len(master_dec) == 78, "expected 78 bytes"
-
-    ext_key = ExtendedKey(
-        version=master_dec[:4],
-        depth=master_dec[4:5],  # slice so we get bytes, not an int
-        finger=master_dec[5:9],
-        child_number=master_dec[9:13],
-        chain_code=master_dec[13:45],
-        data=master_dec[45:],
-    )
+    assert len(master_dec) == RAW_KEY_SIZE, "expected 78 bytes"
+    ext_key = _from_raw(master_dec)
 
     if validate:
-        try:
-            matches = 0
-            for net in VERSIONS:
-                for vis in VERSIONS[net]:
-                    if ext_key.version == VERSIONS[net][vis]:
-                        matches += 1
-                        if net == "mainnet":
-                            assert key.startswith("x")
-                        else:
-                            assert key.startswith("t")
-                        if vis == "public":
-                            assert key[1:4] == "pub"
-                            assert ext_key.is_public()
-                        else:
-                            assert key[1:4] == "prv"
-                            assert ext_key.is_private()
-            assert matches == 1, f"unrecognized version: {ext_key.version}"
-
-            if ext_key.is_private():
-                SigningKey.from_string(ext_key.data[1:], curve=SECP256k1)
-            else:
-                VerifyingKey.from_string(ext_key.data, curve=SECP256k1)
-            depth = int.from_bytes(ext_key.depth, "big")
-            if depth == 0:
-                assert ext_key.finger == bytes(4)
-                assert ext_key.child_number == bytes(4)
-            else:
-                assert ext_key.finger != bytes(4)
-
-            assert len(ext_key.version) == 4
-            assert len(ext_key.finger) == len(ext_key.child_number) == 4
-            assert len(ext_key.data) - 1 == 32 == len(ext_key.chain_code)
-        except (AssertionError, MalformedPointError) as source:
-            raise ValueError("Invalid key") from source
+        check_ext_key(ext_key)
+        # the version bytes fix the base58 prefix, but be explicit
+        prefix = "x" if ext_key.get_network() == "mainnet" else "t"
+        prefix += "pub" if ext_key.is_public() else "prv"
+        if not key.startswith(prefix):
+            raise ValueError("Invalid key")
 
     return ext_key
 
 
+def parse_raw_key(
+    raw: Union[bytes, memoryview], validate: bool = True, checksum: bool = False
+):
+    """
+    raw - bip32 extended key as from ExtendedKey.to_raw(checksum)
+    """
+    if len(raw) != RAW_KEY_SIZE + CHECKSUM_SIZE * checksum:
+        raise ValueError(f"Expected {RAW_KEY_SIZE} bytes (+4 with checksum)")
+    raw = bytes(raw)
+    if checksum:
+        raw, expected = raw[:RAW_KEY_SIZE], raw[RAW_KEY_SIZE:]
+        if raw_checksum(raw) != expected:
+            raise ValueError("Invalid checksum")
+    ext_key = _from_raw(raw)
+    if validate:
+        check_ext_key(ext_key)
+
+    return ext_key
+
+
+def raw_checksum(raw: bytes) -> bytes:
+    return hashlib.sha256(hashlib.sha256(raw).digest()).digest()[:CHECKSUM_SIZE]
+
+
+def check_ext_key(ext_key: ExtendedKey):
+    """raises ValueError unless ext_key is a well-formed xprv, xpub, tprv, or tpub"""
+    try:
+        matches = 0
+        for net in VERSIONS:
+            for vis in VERSIONS[net]:
+                if ext_key.version == VERSIONS[net][vis]:
+                    matches += 1
+                    if vis == "public":
+                        assert ext_key.is_public()
+                    else:
+                        assert ext_key.is_private()
+        assert matches == 1, f"unrecognized version: {ext_key.version}"
+
+        if ext_key.is_private():
+            SigningKey.from_string(ext_key.data[1:], curve=SECP256k1)
+        else:
+            decompress(ext_key.data)
+        depth = int.from_bytes(ext_key.depth, "big")
+        if depth == 0:
+            assert ext_key.finger == bytes(4)
+            assert ext_key.child_number == bytes(4)
+        else:
+            assert ext_key.finger != bytes(4)
+    except (AssertionError, MalformedPointError, ValueError) as source:
+        raise ValueError("Invalid key") from source
+
+
+def _from_raw(raw: bytes) -> ExtendedKey:
+    return ExtendedKey(
+        version=raw[:4],
+        depth=raw[4:5],  # slice so we get bytes, not an int
+        finger=raw[5:9],
+        child_number=raw[9:13],
+        chain_code=raw[13:45],
+        data=raw[45:],
+    )
+
+
 def validate_prv_str(prv: str, private: bool) -> bool:
     try:
         key = parse_ext_key(prv)
@@ -156,3 +203,101 @@ def validate_prv_str(prv: str, private: bool) -> bool:
         return False
 
     return True
+
+
+class DerivationPath(tuple):
+    """Immutable BIP-32 path as a tuple of int child indexes (hardened >= 2**31).
+    Hashable, so paths can key caches. Build from strings with parse(), which is
+    memoized, so each distinct path string is only parsed once."""
+
+    def __new__(cls, indexes: Iterable[int] = ()):
+        indexes = tuple(indexes)
+        for index in indexes:
+            if not (isinstance(index, int) and 0 <= index < 2 * TYPED_CHILD_KEY_COUNT):
+                raise ValueError(f"Child index out of range: {index}")
+        return super().__new__(cls, indexes)
+
+    @classmethod
+    def parse(cls, path: Union[str, "DerivationPath"]) -> "DerivationPath":
+        if isinstance(path, DerivationPath):
+            return path
+        return _parse_path(path)
+
+    @property
+    def depth(self) -> int:
+        return len(self)
+
+    def is_hardened(self) -> bool:
+        """True if the final segment is hardened"""
+        return bool(self) and self[-1] >= TYPED_CHILD_KEY_COUNT
+
+    def parent(self) -> "DerivationPath":
+        if not self:
+            raise ValueError("Root path m has no parent")
+        return self[:-1]
+
+    def child(self, index: int, hardened: bool = False) -> "DerivationPath":
+        if not (0 <= index < TYPED_CHILD_KEY_COUNT):
+            raise ValueError(f"Child index out of range: {index}")
+        return DerivationPath(self + (index + TYPED_CHILD_KEY_COUNT * hardened,))
+
+    def prefix(self, depth: int) -> "DerivationPath":
+        return self[:depth]
+
+    def is_prefix_of(self, other: "DerivationPath") -> bool:
+        return len(self) <= len(other) and other[: len(self)] == self
+
+    def __getitem__(self, key):
+        """slices are paths too (already valid, so not checked again)"""
+        item = super().__getitem__(key)
+        if isinstance(key, slice):
+            return tuple.__new__(DerivationPath, item)
+        return item
+
+    def __add__(self, other) -> "DerivationPath":
+        return DerivationPath(tuple(self) + tuple(other))
+
+    def __str__(self) -> str:
+        return _format_path(self)
+
+    def __repr__(self) -> str:
+        return f"DerivationPath('{self}')"
+
+
+def segment_to_index(segment: str) -> (int, bool):
+    """for internal (non-m) derivation path segments which should all be integers
+    once the optional hardened symbol is dropped"""
+    # As of BIP-44 we can use ' for hardened paths
+    # https://github.com/bitcoin/bips/blob/master/bip-0044.mediawiki
+    hardened = segment[-1] in HARDENED_SYMBOLS
+    if hardened:
+        segment = segment[:-1]
+    index = int(segment)
+    assert index <= (TYPED_CHILD_KEY_COUNT - 1)
+    if hardened:
+        index += TYPED_CHILD_KEY_COUNT
+
+    return (index, hardened)
+
+
+@lru_cache(maxsize=4096)
+def _parse_path(path: str) -> DerivationPath:
+    segments = path.split("/")
+    if segments[0] != "m":
+        raise ValueError(f"Expected 'm' (xprv) at root of derivation path: {path}")
+    if not all(SEGMENT_PATTERN.match(s) for s in segments[1:]):
+        raise ValueError(f"Unexpected path segments: {path}")
+    try:
+        return DerivationPath(segment_to_index(s)[0] for s in segments[1:])
+    except AssertionError as source:
+        raise ValueError(f"Child index out of range: {path}") from source
+
+
+@lru_cache(maxsize=4096)
+def _format_path(path: DerivationPath) -> str:
+    segments = ["m"] + [
+        (f"{i - TYPED_CHILD_KEY_COUNT}'" if i >= TYPED_CHILD_KEY_COUNT else str(i))
+        for i in path
+    ]
+
+    return "/".join(segments)
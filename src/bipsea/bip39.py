@@ -4,14 +4,9 @@ import hashlib
 import logging
 import secrets
 import warnings
+from functools import lru_cache
 from hashlib import pbkdf2_hmac
-
-try:  # pragma: no cover
-    from importlib.resources import files
-except ImportError:  # pragma: no cover
-    from importlib_resources import files  # for Python 3.8
-
-from typing import List
+from typing import Dict, List, Tuple
 from unicodedata import normalize
 
 from .util import LOGGER_NAME, __app_name__
@@ -75,6 +70,8 @@ LANGUAGES = {
     },
 }
 
+ISO_TO_LANGUAGE = {v["code"]: k for k, v in LANGUAGES.items()}
+
 N_MNEMONICS = 2048
 N_WORD_BITS = 11
 N_WORDS_ALLOWED = [12, 15, 18, 21, 24]
@@ -118,7 +115,7 @@ def entropy_to_words(n_words: int, user_entropy: bytes, language: str):
     )
     int_entropy_cs = (int_entropy << n_checksum_bits) + int_checksum  # shift CS bits in
 
-    dictionary = bip39_words(language)
+    dictionary = read_words(language)
     swords = []
     mask_11 = N_MNEMONICS - 1
     for _ in range(n_words):
@@ -139,12 +136,12 @@ def validate_mnemonic_words(words: List[str], language: str) -> bool:
     if n_words not in N_WORDS_ALLOWED:
         return False
 
-    universe = bip39_words(language)
+    universe = word_indexes(language)
     if not all(w in universe for w in words):
         return False
 
     n_entropy_bits = N_WORDS_META[n_words]["entropy_bits"]
-    bin_indexes = [bin(universe.index(w))[2:].zfill(N_WORD_BITS) for w in words]
+    bin_indexes = [bin(universe[w])[2:].zfill(N_WORD_BITS) for w in words]
     bin_string = "".join(bin_indexes)
     n_checksum_bits = N_WORDS_META[n_words]["checksum_bits"]
     int_entropy = int(bin_string[:-n_checksum_bits], 2)
@@ -160,14 +157,33 @@ def validate_mnemonic_words(words: List[str], language: str) -> bool:
 
 def bip39_words(language) -> List[str]:
     """Returns a list of BIP-39 words in the given language"""
+    return list(read_words(language))
+
+
+@lru_cache(maxsize=None)
+def read_words(language) -> Tuple[str, ...]:
+    """reads a wordlist from disk once per process"""
+    return tuple(wordlist_bytes(language).decode("utf-8").splitlines())
+
+
+def wordlist_bytes(language) -> bytes:
+    """the wordlist file as shipped, from the package or a zipapp alike"""
+    # importlib.resources costs more to import than the rest of the CLI
+    try:  # pragma: no cover
+        from importlib.resources import files
+    except ImportError:  # pragma: no cover
+        from importlib_resources import files  # for Python 3.8
+
     if language not in LANGUAGES:
         raise ValueError(f"Unexpected language: {language}")
     file_name = LANGUAGES[language]["file"]
-    list_path = files(__app_name__) / "wordlists" / file_name
-    with list_path.open("r") as f:
-        raw = f.read()
 
-    return raw.splitlines()
+    return files(__app_name__).joinpath("wordlists").joinpath(file_name).read_bytes()
+
+
+@lru_cache(maxsize=None)
+def word_indexes(language) -> Dict[str, int]:
+    return {w: i for i, w in enumerate(read_words(language))}
 
 
 def normalize_str(input: str, lower=False):
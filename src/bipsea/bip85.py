@@ -2,40 +2,30 @@ import base64
 import hashlib
 import logging
 import math
-import re
-from typing import Dict, Union
+from collections import namedtuple
+from typing import Dict, Optional, Union
 
 import base58
 
-from .bip32 import VERSIONS, ExtendedKey
+from .bip32 import VERSIONS, DerivationCache, ExtendedKey, N
 from .bip32 import derive_key as derive_key_bip32
-from .bip32 import hmac_sha512
+from .bip32 import hmac_sha512, public_fingerprint
+from .bip32types import SEGMENT_PATTERN, DerivationPath
 from .bip39 import LANGUAGES, N_WORDS_META, entropy_to_words, validate_mnemonic_words
+from .bip85types import (
+    APPLICATIONS,
+    DEFAULT_NUMBERS,
+    MAX_BITS,
+    MIN_BITS,
+    PURPOSE_CODES,
+    RANGES,
+)
+from .rsa import generate as generate_rsa
 from .util import LOGGER_NAME, to_hex_string
 
 logger = logging.getLogger(LOGGER_NAME)
 
 
-APPLICATIONS = {
-    "base64": "707764'",
-    "base85": "707785'",
-    "dice": "89101'",
-    "drng": "0'",
-    "hex": "128169'",
-    "mnemonic": "39'",
-    "wif": "2'",
-    "xprv": "32'",
-}
-
-RANGES = {
-    "base64": (20, 86),
-    "base85": (10, 80),
-    "hex": (16, 64),
-    "dice": (1, 10_000),
-}
-
-PURPOSE_CODES = {"BIP-85": "83696968'"}
-
 HMAC_KEY = b"bip-entropy-from-k"
 
 INDEX_TO_LANGUAGE = {
@@ -54,7 +44,9 @@ INDEX_TO_LANGUAGE = {
 assert set(INDEX_TO_LANGUAGE.values()) == set(LANGUAGES.keys())
 
 
-def apply_85(derived_key: ExtendedKey, path: str) -> Dict[str, Union[bytes, str]]:
+def apply_85(
+    derived_key: ExtendedKey, path: Union[DerivationPath, str]
+) -> Dict[str, Union[bytes, str]]:
     """returns a dict with 'entropy': bytes and 'application': str"""
     segments = split_and_validate(path)
     purpose = segments[1]
@@ -137,6 +129,15 @@ def apply_85(derived_key: ExtendedKey, path: str) -> Dict[str, Union[bytes, str]
             "entropy": entropy,
             "application": do_rolls(entropy, sides, rolls, index),
         }
+    elif app == APPLICATIONS["rsa"]:
+        key_bits = int(indexes[0].rstrip("'"))
+        if not (MIN_BITS <= key_bits <= MAX_BITS):
+            raise ValueError(
+                f"Expected key_bits in [{MIN_BITS}, {MAX_BITS}], got {key_bits}"
+            )
+        key = generate_rsa(key_bits, randfunc=DRNG(entropy).read)
+
+        return {"entropy": entropy, "application": key.private_pem()}
     else:
         raise NotImplementedError(f"Unsupported BIP-85 application {app}")
 
@@ -145,33 +146,161 @@ def to_entropy(data: bytes) -> bytes:
     return hmac_sha512(key=HMAC_KEY, data=data)
 
 
-def derive(master: ExtendedKey, path: str, private: bool = True) -> ExtendedKey:
+def derive(
+    master: ExtendedKey,
+    path: Union[DerivationPath, str],
+    private: bool = True,
+    cache: Optional[DerivationCache] = None,
+) -> ExtendedKey:
     if not master.is_private():
         raise ValueError("Derivations should begin with a private master key")
 
-    return derive_key_bip32(master, split_and_validate(path), private)
+    return derive_key_bip32(master, path, private, cache=cache)
+
+
+def to_path(
+    application: str,
+    number: Optional[int] = None,
+    index: int = 0,
+    special: int = 10,
+    language: str = "english",
+) -> str:
+    """BIP-85 path for an application; number is bytes, chars, words, rolls, or bits,
+    depending on application; special is the number of sides for dice"""
+    if application not in APPLICATIONS:
+        raise ValueError(f"Unsupported BIP-85 application {application}")
+    if number is None:
+        number = DEFAULT_NUMBERS[application]
+    if application in RANGES:
+        (min, max) = RANGES[application]
+        if not (min <= number <= max):
+            raise ValueError(f"Expected number in [{min}, {max}] for {application}")
+
+    path = f"m/{PURPOSE_CODES['BIP-85']}/{APPLICATIONS[application]}"
+    if application == "mnemonic":
+        code_85 = next(i for i, l in INDEX_TO_LANGUAGE.items() if l == language)
+        path += f"/{code_85}/{number}'/{index}'"
+    elif application in ("wif", "xprv"):
+        path += f"/{index}'"
+    elif application in ("base64", "base85", "hex", "rsa"):
+        path += f"/{number}'/{index}'"
+    elif application == "drng":
+        path += f"/0'/{index}'"
+    elif application == "dice":
+        path += f"/{special}'/{number}'/{index}'"
+
+    return path
+
+
+class Derivation(
+    namedtuple("Derivation", ["application", "path", "xprv", "entropy", "output"])
+):
+    """Everything one BIP-85 derivation computes: xprv is the derived child key,
+    entropy is the derived entropy (as in the BIP-85 test vectors), output is what
+    `bipsea derive` prints"""
+
+    def xpub(self) -> ExtendedKey:
+        """costs an EC multiplication, so it isn't part of the derivation"""
+        return N(
+            private_key=self.xprv.data,
+            chain_code=self.xprv.chain_code,
+            child_number=self.xprv.child_number,
+            depth=self.xprv.depth,
+            finger=self.xprv.finger,
+            version=VERSIONS[self.xprv.get_network()]["public"],
+        )
+
+    def to_dict(self) -> Dict[str, str]:
+        xpub = self.xpub()
+        return {
+            "application": self.application,
+            "path": self.path,
+            "xprv": str(self.xprv),
+            "xpub": str(xpub),
+            "fingerprint": to_hex_string(public_fingerprint(xpub.data)),
+            "parent_fingerprint": to_hex_string(self.xprv.finger),
+            "entropy": to_hex_string(self.entropy),
+            "output": self.output,
+        }
+
+
+def derive_full(
+    master: ExtendedKey,
+    application: str,
+    number: Optional[int] = None,
+    index: int = 0,
+    special: int = 10,
+    language: str = "english",
+    cache: Optional[DerivationCache] = None,
+) -> Derivation:
+    """derive an application in one pass, keeping the intermediate values"""
+    if number is None:
+        number = DEFAULT_NUMBERS[application]
+    path = to_path(application, number, index, special, language)
+    derived = derive(master, path, cache=cache)
+    if application == "drng":
+        entropy = to_entropy(derived.data[1:])
+        output = to_hex_string(DRNG(entropy).read(number))
+    else:
+        applied = apply_85(derived, path)
+        entropy, output = applied["entropy"], applied["application"]
+
+    return Derivation(application, path, derived, entropy, output)
+
+
+def derive_application(
+    master: ExtendedKey,
+    application: str,
+    number: Optional[int] = None,
+    index: int = 0,
+    special: int = 10,
+    language: str = "english",
+    cache: Optional[DerivationCache] = None,
+) -> str:
+    """what `bipsea derive` prints"""
+    return derive_full(
+        master, application, number, index, special, language, cache=cache
+    ).output
 
 
 class DRNG:
+    """SHAKE-256 stream. hashlib can't squeeze incrementally (digest(n) always
+    starts over) so we over-squeeze, at least doubling each time, and serve reads
+    from the unread tail. Many small reads then cost O(total) instead of O(total**2).
+    """
+
+    MIN_SQUEEZE = 1024
+
     def __init__(self, seed: bytes):
         if len(seed) != 64:
             raise ValueError("Seed must be exactly 64 bytes long")
         self.shake = hashlib.shake_256(seed)
         self.cursor = 0
+        self.buffer = b""
+        self.offset = 0  # stream position of self.buffer[0]
 
     def read(self, n: int) -> bytes:
         start = self.cursor
         self.cursor = stop = start + n
+        buffered = self.offset + len(self.buffer)
+        if stop > buffered:
+            squeezed = self.shake.digest(max(stop, 2 * buffered, self.MIN_SQUEEZE))
+            self.buffer = squeezed[start:]
+            self.offset = start
+
+        begin, end = start - self.offset, stop - self.offset
 
-        return self.shake.digest(stop)[start:stop]
+        return self.buffer[begin:end]
 
 
-def split_and_validate(path: str):
+def split_and_validate(path: Union[DerivationPath, str]):
+    if isinstance(path, DerivationPath):
+        # canonical form marks hardened segments with '
+        return str(path).split("/")
     segments = path.split("/")
     if segments[0] != "m":
         raise ValueError(f"Expected 'm' (xprv) at root of derivation path: {path}")
-    pattern = r"^\d+['hH]?$"
-    if not all(re.match(pattern, s) for s in segments[1:]):
+    if not all(SEGMENT_PATTERN.match(s) for s in segments[1:]):
         raise ValueError(f"Unexpected path segments: {path}")
 
     return segments
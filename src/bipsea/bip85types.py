@@ -0,0 +1,33 @@
+"""
+BIP-85 constants, kept free of the EC and encoding machinery in bip85.py so
+the CLI can declare its options without importing it.
+"""
+
+# RSA key sizes, here rather than in rsa.py so --help doesn't import it
+MIN_BITS = 1024
+MAX_BITS = 16384  # same bounds as pycryptodome
+
+APPLICATIONS = {
+    "base64": "707764'",
+    "base85": "707785'",
+    "dice": "89101'",
+    "drng": "0'",
+    "hex": "128169'",
+    "mnemonic": "39'",
+    "rsa": "828365'",
+    "wif": "2'",
+    "xprv": "32'",
+}
+
+RANGES = {
+    "base64": (20, 86),
+    "base85": (10, 80),
+    "hex": (16, 64),
+    "dice": (1, 10_000),
+    "rsa": (MIN_BITS, MAX_BITS),
+}
+
+# --number when the caller doesn't give one (unused by wif, xprv)
+DEFAULT_NUMBERS = {app: 2048 if app == "rsa" else 24 for app in APPLICATIONS}
+
+PURPOSE_CODES = {"BIP-85": "83696968'"}
@@ -1,15 +1,21 @@
-"""CLI"""
+"""
+CLI. Subcommands import the EC and encoding machinery (bip32, bip32types, bip85)
+only when they run, so that `--help`, `mnemonic`, and `client` start fast.
+test_cli.TestStartup holds us to that.
+"""
 
+import json
 import logging
 import re
+import signal
 import sys
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Union
 
 import click
 
-from .bip32 import to_master_key
-from .bip32types import parse_ext_key, validate_prv_str
 from .bip39 import (
-    LANGUAGES,
+    ISO_TO_LANGUAGE,
     N_WORDS_ALLOWED,
     entropy_to_words,
     normalize_list,
@@ -17,26 +23,19 @@ from .bip39 import (
     to_master_seed,
     validate_mnemonic_words,
 )
-from .bip85 import (
-    APPLICATIONS,
-    DRNG,
-    INDEX_TO_LANGUAGE,
-    PURPOSE_CODES,
-    RANGES,
-    apply_85,
-    derive,
-    to_entropy,
-)
+from .bip85types import APPLICATIONS, DEFAULT_NUMBERS, RANGES
 from .util import (
     LOGGER_NAME,
     MIN_REL_ENTROPY,
     __app_name__,
     __version__,
     relative_entropy,
-    to_hex_string,
 )
+from .vault import FORMATS, format_records, generate, read_manifest
 
-ISO_TO_LANGUAGE = {v["code"]: k for k, v in LANGUAGES.items()}
+if TYPE_CHECKING:  # pragma: no cover
+    from .bip32types import ExtendedKey
+    from .serve import Warm
 
 N_WORDS_ALLOWED_STR = [str(n) for n in N_WORDS_ALLOWED]
 
@@ -48,6 +47,16 @@ MNEMONIC_FROM_VALUES = [
 ENTROPY_TO_VALUES = list(ISO_TO_LANGUAGE.keys())
 
 
+# addresses.ADDRESS_TYPES, which we don't import until `addresses` runs
+ADDRESS_TYPES = ("p2pkh", "p2wpkh", "p2tr")
+
+PROGRESS_INTERVAL = 10  # seconds between `search` and `find` progress lines
+
+BATCH_HELP = (
+    "Read one record per stdin line (plain value or JSON object of options),"
+    " write one JSON result per line."
+)
+
 logger = logging.getLogger(LOGGER_NAME)
 
 
@@ -105,12 +114,37 @@ def mnemonic(to, number, pretty):
     "mnemonic",
     help="String mnemonic in the format given by --from.",
 )
-def validate(from_, mnemonic):
+@click.option("--batch", is_flag=True, help=BATCH_HELP)
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Worker processes for --batch (0: this process).",
+)
+def validate(from_, mnemonic, batch, workers):
+    if batch:
+        run_batch(
+            validate,
+            normalize_mnemonic,
+            ("mnemonic", "mnemonic"),
+            workers,
+            from_=from_,
+            mnemonic=mnemonic,
+        )
+        return
     if mnemonic:
         mnemonic = mnemonic.strip()
     else:
         mnemonic = try_for_pipe_input()
+
+    click.echo(normalize_mnemonic(from_, mnemonic, warm=get_warm()))
+
+
+def normalize_mnemonic(from_: str, mnemonic: str, warm: Optional["Warm"] = None) -> str:
+    """core of `bipsea validate`; warm is unused (see run_batch)"""
     no_empty_param("--mnemonic", mnemonic)
+    mnemonic = mnemonic.strip()
 
     words = normalize_list(re.split(r"\s+", mnemonic), lower=True)
 
@@ -134,7 +168,7 @@ def validate(from_, mnemonic):
                 param_hint="--mnemonic",
             )
 
-    click.echo(" ".join(words))
+    return " ".join(words)
 
 
 @click.command(
@@ -144,14 +178,42 @@ def validate(from_, mnemonic):
 @click.option("-m", "--mnemonic", help="Mnemonic. Pipe from `bipsea validate`.")
 @click.option("-p", "--passphrase", default="", help="BIP-39 passphrase.")
 @click.option("--mainnet/--testnet", is_flag=True, default=True)
-def xprv(mnemonic, passphrase, mainnet):
+@click.option("--batch", is_flag=True, help=BATCH_HELP)
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Worker processes for --batch (0: this process).",
+)
+def xprv(mnemonic, passphrase, mainnet, batch, workers):
+    if batch:
+        run_batch(
+            xprv,
+            mnemonic_to_xprv,
+            ("mnemonic", "xprv"),
+            workers,
+            mnemonic=mnemonic,
+            passphrase=passphrase,
+            mainnet=mainnet,
+        )
+        return
     if mnemonic:
         mnemonic = mnemonic.strip()
     else:
         mnemonic = try_for_pipe_input()
-    no_empty_param("--mnemonic", mnemonic)
 
-    mnemonic_list = re.split(r"\s+", mnemonic)
+    click.echo(mnemonic_to_xprv(mnemonic, passphrase, mainnet, warm=get_warm()))
+
+
+def mnemonic_to_xprv(
+    mnemonic: str, passphrase: str, mainnet: bool, warm: Optional["Warm"] = None
+) -> "ExtendedKey":
+    """core of `bipsea xprv`"""
+    from .bip32 import to_master_key
+
+    no_empty_param("--mnemonic", mnemonic)
+    mnemonic_list = re.split(r"\s+", mnemonic.strip())
     total_chars = sum(len(s) for s in mnemonic_list)
     if total_chars < 10:
         raise click.BadOptionUsage(
@@ -159,10 +221,9 @@ def xprv(mnemonic, passphrase, mainnet):
             message="Suspiciously short mnemonic. Try `bipsea validate`.",
         )
 
-    seed = to_master_seed(mnemonic_list, passphrase)
-    prv = to_master_key(seed, mainnet=mainnet, private=True)
+    seed = (warm.to_master_seed if warm else to_master_seed)(mnemonic_list, passphrase)
 
-    click.echo(prv)
+    return to_master_key(seed, mainnet=mainnet, private=True)
 
 
 @click.command(
@@ -178,7 +239,7 @@ def xprv(mnemonic, passphrase, mainnet):
     "-n",
     "--number",
     type=click.IntRange(min=1),
-    help="Length of output in bytes, chars, or words, depending on --application.",
+    help="Length of output in bytes, chars, words, or bits (rsa), depending on --application.",
 )
 @click.option(
     "-i",
@@ -205,14 +266,62 @@ def xprv(mnemonic, passphrase, mainnet):
     type=click.Choice(ENTROPY_TO_VALUES),
     help="Output language for `--application mnemonic`.",
 )
-def derive_cli(application, number, index, special, xprv, to):
+@click.option(
+    "-f",
+    "--format",
+    "format_",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    help="json adds the path, child xprv and xpub, fingerprints, and entropy.",
+)
+@click.option("--batch", is_flag=True, help=BATCH_HELP)
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Worker processes for --batch (0: this process).",
+)
+def derive_cli(application, number, index, special, xprv, to, format_, batch, workers):
+    kwargs = dict(
+        application=application,
+        number=number,
+        index=index,
+        special=special,
+        to=to,
+        format_=format_,
+    )
+    if batch:
+        run_batch(
+            derive_cli, derive_secret, ("xprv", "secret"), workers, xprv=xprv, **kwargs
+        )
+        return
     if xprv:
         xprv = xprv.strip()
     else:
         xprv = try_for_pipe_input()
-    no_empty_param("--xprv", xprv)
 
-    if not validate_prv_str(xprv, private=True):
+    secret = derive_secret(xprv=xprv, warm=get_warm(), **kwargs)
+    click.echo(json.dumps(secret, ensure_ascii=False) if format_ == "json" else secret)
+
+
+def derive_secret(
+    application: str,
+    number: Optional[int],
+    index: int,
+    special: int,
+    xprv: str,
+    to: Optional[str],
+    format_: str = "text",
+    warm: Optional["Warm"] = None,
+) -> Union[str, Dict[str, str]]:
+    """core of `bipsea derive`; format_ json returns Derivation.to_dict()"""
+    from .bip32types import parse_ext_key, validate_prv_str
+    from .bip85 import derive_full
+
+    no_empty_param("--xprv", xprv)
+    xprv = xprv.strip()
+    if not (warm.validate_prv_str if warm else validate_prv_str)(xprv, private=True):
         raise click.BadParameter("Bad xprv or tprv.", param_hint="--xprv (or pipe)")
 
     if number is not None:
@@ -222,13 +331,7 @@ def derive_cli(application, number, index, special, xprv, to):
                 message="`--number` has no effect when `--application wif|xprv`",
             )
     else:
-        number = 24
-
-    master = parse_ext_key(xprv)
-
-    path = f"m/{PURPOSE_CODES['BIP-85']}"
-    app_code = APPLICATIONS[application]
-    path += f"/{app_code}"
+        number = DEFAULT_NUMBERS[application]
 
     if to:
         if application != "mnemonic":
@@ -239,40 +342,693 @@ def derive_cli(application, number, index, special, xprv, to):
     else:
         to = "eng"
 
-    if application == "mnemonic":
-        language = ISO_TO_LANGUAGE[to]
-        code_85 = next(i for i, l in INDEX_TO_LANGUAGE.items() if l == language)
-        path += f"/{code_85}/{number}'/{index}'"
-    elif application in ("wif", "xprv"):
-        path += f"/{index}'"
-    elif application in ("base64", "base85", "hex"):
-        check_range(number, application)
-        path += f"/{number}'/{index}'"
-    elif application == "drng":
-        path += f"/0'/{index}'"
-    elif application == "dice":
+    if application in RANGES:
         check_range(number, application)
-        path += f"/{special}'/{number}'/{index}'"
 
-    derived = derive(master, path)
-    if application == "drng":
-        drng = DRNG(to_entropy(derived.data[1:]))
-        output = to_hex_string(drng.read(number))
+    master = (warm.parse_ext_key if warm else parse_ext_key)(xprv)
+
+    derivation = derive_full(
+        master,
+        application,
+        number=number,
+        index=index,
+        special=special,
+        language=ISO_TO_LANGUAGE[to],
+        cache=warm.derivation_cache(master) if warm else None,
+    )
+
+    return derivation.to_dict() if format_ == "json" else derivation.output
+
+
+@click.command(
+    name="vault",
+    help="Derive every labeled secret in a manifest, streaming one result per line.",
+)
+@click.option(
+    "-m",
+    "--manifest",
+    required=True,
+    type=click.File("r"),
+    help=(
+        "CSV with a header (label,application,length,index[,special,to]) or JSONL"
+        " with the same keys. `-` for stdin."
+    ),
+)
+@click.option(
+    "-x",
+    "--xprv",
+    help="Extended private master key from which all secrets are derived.",
+)
+@click.option(
+    "-f",
+    "--format",
+    "format_",
+    type=click.Choice(FORMATS),
+    default="jsonl",
+    help="Output format.",
+)
+def vault_cli(manifest, xprv, format_):
+    from .bip32types import parse_ext_key, validate_prv_str
+
+    if xprv:
+        xprv = xprv.strip()
+    elif manifest.name != "<stdin>":
+        xprv = try_for_pipe_input()
+    no_empty_param("--xprv", xprv)
+
+    if not validate_prv_str(xprv, private=True):
+        raise click.BadParameter("Bad xprv or tprv.", param_hint="--xprv (or pipe)")
+
+    master = parse_ext_key(xprv)
+    try:
+        records = generate(master, read_manifest(manifest))
+        for line in format_records(records, format_):
+            click.echo(line)
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint="--manifest")
+
+
+@click.command(
+    name="pack",
+    help="Pack extended keys (one per line on stdin) into a file of raw 78-byte records.",
+)
+@click.option(
+    "-o",
+    "--output",
+    required=True,
+    type=click.File("wb"),
+    help="Key pack to write. `-` for stdout.",
+)
+@click.option(
+    "--checksum/--no-checksum",
+    default=True,
+    show_default=True,
+    help="Append a 4-byte checksum to each record.",
+)
+def pack_cli(output, checksum):
+    from .bip32types import parse_ext_key
+    from .keypack import write_keys
+
+    def keys():
+        for number, line in enumerate(sys.stdin, 1):
+            if line.strip():
+                try:
+                    yield parse_ext_key(line.strip())
+                except ValueError as error:
+                    raise click.BadParameter(
+                        f"line {number}: {error}", param_hint="stdin"
+                    )
+
+    count = write_keys(output, keys(), checksum=checksum)
+    click.secho(f"Packed {count} keys", err=True)
+
+
+@click.command(
+    name="unpack",
+    help="Print the keys in a `bipsea pack` file, one per line.",
+)
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--validate",
+    is_flag=True,
+    help="Check every key as `bipsea validate` would (slow).",
+)
+def unpack_cli(path, validate):
+    from .keypack import KeyPack
+
+    try:
+        with KeyPack(path, validate=validate) as pack:
+            for key in pack:
+                click.echo(str(key))
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint="PATH")
+
+
+@click.command(
+    name="addresses",
+    help="Stream the addresses of a range of an extended key's children.",
+)
+@click.option(
+    "-x",
+    "--xpub",
+    help="Extended public or private key (xprv works too). Pipe from `bipsea xprv`.",
+)
+@click.option(
+    "-p",
+    "--path",
+    default="m",
+    show_default=True,
+    help="Path below the key (its m) to the parent of the range, e.g. m/0 to receive.",
+)
+@click.option(
+    "-r",
+    "--range",
+    "range_",
+    default="0-19",
+    show_default=True,
+    help="Child numbers FIRST-LAST (inclusive) under --path.",
+)
+@click.option(
+    "-t",
+    "--type",
+    "address_type",
+    type=click.Choice(ADDRESS_TYPES),
+    default="p2wpkh",
+    show_default=True,
+)
+@click.option(
+    "-f",
+    "--format",
+    "format_",
+    type=click.Choice(["text", "jsonl"]),
+    default="text",
+    show_default=True,
+    help="text prints one address per line; jsonl adds each one's path.",
+)
+def addresses_cli(xpub, path, range_, address_type, format_):
+    from .addresses import derive_addresses, descend, parse_range
+    from .bip32 import to_derivation_path
+    from .bip32types import parse_ext_key
+
+    xpub = xpub.strip() if xpub else try_for_pipe_input()
+    no_empty_param("--xpub", xpub)
+    try:
+        key = parse_ext_key(xpub)
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint="--xpub (or pipe)")
+    try:
+        child_numbers = parse_range(range_)
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint="--range")
+    try:
+        parent_path = to_derivation_path(path)
+        parent = descend(key, parent_path)
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint="--path")
+
+    addresses = derive_addresses(parent, child_numbers, address_type)
+    for child_number, address in zip(child_numbers, addresses):
+        if format_ == "jsonl":
+            child_path = str(parent_path.child(child_number))
+            click.echo(json.dumps({"path": child_path, "address": address}))
+        else:
+            click.echo(address)
+
+
+@click.command(
+    name="search",
+    help="Find the indexes whose BIP-85 secret, or child key, matches a regex.",
+)
+@click.option(
+    "-a",
+    "--application",
+    type=click.Choice(APPLICATIONS.keys()),
+    help="Search the BIP-85 indexes of this application.",
+)
+@click.option(
+    "-c",
+    "--children",
+    metavar="PATH",
+    help="Search the unhardened children of the key at PATH below --xprv instead.",
+)
+@click.option(
+    "-m",
+    "--match",
+    "regex",
+    required=True,
+    help="Python regular expression that must match somewhere in the output.",
+)
+@click.option(
+    "--fingerprint",
+    is_flag=True,
+    help="Match the derived key's hex fingerprint instead of the output (or xpub).",
+)
+@click.option(
+    "-n",
+    "--number",
+    type=click.IntRange(min=1),
+    help="As for `bipsea derive`.",
+)
+@click.option(
+    "-s",
+    "--special",
+    default=10,
+    type=click.IntRange(min=2),
+    help="As for `bipsea derive`.",
+)
+@click.option(
+    "-x",
+    "--xprv",
+    help="Extended private master key (any extended key with --children).",
+)
+@click.option(
+    "-t",
+    "--to",
+    type=click.Choice(ENTROPY_TO_VALUES),
+    help="As for `bipsea derive`.",
+)
+@click.option(
+    "-r",
+    "--range",
+    "range_",
+    default=f"0-{2**31 - 1}",
+    show_default=True,
+    help="Indexes FIRST-LAST (inclusive), searched in order.",
+)
+@click.option(
+    "-l",
+    "--limit",
+    type=click.IntRange(min=0),
+    default=1,
+    show_default=True,
+    help="Stop after this many matches (0: no limit).",
+)
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Worker processes (0: this process).",
+)
+@click.option(
+    "--checkpoint",
+    type=click.Path(dir_okay=False),
+    help="Record progress in this file, and resume from it if it exists.",
+)
+def search_cli(
+    application,
+    children,
+    regex,
+    fingerprint,
+    number,
+    special,
+    xprv,
+    to,
+    range_,
+    limit,
+    workers,
+    checkpoint,
+):
+    from .addresses import descend, parse_range
+    from .bip32 import to_derivation_path
+    from .bip32types import parse_ext_key
+    from .search import BIP85Space, ChildSpace, Pattern, search, to_text
+
+    if (application is None) == (children is None):
+        raise click.UsageError("Pass one of --application and --children.")
+    xprv = xprv.strip() if xprv else try_for_pipe_input()
+    no_empty_param("--xprv", xprv)
+    try:
+        key = parse_ext_key(xprv)
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint="--xprv (or pipe)")
+    try:
+        indexes = parse_range(range_)
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint="--range")
+    try:
+        re.compile(regex)
+    except re.error as error:
+        raise click.BadParameter(str(error), param_hint="--match")
+    predicate = Pattern(regex, "fingerprint" if fingerprint else "output")
+
+    if application:
+        if not key.is_private():
+            raise click.BadParameter("Expected an xprv.", param_hint="--xprv (or pipe)")
+        if number is None:
+            number = DEFAULT_NUMBERS[application]
+        if application in RANGES:
+            check_range(number, application)
+        language = ISO_TO_LANGUAGE[to or "eng"]
+        space = BIP85Space(key, application, number, special, language)
     else:
-        output = apply_85(derived, path)["application"]
-    click.echo(output)
+        try:
+            parent_path = to_derivation_path(children)
+            space = ChildSpace(descend(key, parent_path))
+        except ValueError as error:
+            raise click.BadParameter(str(error), param_hint="--children")
+
+    progress = ProgressLines()
+    matches = search(
+        space,
+        predicate,
+        indexes.start,
+        indexes.stop,
+        limit or None,
+        workers,
+        checkpoint,
+        progress,
+    )
+    try:
+        for index, value in matches:
+            if application:
+                record = {"index": index, "path": value.path, "output": value.output}
+            else:
+                record = {
+                    "index": index,
+                    "path": str(parent_path.child(index)),
+                    "xpub": str(value),
+                    "fingerprint": to_text(value, "fingerprint"),
+                }
+            click.echo(json.dumps(record, ensure_ascii=False))
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    progress.done()
+
+
+@click.command(
+    name="find",
+    help=(
+        "Find the index at which a path template derives TARGET from --xprv, or"
+        " every index at which it derives one of the --targets."
+    ),
+)
+@click.argument("target", required=False)
+@click.option(
+    "-p",
+    "--path",
+    "template",
+    required=True,
+    help="Derivation path with * (or *') for the index, e.g. m/84'/0'/*'.",
+)
+@click.option(
+    "-x",
+    "--xprv",
+    help="Extended private master key. Pipe from `bipsea xprv`.",
+)
+@click.option(
+    "-r",
+    "--range",
+    "range_",
+    default=f"0-{2**20 - 1}",
+    show_default=True,
+    help="Indexes FIRST-LAST (inclusive) to try, in order.",
+)
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Worker processes (0: this process).",
+)
+@click.option(
+    "--checkpoint",
+    type=click.Path(dir_okay=False),
+    help="Record progress in this file, and resume from it if it exists.",
+)
+@click.option(
+    "--targets",
+    type=click.Path(exists=True, dir_okay=False),
+    help="File of addresses, public keys, or hex programs, one a line (see bloom).",
+)
+@click.option(
+    "-t",
+    "--type",
+    "address_type",
+    type=click.Choice(ADDRESS_TYPES),
+    default="p2wpkh",
+    show_default=True,
+    help="Address type of the --targets.",
+)
+def find_cli(
+    target, template, xprv, range_, workers, checkpoint, targets, address_type
+):
+    from .addresses import parse_range
+    from .bip32types import parse_ext_key
+    from .bloom import BloomFilter, read_targets
+    from .reverse import Template, confirm_all, find, find_all, to_target
+
+    if (target is None) == (targets is None):
+        raise click.UsageError("Expected one of TARGET and --targets")
+    xprv = xprv.strip() if xprv else try_for_pipe_input()
+    no_empty_param("--xprv", xprv)
+    try:
+        master = parse_ext_key(xprv)
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint="--xprv (or pipe)")
+    try:
+        indexes = parse_range(range_)
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint="--range")
+    try:
+        template = Template.parse(template)
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint="--path")
+    if targets:
+        try:
+            bloom = BloomFilter.from_file(targets)
+        except ValueError as error:
+            raise click.BadParameter(str(error), param_hint="--targets")
+    else:
+        try:
+            target = to_target(target)
+        except ValueError as error:
+            raise click.BadParameter(str(error), param_hint="TARGET")
+
+    progress = ProgressLines()
+    if targets:
+        try:
+            candidates = find_all(
+                master,
+                bloom,
+                template,
+                indexes.start,
+                indexes.stop,
+                None,
+                workers,
+                checkpoint,
+                progress,
+                address_type=address_type,
+            )
+            matches = confirm_all(candidates, read_targets(targets), address_type)
+        except ValueError as error:
+            raise click.ClickException(str(error))
+        progress.done()
+        if not matches:
+            raise click.ClickException(f"Not found at {template} for indexes {range_}")
+        for match in matches:
+            path = str(template.path(match.index))
+            click.echo(json.dumps({"index": match.index, "path": path}))
+        return
+
+    try:
+        match = find(
+            master,
+            target,
+            template,
+            indexes.start,
+            indexes.stop,
+            workers,
+            checkpoint,
+            progress,
+        )
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    progress.done()
+    if match is None:
+        raise click.ClickException(f"Not found at {template} for indexes {range_}")
+    path = str(template.path(match.index))
+    click.echo(json.dumps({"index": match.index, "path": path}))
+
+
+@click.command(
+    name="serve",
+    help="Answer bipsea commands over a Unix socket, keeping caches warm. Use `bipsea client`.",
+)
+@click.option(
+    "-s",
+    "--socket",
+    "socket_path",
+    required=True,
+    envvar="BIPSEA_SOCKET",
+    help="Path of the Unix domain socket (or $BIPSEA_SOCKET).",
+)
+def serve_cli(socket_path):
+    from .serve import Server
+
+    # exit through KeyboardInterrupt on SIGTERM too, so the socket gets unlinked
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server = Server(socket_path, cli)
+    except OSError as error:
+        raise click.ClickException(str(error))
+    with server:
+        click.secho(f"Listening on {socket_path}", err=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+@click.command(
+    name="client",
+    help="Run a bipsea command (e.g. `derive -a hex`) on a `bipsea serve` daemon.",
+    context_settings={
+        "ignore_unknown_options": True,
+        "allow_interspersed_args": False,
+    },
+)
+@click.option(
+    "-s",
+    "--socket",
+    "socket_path",
+    required=True,
+    envvar="BIPSEA_SOCKET",
+    help="Path of the daemon's Unix domain socket (or $BIPSEA_SOCKET).",
+)
+@click.argument("args", nargs=-1, type=click.UNPROCESSED)
+def client_cli(socket_path, args):
+    from .serve import request
+
+    try:
+        response = request(socket_path, list(args), stdin=sys.stdin)
+    except OSError as error:
+        raise click.BadParameter(str(error), param_hint="--socket")
+    click.echo(response["stdout"], nl=False)
+    click.echo(response["stderr"], nl=False, err=True)
+    sys.exit(response["exit_code"])
+
+
+@click.command(
+    name="bench",
+    help="Time bipsea's hot paths on this machine: ops/s, latency percentiles, memory.",
+)
+@click.option(
+    "-k",
+    "--pattern",
+    help="Only run cases whose name matches this regular expression.",
+)
+@click.option(
+    "-t",
+    "--time",
+    "min_time",
+    type=click.FloatRange(min=0),
+    default=0.5,
+    show_default=True,
+    help="Minimum seconds per case.",
+)
+@click.option(
+    "-f",
+    "--format",
+    "format_",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    help="json includes the bipsea version and host, to compare runs.",
+)
+def bench_cli(pattern, min_time, format_):
+    from .bench import environment, run
+
+    try:
+        re.compile(pattern or "")
+    except re.error as error:
+        raise click.BadParameter(str(error), param_hint="--pattern")
+    results = run(pattern, min_time)
+    if format_ == "json":
+        click.echo(
+            json.dumps(
+                {
+                    "environment": environment(),
+                    "results": [r._asdict() for r in results],
+                },
+                indent=2,
+            )
+        )
+        return
+
+    click.echo(
+        f"{'case':<26}{'ops/s':>12}{'p50 us':>12}{'p90 us':>12}"
+        f"{'p99 us':>12}{'peak KiB':>10}"
+    )
+    for r in results:
+        click.echo(
+            f"{r.name:<26}{r.ops_per_sec:>12,.1f}{r.p50:>12,.1f}{r.p90:>12,.1f}"
+            f"{r.p99:>12,.1f}{r.peak_memory / 1024:>10,.1f}"
+        )
 
 
 @click.group()
 @click.version_option(version=__version__, prog_name=__app_name__)
-def cli():
-    pass
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Print a breakdown of time per stage (and EC multiplications, cache hits) to stderr.",
+)
+@click.option(
+    "--pstats",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write cProfile stats to this file. Read with `python -m pstats`.",
+)
+@click.pass_context
+def cli(ctx, profile, pstats):
+    if profile:
+        from . import instrument
+
+        instrument.enable()
+        ctx.call_on_close(instrument.disable)
+        ctx.call_on_close(lambda: click.echo(instrument.report(), err=True))
+    if pstats:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        ctx.call_on_close(lambda: profiler.dump_stats(pstats))
+        ctx.call_on_close(profiler.disable)
+        profiler.enable()
 
 
 cli.add_command(mnemonic)
 cli.add_command(validate)
 cli.add_command(xprv)
 cli.add_command(derive_cli)
+cli.add_command(vault_cli)
+cli.add_command(addresses_cli)
+cli.add_command(search_cli)
+cli.add_command(find_cli)
+cli.add_command(pack_cli)
+cli.add_command(unpack_cli)
+cli.add_command(serve_cli)
+cli.add_command(client_cli)
+cli.add_command(bench_cli)
+
+
+def run_batch(command, function, keys, workers, **defaults):
+    """stream JSONL results for the records on stdin (see batch.py); keys are the
+    (input, output) record keys; exits 1 if any record failed"""
+    from .batch import process_records, read_records
+
+    main, output = keys
+    records = read_records(sys.stdin, command, main, defaults)
+    failed = False
+    for result in process_records(function, records, output, get_warm(), workers):
+        failed = failed or "error" in result
+        click.echo(json.dumps(result, ensure_ascii=False))
+    if failed:
+        click.get_current_context().exit(1)
+
+
+class ProgressLines:
+    """search.Progress callback: a stderr line every PROGRESS_INTERVAL seconds,
+    and the last one on done()"""
+
+    def __init__(self):
+        self.last = None
+        self.shown = time.monotonic()
+
+    def __call__(self, progress):
+        self.last = progress
+        if time.monotonic() - self.shown >= PROGRESS_INTERVAL:
+            self.shown = time.monotonic()
+            click.echo(str(progress), err=True)
+
+    def done(self):
+        if self.last:
+            click.echo(str(self.last), err=True)
+
+
+def get_warm():
+    """daemon caches (see serve.Warm) when running under `bipsea serve`, else None"""
+    ctx = click.get_current_context(silent=True)
+
+    return ctx.obj if ctx else None
 
 
 def check_range(number: int, application: str):
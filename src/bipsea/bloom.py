@@ -0,0 +1,161 @@
+"""
+Bloom filter of target keys for scans over many derived children.
+
+A Python set of 1M 20-byte hashes takes about 87 MB; a BloomFilter of the same
+keys takes -log2(error_rate) * 1.44 bits a key: 1.2 MB at 1% false positives,
+1.8 MB at 0.1%, 2.4 MB at 0.01%. No false negatives, so scan() yields every child whose key is a
+target, plus about error_rate of the rest; confirm() weeds those out exactly in
+one more pass over the targets, which only has to hold the (few) candidates.
+
+Targets are the programs that addresses encode (addresses.to_programs): HASH160
+of the public key for p2pkh and p2wpkh, the output key for p2tr. read_targets()
+turns lines of addresses, public keys (as HASH160s, so for p2pkh and p2wpkh
+scans), or hex programs into them.
+"""
+
+import hashlib
+import logging
+import math
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple
+
+from .addresses import decode_address, to_programs
+from .bip32 import derive_public_points
+from .bip32types import ExtendedKey
+from .hash160 import hash160
+from .util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+ERROR_RATE = 0.001
+CHUNK_SIZE = 256
+
+
+class BloomFilter:
+    """about error_rate false positives once capacity keys are in; more keys
+    raise the rate (see estimated_error_rate)"""
+
+    def __init__(self, capacity: int, error_rate: float = ERROR_RATE):
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError(
+                f"Invalid capacity or error rate: {capacity}, {error_rate}"
+            )
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def from_keys(
+        cls, keys: Iterable[bytes], error_rate: float = ERROR_RATE
+    ) -> "BloomFilter":
+        keys = list(keys)
+        bloom = cls(max(1, len(keys)), error_rate)
+        bloom.update(keys)
+
+        return bloom
+
+    @classmethod
+    def from_file(cls, path: str, error_rate: float = ERROR_RATE) -> "BloomFilter":
+        """targets in a read_targets() file, read twice (to count, then to add)
+        rather than held in memory"""
+        bloom = cls(max(1, sum(1 for _ in read_targets(path))), error_rate)
+        bloom.update(read_targets(path))
+
+        return bloom
+
+    def add(self, key: bytes):
+        bits = self.bits
+        for index in self._indexes(key):
+            bits[index >> 3] |= 1 << (index & 7)
+        self.count += 1
+
+    def update(self, keys: Iterable[bytes]):
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: bytes) -> bool:
+        bits = self.bits
+        return all(bits[i >> 3] >> (i & 7) & 1 for i in self._indexes(key))
+
+    def __repr__(self) -> str:
+        """stable across processes, so it can identify a search (see search)"""
+        digest = hashlib.sha256(self.bits).hexdigest()
+        return (
+            f"BloomFilter(size={self.size}, hashes={self.hashes},"
+            f" count={self.count}, sha256={digest})"
+        )
+
+    def __len__(self) -> int:
+        """keys added (with repeats)"""
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.bits)
+
+    def estimated_error_rate(self) -> float:
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+    def _indexes(self, key: bytes) -> Iterator[int]:
+        # Kirsch-Mitzenmacher: h1 + i * h2 for i < hashes is as good as k hashes
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return ((h1 + i * h2) % size for i in range(self.hashes))
+
+
+def scan(
+    parent: ExtendedKey,
+    child_numbers: Iterable[int],
+    targets: BloomFilter,
+    address_type: str = "p2wpkh",
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[Tuple[int, bytes]]:
+    """(child number, program) for each of parent's children that may be a
+    target; confirm() the candidates"""
+    child_numbers = iter(child_numbers)
+    while True:
+        chunk = list(islice(child_numbers, chunk_size))
+        if not chunk:
+            return
+        programs = to_programs(derive_public_points(parent, chunk), address_type)
+        for child_number, program in zip(chunk, programs):
+            if program in targets:
+                yield child_number, program
+
+
+def confirm(
+    candidates: Iterable[Tuple[int, bytes]], targets: Iterable[bytes]
+) -> List[Tuple[int, bytes]]:
+    """the candidates whose programs are among targets (streamed once)"""
+    candidates = list(candidates)
+    wanted = {program for _, program in candidates}
+    found = {target for target in targets if target in wanted}
+
+    return [c for c in candidates if c[1] in found]
+
+
+def read_targets(path: str) -> Iterator[bytes]:
+    """one target per line: an address, a compressed public key (66 hex digits),
+    or a hex program (40 or 64 digits); blank lines and # comments are skipped"""
+    with open(path) as file:
+        for number, line in enumerate(file, 1):
+            line = line.split("#")[0].strip()
+            if line:
+                try:
+                    yield to_target(line)
+                except ValueError as error:
+                    raise ValueError(f"{path} line {number}: {error}")
+
+
+def to_target(text: str) -> bytes:
+    if len(text) in (40, 64, 66) and all(c in "0123456789abcdefABCDEF" for c in text):
+        data = bytes.fromhex(text)
+        return hash160(data) if len(data) == 33 else data
+
+    return decode_address(text)[2]
@@ -0,0 +1,85 @@
+"""
+Bulk BIP-85 DRNG output for NumPy consumers. Requires numpy (`pip install numpy`).
+
+The stream is exactly the BIP-85 DRNG (SHAKE-256 of the entropy), squeezed in large
+blocks straight into preallocated arrays. hashlib can only squeeze from the start,
+so if pycryptodome is installed we use its incremental SHAKE-256, which keeps the
+cost of a block independent of how far into the stream we are.
+
+numpy only lets C/Cython code subclass BitGenerator, so we offer the bulk
+equivalents of BitGenerator.random_raw and Generator.random instead.
+"""
+
+import logging
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from .bip32types import ExtendedKey
+from .bip85 import APPLICATIONS, DRNG, PURPOSE_CODES, derive, to_entropy
+from .util import LOGGER_NAME
+
+try:
+    from Crypto.Hash import SHAKE256
+except ImportError:
+    SHAKE256 = None
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+BLOCK_SIZE = 2**20  # bytes squeezed per call
+
+Size = Optional[Union[int, Tuple[int, ...]]]
+
+
+class NumpyDRNG:
+    def __init__(self, seed: bytes, block_size: int = BLOCK_SIZE):
+        if len(seed) != 64:
+            raise ValueError("Seed must be exactly 64 bytes long")
+        self.block_size = block_size
+        if SHAKE256 is None:
+            self._squeeze = DRNG(seed).read
+        else:
+            self._squeeze = SHAKE256.new(seed).read
+        self.cursor = 0
+
+    @classmethod
+    def from_master(cls, master: ExtendedKey, index: int = 0, **kwargs) -> "NumpyDRNG":
+        """DRNG at the BIP-85 spec path m/83696968'/0'/{index}'
+        (`bipsea derive -a drng` nests one level deeper, at .../0'/0'/{index}')"""
+        path = f"m/{PURPOSE_CODES['BIP-85']}/{APPLICATIONS['drng']}/{index}'"
+        derived = derive(master, path)
+
+        return cls(to_entropy(derived.data[1:]), **kwargs)
+
+    def fill(self, out: np.ndarray) -> np.ndarray:
+        """overwrite the memory of a C-contiguous array with the next out.nbytes
+        bytes of the stream (values are in native byte order)"""
+        if not (out.flags.c_contiguous and out.flags.writeable):
+            raise ValueError("Expected a writeable, C-contiguous array")
+        view = out.reshape(-1).view(np.uint8)
+        for start in range(0, view.size, self.block_size):
+            stop = min(start + self.block_size, view.size)
+            view[start:stop] = np.frombuffer(self._squeeze(stop - start), np.uint8)
+        self.cursor += view.size
+
+        return out
+
+    def read(self, n: int) -> bytes:
+        """same as DRNG.read"""
+        return self.fill(np.empty(n, np.uint8)).tobytes()
+
+    def random_raw(self, size: Size = None) -> Union[int, np.ndarray]:
+        """uint64s, each from the next 8 bytes of the stream read as little-endian"""
+        raw = self.fill(np.empty(1 if size is None else size, np.dtype("<u8")))
+        raw = raw.astype(np.uint64, copy=False)
+
+        return int(raw[0]) if size is None else raw
+
+    def random(self, size: Size = None) -> Union[float, np.ndarray]:
+        """floats in [0, 1) from the top 53 bits of each random_raw"""
+        floats = (self.random_raw(1 if size is None else size) >> np.uint64(11)) * (
+            2.0**-53
+        )
+
+        return float(floats.reshape(-1)[0]) if size is None else floats
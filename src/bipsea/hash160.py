@@ -0,0 +1,179 @@
+"""
+HASH160 (RIPEMD-160 of SHA-256), as in BIP-32 key fingerprints.
+
+hashlib's RIPEMD-160 comes from OpenSSL, and OpenSSL 3 only has it in the legacy
+provider, which many builds leave out. We check once, at import, and fall back to
+the pure-Python RIPEMD-160 below: slower than OpenSSL but the same digest, on
+every host.
+https://homes.esat.kuleuven.be/~bosselae/ripemd160/pdf/AB-9601/AB-9601.pdf
+"""
+
+import hashlib
+import logging
+import struct
+from typing import Iterable, List
+
+from .util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+M = 0xFFFFFFFF
+INITIAL = (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476, 0xC3D2E1F0)
+# message word and left rotation for each of the 80 steps, left and right lines
+R_LEFT = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15)
+    + (7, 4, 13, 1, 10, 6, 15, 3, 12, 0, 9, 5, 2, 14, 11, 8)
+    + (3, 10, 14, 4, 9, 15, 8, 1, 2, 7, 0, 6, 13, 11, 5, 12)
+    + (1, 9, 11, 10, 0, 8, 12, 4, 13, 3, 7, 15, 14, 5, 6, 2)
+    + (4, 0, 5, 9, 7, 12, 2, 10, 14, 1, 3, 8, 11, 6, 15, 13)
+)
+R_RIGHT = (
+    (5, 14, 7, 0, 9, 2, 11, 4, 13, 6, 15, 8, 1, 10, 3, 12)
+    + (6, 11, 3, 7, 0, 13, 5, 10, 14, 15, 8, 12, 4, 9, 1, 2)
+    + (15, 5, 1, 3, 7, 14, 6, 9, 11, 8, 12, 2, 10, 0, 4, 13)
+    + (8, 6, 4, 1, 3, 11, 15, 0, 5, 12, 2, 13, 9, 7, 10, 14)
+    + (12, 15, 10, 4, 1, 5, 8, 7, 6, 2, 13, 14, 0, 3, 9, 11)
+)
+S_LEFT = (
+    (11, 14, 15, 12, 5, 8, 7, 9, 11, 13, 14, 15, 6, 7, 9, 8)
+    + (7, 6, 8, 13, 11, 9, 7, 15, 7, 12, 15, 9, 11, 7, 13, 12)
+    + (11, 13, 6, 7, 14, 9, 13, 15, 14, 8, 13, 6, 5, 12, 7, 5)
+    + (11, 12, 14, 15, 14, 15, 9, 8, 9, 14, 5, 6, 8, 6, 5, 12)
+    + (9, 15, 5, 11, 6, 8, 13, 12, 5, 12, 13, 14, 11, 8, 5, 6)
+)
+S_RIGHT = (
+    (8, 9, 9, 11, 13, 15, 15, 5, 7, 7, 8, 11, 14, 14, 12, 6)
+    + (9, 13, 15, 7, 12, 8, 9, 11, 7, 7, 12, 7, 6, 15, 13, 11)
+    + (9, 7, 15, 11, 8, 6, 6, 14, 12, 13, 5, 14, 13, 13, 7, 5)
+    + (15, 5, 8, 11, 14, 14, 6, 14, 6, 9, 12, 9, 12, 5, 15, 8)
+    + (8, 5, 12, 9, 12, 5, 14, 6, 8, 13, 6, 5, 15, 13, 11, 11)
+)
+K_LEFT = (0x00000000, 0x5A827999, 0x6ED9EBA1, 0x8F1BBCDC, 0xA953FD4E)
+K_RIGHT = (0x50A28BE6, 0x5C4DD124, 0x6D703EF3, 0x7A6D76E9, 0x00000000)
+
+
+def _rounds(words, rotations):
+    """(word, rotation) pairs in 5 rounds of 16 steps"""
+    steps = iter(zip(words, rotations))
+    return tuple(zip(*[steps] * 16))
+
+
+STEPS = tuple(zip(_rounds(R_LEFT, S_LEFT), _rounds(R_RIGHT, S_RIGHT)))
+
+
+def native_ripemd160():
+    """an empty hashlib RIPEMD-160 object to copy(), or None if OpenSSL has none"""
+    try:
+        return hashlib.new("ripemd160")
+    except ValueError:  # unsupported hash type
+        return None
+
+
+_native = native_ripemd160()
+NATIVE_RIPEMD160 = _native is not None
+if not NATIVE_RIPEMD160:  # pragma: no cover
+    logger.debug("hashlib has no RIPEMD-160; using the pure-Python one")
+
+
+def hash160(data: bytes) -> bytes:
+    return ripemd160(hashlib.sha256(data).digest())
+
+
+def hash160_many(items: Iterable[bytes]) -> List[bytes]:
+    """[hash160(d) for d in items] without per-call lookups"""
+    sha256 = hashlib.sha256
+    if _native is None:  # pragma: no cover
+        digest = python_ripemd160
+        return [digest(sha256(data).digest()) for data in items]
+    hashes = []
+    for data in items:
+        ripemd = _native.copy()
+        ripemd.update(sha256(data).digest())
+        hashes.append(ripemd.digest())
+
+    return hashes
+
+
+def ripemd160(data: bytes) -> bytes:
+    if _native is None:  # pragma: no cover
+        return python_ripemd160(data)
+    ripemd = _native.copy()
+    ripemd.update(data)
+
+    return ripemd.digest()
+
+
+def python_ripemd160(data: bytes) -> bytes:
+    """pure-Python RIPEMD-160"""
+    data = bytes(data)
+    length = struct.pack("<Q", 8 * len(data))
+    padded = data + b"\x80" + bytes((55 - len(data)) % 64) + length
+    state = INITIAL
+    for start in range(0, len(padded), 64):
+        end = start + 64
+        state = _compress(state, struct.unpack("<16I", padded[start:end]))
+
+    return struct.pack("<5I", *state)
+
+
+def _compress(state, x):
+    """one 64-byte block (16 little-endian words x); each round inlines its
+    boolean functions: f(x, y, z) is, by round,
+        x ^ y ^ z, (x & y) | (~x & z), (x | ~y) ^ z, (x & z) | (y & ~z), x ^ (y | ~z)
+    with the left line using them in that order and the right line in reverse"""
+    al, bl, cl, dl, el = ar, br, cr, dr, er = state
+    left, right = STEPS[0]
+    kr = K_RIGHT[0]
+    for (i, s), (j, u) in zip(left, right):
+        t = (al + (bl ^ cl ^ dl) + x[i]) & M
+        al, el, dl, cl = el, dl, (cl << 10 | cl >> 22) & M, bl
+        bl = ((t << s | t >> (32 - s)) + al) & M
+        t = (ar + (br ^ (cr | (dr ^ M))) + x[j] + kr) & M
+        ar, er, dr, cr = er, dr, (cr << 10 | cr >> 22) & M, br
+        br = ((t << u | t >> (32 - u)) + ar) & M
+    left, right = STEPS[1]
+    kl, kr = K_LEFT[1], K_RIGHT[1]
+    for (i, s), (j, u) in zip(left, right):
+        t = (al + (dl ^ (bl & (cl ^ dl))) + x[i] + kl) & M
+        al, el, dl, cl = el, dl, (cl << 10 | cl >> 22) & M, bl
+        bl = ((t << s | t >> (32 - s)) + al) & M
+        t = (ar + (cr ^ (dr & (br ^ cr))) + x[j] + kr) & M
+        ar, er, dr, cr = er, dr, (cr << 10 | cr >> 22) & M, br
+        br = ((t << u | t >> (32 - u)) + ar) & M
+    left, right = STEPS[2]
+    kl, kr = K_LEFT[2], K_RIGHT[2]
+    for (i, s), (j, u) in zip(left, right):
+        t = (al + ((bl | (cl ^ M)) ^ dl) + x[i] + kl) & M
+        al, el, dl, cl = el, dl, (cl << 10 | cl >> 22) & M, bl
+        bl = ((t << s | t >> (32 - s)) + al) & M
+        t = (ar + ((br | (cr ^ M)) ^ dr) + x[j] + kr) & M
+        ar, er, dr, cr = er, dr, (cr << 10 | cr >> 22) & M, br
+        br = ((t << u | t >> (32 - u)) + ar) & M
+    left, right = STEPS[3]
+    kl, kr = K_LEFT[3], K_RIGHT[3]
+    for (i, s), (j, u) in zip(left, right):
+        t = (al + (cl ^ (dl & (bl ^ cl))) + x[i] + kl) & M
+        al, el, dl, cl = el, dl, (cl << 10 | cl >> 22) & M, bl
+        bl = ((t << s | t >> (32 - s)) + al) & M
+        t = (ar + (dr ^ (br & (cr ^ dr))) + x[j] + kr) & M
+        ar, er, dr, cr = er, dr, (cr << 10 | cr >> 22) & M, br
+        br = ((t << u | t >> (32 - u)) + ar) & M
+    left, right = STEPS[4]
+    kl = K_LEFT[4]
+    for (i, s), (j, u) in zip(left, right):
+        t = (al + (bl ^ (cl | (dl ^ M))) + x[i] + kl) & M
+        al, el, dl, cl = el, dl, (cl << 10 | cl >> 22) & M, bl
+        bl = ((t << s | t >> (32 - s)) + al) & M
+        t = (ar + (br ^ cr ^ dr) + x[j]) & M
+        ar, er, dr, cr = er, dr, (cr << 10 | cr >> 22) & M, br
+        br = ((t << u | t >> (32 - u)) + ar) & M
+    h0, h1, h2, h3, h4 = state
+
+    return (
+        (h1 + cl + dr) & M,
+        (h2 + dl + er) & M,
+        (h3 + el + ar) & M,
+        (h4 + al + br) & M,
+        (h0 + bl + cr) & M,
+    )
@@ -0,0 +1,222 @@
+"""
+Opt-in timing of bipsea's stages (`bipsea --profile ...`).
+
+enable() swaps timing wrappers in for the functions in STAGES, wherever bipsea
+modules refer to them, and disable() puts the originals back. Disabled (the
+default) nothing is wrapped, so instrumentation costs nothing at all.
+Each stage records calls, total time, and self time (total less nested stages,
+tracked per thread, so threaded callers such as `bipsea serve` time correctly).
+Calls of the stages in EC_MULTIPLY count EC scalar multiplications, once per
+outermost call: multiply_add(a, q) is one, though it calls multiply_g. The lru caches in CACHES report their hits and misses.
+"""
+
+import importlib
+import logging
+import sys
+import threading
+import time
+from functools import wraps
+from typing import Dict, List, Tuple
+
+from .util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+# (module, attribute); attributes may be Class.method
+STAGES = (
+    ("bipsea.bip39", "to_master_seed"),
+    ("bipsea.bip39", "entropy_to_words"),
+    ("bipsea.bip39", "validate_mnemonic_words"),
+    ("bipsea.bip39", "read_words"),
+    ("bipsea.bip32", "to_master_key"),
+    ("bipsea.bip32", "derive_key"),
+    ("bipsea.bip32", "CKDpriv"),
+    ("bipsea.bip32", "CKDpub"),
+    ("bipsea.bip32", "N"),
+    ("bipsea.bip32", "to_public_key"),
+    ("bipsea.bip32", "fingerprint"),
+    ("bipsea.bip32", "public_fingerprint"),
+    ("bipsea.bip32", "hmac_sha512"),
+    ("bipsea.bip32", "DerivationCache.get"),
+    ("bipsea.bip32", "DerivationCache.put"),
+    ("bipsea.bip32", "derive_public_children"),
+    ("bipsea.bip32", "to_public_keys"),
+    ("bipsea.bip32", "derive_public_points"),
+    ("bipsea.addresses", "taproot_output_keys"),
+    ("bipsea.hash160", "hash160_many"),
+    ("bipsea.bip32types", "parse_ext_key"),
+    ("bipsea.bip32types", "validate_prv_str"),
+    ("bipsea.bip32types", "ExtendedKey.__str__"),
+    ("bipsea.bip85", "derive_application"),
+    ("bipsea.bip85", "derive_full"),
+    ("bipsea.bip85", "apply_85"),
+    ("bipsea.bip85", "to_entropy"),
+    ("bipsea.bip85", "DRNG.read"),
+    ("bipsea.rsa", "generate"),
+    ("base58", "b58decode_check"),
+    ("base58", "b58encode_check"),
+    ("bipsea.secp256k1", "multiply_g"),
+    ("bipsea.secp256k1", "multiply_add"),
+    ("bipsea.secp256k1", "to_affine_many"),
+    ("bipsea.secp256k1", "decompress"),
+    ("bipsea.secp256k1", "window_table"),
+    ("ecdsa.keys", "SigningKey.from_string"),
+    ("ecdsa.keys", "VerifyingKey.from_string"),
+    ("ecdsa.ellipticcurve", "PointJacobi.__mul__"),
+    ("ecdsa.ellipticcurve", "Point.__mul__"),
+)
+EC_MULTIPLY = (
+    "bipsea.secp256k1.multiply_g",
+    "bipsea.secp256k1.multiply_add",
+    "ecdsa.ellipticcurve.PointJacobi.__mul__",
+    "ecdsa.ellipticcurve.Point.__mul__",
+)
+CACHES = (
+    ("bipsea.bip32", "keyed_hmac_sha512"),
+    ("bipsea.bip32types", "_parse_path"),
+    ("bipsea.bip39", "read_words"),
+    ("bipsea.bip39", "word_indexes"),
+    ("bipsea.secp256k1", "_decompress"),
+)
+
+# name -> [calls, total ns, self ns, calls outside EC_MULTIPLY stages]
+stats: Dict[str, List[int]] = {}
+_stats_lock = threading.Lock()
+# (owner, attribute, original) to undo
+_patches: List[Tuple[object, str, object]] = []
+# name -> (module, attribute, (hits, misses) at enable())
+_caches: Dict[str, Tuple[str, str, Tuple[int, int]]] = {}
+_started = 0
+
+
+class _Local(threading.local):
+    def __init__(self):
+        # time spent in nested stages, per open stage
+        self.stack: List[int] = []
+        # open EC_MULTIPLY stages
+        self.multiplying = 0
+
+
+_local = _Local()
+
+
+def enabled() -> bool:
+    return bool(_patches)
+
+
+def enable():
+    """start timing (and reset the previous stats)"""
+    global _started
+    if enabled():
+        disable()
+    stats.clear()
+    _caches.clear()
+    for module_name, attribute in STAGES:
+        module = importlib.import_module(module_name)
+        owner, name = _resolve(module, attribute)
+        raw = owner.__dict__[name] if isinstance(owner, type) else getattr(owner, name)
+        wrapped = _wrap(raw, f"{module_name}.{attribute}")
+        _patch(owner, name, wrapped)
+        if not isinstance(owner, type):
+            # also where bipsea modules imported the function by name
+            for other in list(sys.modules.values()):
+                other_name = getattr(other, "__name__", "")
+                if other is not owner and other_name.startswith("bipsea"):
+                    for key, value in list(vars(other).items()):
+                        if value is raw:
+                            _patch(other, key, wrapped)
+    for module_name, attribute in CACHES:
+        info = _cache_info(module_name, attribute)
+        _caches[f"{module_name}.{attribute}"] = (module_name, attribute, info)
+    _started = time.perf_counter_ns()
+
+
+def disable():
+    while _patches:
+        owner, name, original = _patches.pop()
+        setattr(owner, name, original)
+    _local.__init__()
+
+
+def report() -> str:
+    """breakdown of the time since enable(), slowest stages first"""
+    wall = time.perf_counter_ns() - _started
+    lines = [f"{'stage':<46}{'calls':>8}{'total ms':>11}{'self ms':>10}{'self %':>8}"]
+    for name, (calls, total, own, _) in sorted(stats.items(), key=lambda s: -s[1][1]):
+        if not calls:
+            continue
+        lines.append(
+            f"{name:<46}{calls:>8}{total / 1e6:>11.2f}{own / 1e6:>10.2f}"
+            f"{100 * own / wall if wall else 0:>8.1f}"
+        )
+    lines.append(f"{'wall':<46}{'':>8}{wall / 1e6:>11.2f}")
+    lines.append("")
+    lines.append(f"EC scalar multiplications: {count(EC_MULTIPLY)}")
+    for name, (module_name, attribute, (hits, misses)) in _caches.items():
+        now_hits, now_misses = _cache_info(module_name, attribute)
+        lines.append(
+            f"{name} cache: {now_hits - hits} hits, {now_misses - misses} misses"
+        )
+
+    return "\n".join(lines)
+
+
+def count(names) -> int:
+    """calls of names, less those nested in EC_MULTIPLY stages"""
+    return sum(stats[name][3] for name in names if name in stats)
+
+
+def _wrap(raw, name: str):
+    if isinstance(raw, (classmethod, staticmethod)):
+        return type(raw)(_wrap(raw.__func__, name))
+    stat = stats.setdefault(name, [0, 0, 0, 0])
+    multiplies = int(name in EC_MULTIPLY)
+
+    @wraps(raw)
+    def timed(*args, **kwargs):
+        local = _local
+        stack = local.stack
+        outside = not local.multiplying
+        local.multiplying += multiplies
+        stack.append(0)
+        start = time.perf_counter_ns()
+        try:
+            return raw(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            nested = stack.pop()
+            local.multiplying -= multiplies
+            if stack:
+                stack[-1] += elapsed
+            with _stats_lock:
+                stat[0] += 1
+                stat[1] += elapsed
+                stat[2] += elapsed - nested
+                stat[3] += outside
+
+    return timed
+
+
+def _patch(owner, name: str, value):
+    original = owner.__dict__[name] if isinstance(owner, type) else getattr(owner, name)
+    _patches.append((owner, name, original))
+    setattr(owner, name, value)
+
+
+def _resolve(module, attribute: str):
+    owner = module
+    *path, name = attribute.split(".")
+    for part in path:
+        owner = getattr(owner, part)
+
+    return owner, name
+
+
+def _cache_info(module_name: str, attribute: str) -> Tuple[int, int]:
+    function = getattr(importlib.import_module(module_name), attribute)
+    while not hasattr(function, "cache_info"):
+        function = function.__wrapped__  # our timing wrapper
+    info = function.cache_info()
+
+    return info.hits, info.misses
@@ -0,0 +1,104 @@
+"""
+Packed files of extended keys: a header, then fixed-width raw records.
+
+    header   MAGIC (6 bytes), FORMAT_VERSION (1), flags (1; bit 0: checksums)
+    records  78 bytes each (ExtendedKey.to_raw()), or 82 with checksums
+
+KeyPack mmaps the file, so records are memoryview slices of the page cache:
+nothing is copied or base58-decoded until a record is parsed, and any number of
+processes can share one file. Keys come back unvalidated (the EC point check is
+the expensive part of parsing); the checksums catch corruption.
+"""
+
+import logging
+import mmap
+from typing import BinaryIO, Iterable, Iterator
+
+from .bip32types import CHECKSUM_SIZE, RAW_KEY_SIZE, ExtendedKey, parse_raw_key
+from .util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+MAGIC = b"BIPSEA"
+FORMAT_VERSION = 1
+CHECKSUMS = 0x01
+HEADER_SIZE = len(MAGIC) + 2
+
+
+def header(checksum: bool) -> bytes:
+    return MAGIC + bytes([FORMAT_VERSION, CHECKSUMS if checksum else 0])
+
+
+def write_keys(
+    file: BinaryIO, keys: Iterable[ExtendedKey], checksum: bool = True
+) -> int:
+    """file must be opened in binary mode; returns the number of keys written"""
+    file.write(header(checksum))
+    count = 0
+    for key in keys:
+        file.write(key.to_raw(checksum))
+        count += 1
+
+    return count
+
+
+class KeyPack:
+    def __init__(self, path: str, validate: bool = False):
+        """validate checks each key as parse_ext_key does (slow)"""
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        self.validate = validate
+        try:
+            head = bytes(self._view[:HEADER_SIZE])
+            if len(head) < HEADER_SIZE or not head.startswith(MAGIC):
+                raise ValueError(f"Not a bipsea key pack: {path}")
+            version, flags = head[-2:]
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported key pack version: {version}")
+            self.checksum = bool(flags & CHECKSUMS)
+            self.record_size = RAW_KEY_SIZE + CHECKSUM_SIZE * self.checksum
+            body = len(self._view) - HEADER_SIZE
+            if body % self.record_size:
+                raise ValueError(f"Truncated key pack: {path}")
+        except ValueError:
+            self.close()
+            raise
+        self._count = body // self.record_size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def record(self, index: int) -> memoryview:
+        """raw bytes of one key (with checksum, if any), without copying"""
+        if not (-self._count <= index < self._count):
+            raise IndexError("KeyPack index out of range")
+        start = HEADER_SIZE + (index % self._count) * self.record_size
+        end = start + self.record_size
+
+        return self._view[start:end]
+
+    def records(self) -> Iterator[memoryview]:
+        view, size = self._view, self.record_size
+        for start in range(HEADER_SIZE, len(view), size):
+            end = start + size
+            yield view[start:end]
+
+    def __getitem__(self, index: int) -> ExtendedKey:
+        return parse_raw_key(self.record(index), self.validate, self.checksum)
+
+    def __iter__(self) -> Iterator[ExtendedKey]:
+        for record in self.records():
+            yield parse_raw_key(record, self.validate, self.checksum)
+
+    def close(self):
+        """release record views first; mmap won't close while they're alive"""
+        self._view.release()
+        self._map.close()
+
+    def __enter__(self) -> "KeyPack":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,319 @@
+"""
+Which index of our master produced this key or secret?
+
+A template is a derivation path with one * segment for the unknown index:
+m/84'/0'/*' for an account xpub, m/83696968'/707785'/20'/*' for a base85
+password, m/44'/0'/0'/0/* for a WIF. find() derives the template's parent (the
+path before the *) once per process, then tries indexes in chunks with
+search.search(), in parallel if asked, and stops at the first match. Each index
+costs one CKDpriv from that parent (whose public key and fingerprint are also
+computed once), plus the segments after the *, whose public keys are computed a
+chunk at a time.
+
+Targets (to_target) match
+    xprv, xpub  a key at a BIP-32 template: chain codes first (one HMAC an
+                index, no EC math), then the key
+    WIF         the private key at a BIP-32 template
+    any text    the output of a BIP-85 template of any application but drng,
+                whose length is not in its path (WIF, password, mnemonic, RSA
+                PEM, ...); both it and each output are compared as normalize()d
+
+For many targets at once (a wallet's worth of addresses, say) pass a
+bloom.BloomFilter of their programs instead: find_all() yields every index whose
+key's program may be in it (one EC multiplication more an index), and
+confirm_all() keeps the ones that really are, in one pass over the targets.
+With workers, the filter is pickled with every chunk, so prefer a larger
+chunk_size for large filters.
+"""
+
+import logging
+import re
+import warnings
+from collections import namedtuple
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+import base58
+
+from . import secp256k1
+from .addresses import to_programs
+from .bip32 import CKDpriv, derive_key, public_fingerprint, to_public_keys
+from .bip32types import (
+    TYPED_CHILD_KEY_COUNT,
+    DerivationPath,
+    ExtendedKey,
+    parse_ext_key,
+)
+from .bip85 import Derivation, apply_85
+from .bip85types import APPLICATIONS, PURPOSE_CODES
+from .bloom import BloomFilter, confirm
+from .search import CHUNK_SIZE, Match, Progress, search
+from .util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+WILDCARDS = ("*", "*'", "*h", "*H")
+BIP85_PURPOSE = DerivationPath.parse(f"m/{PURPOSE_CODES['BIP-85']}")
+APPLICATION_NAMES = {
+    DerivationPath.parse(f"m/{code}")[0]: name for name, code in APPLICATIONS.items()
+}
+KEY_PREFIXES = ("xprv", "xpub", "tprv", "tpub")
+WIF_PREFIXES = (b"\x80", b"\xef")  # mainnet, testnet
+ENUMERATOR = re.compile(r"\d+\)")  # 1) as in `bipsea mnemonic --pretty`
+
+
+class Template(namedtuple("Template", ["prefix", "hardened", "suffix"])):
+    """prefix/*/suffix, where * is hardened or not"""
+
+    @classmethod
+    def parse(cls, text: str) -> "Template":
+        segments = text.strip().split("/")
+        wild = [i for i, segment in enumerate(segments) if segment in WILDCARDS]
+        if len(wild) != 1 or wild[0] == 0:
+            raise ValueError(f"Expected a path with one * segment, got {text}")
+        (position,) = wild
+        rest = position + 1
+        prefix = DerivationPath.parse("/".join(segments[:position]))
+        suffix = DerivationPath.parse("/".join(["m"] + segments[rest:]))
+
+        template = cls(prefix, segments[position] != "*", suffix)
+        if template.is_bip85():
+            if not template.hardened:
+                raise ValueError(f"Expected a hardened *' in BIP-85 path {text}")
+            application = template.application()
+            if application is None:
+                names = ", ".join(APPLICATIONS)
+                raise ValueError(f"Expected a BIP-85 application ({names}): {text}")
+            if application == "drng":
+                # the number of bytes read isn't part of the path
+                raise ValueError(f"Unsupported in templates: drng: {text}")
+
+        return template
+
+    def path(self, index: int) -> DerivationPath:
+        return self.prefix.child(index, self.hardened) + self.suffix
+
+    def is_bip85(self) -> bool:
+        return BIP85_PURPOSE.is_prefix_of(self.prefix)
+
+    def application(self) -> Optional[str]:
+        """the BIP-85 application name, if the path has a known one"""
+        if len(self.prefix) < 2:
+            return None
+        return APPLICATION_NAMES.get(self.prefix[1])
+
+    def __str__(self) -> str:
+        wildcard = "*'" if self.hardened else "*"
+        suffix = str(self.suffix)[1:]
+
+        return f"{self.prefix}/{wildcard}{suffix}"
+
+
+class PathSpace(namedtuple("PathSpace", ["master", "template"])):
+    """private keys at template.path(index) below master; for BIP-85 templates,
+    values are the Derivations of those keys"""
+
+    def values(self, indexes: range) -> List[Tuple[int, object]]:
+        parent, public_key, finger = _parent(self.master, self.template.prefix)
+        depth = int.from_bytes(parent.depth, "big") + 1
+        offset = TYPED_CHILD_KEY_COUNT if self.template.hardened else 0
+        keys = [
+            CKDpriv(
+                parent.data,
+                parent.chain_code,
+                index + offset,
+                depth.to_bytes(1, "big"),
+                parent.version,
+                finger=finger,
+                public_key=public_key,
+            )
+            for index in indexes
+        ]
+        for child_number in self.template.suffix:
+            depth += 1
+            public_keys = to_public_keys(key.data for key in keys)
+            keys = [
+                CKDpriv(
+                    key.data,
+                    key.chain_code,
+                    child_number,
+                    depth.to_bytes(1, "big"),
+                    key.version,
+                    finger=public_fingerprint(public),
+                    public_key=public,
+                )
+                for key, public in zip(keys, public_keys)
+            ]
+        if not self.template.is_bip85():
+            return list(zip(indexes, keys))
+
+        application = self.template.application()
+        pattern = str(self.template)
+        values = []
+        with warnings.catch_warnings():
+            # derived entropy that starts with zero bytes isn't weak (see bip39)
+            warnings.simplefilter("ignore", UserWarning)
+            for index, key in zip(indexes, keys):
+                path = pattern.replace("*", str(index))
+                applied = apply_85(key, path)
+                entropy, output = applied["entropy"], applied["application"]
+                derivation = Derivation(application, path, key, entropy, output)
+                values.append((index, derivation))
+
+        return values
+
+
+class Target(namedtuple("Target", ["text", "key", "secret"])):
+    """predicate for PathSpace values: key is an ExtendedKey and secret a WIF's
+    private key, when text is one"""
+
+    def __call__(self, value) -> bool:
+        if isinstance(value, Derivation):
+            return normalize(value.output) == self.text
+        if self.key is not None:
+            if value.chain_code != self.key.chain_code:
+                return False
+            if self.key.is_private():
+                return value.data == self.key.data
+            return to_public_keys([value.data])[0] == self.key.data
+
+        return value.data[1:] == self.secret
+
+
+class Programs(namedtuple("Programs", ["bloom", "address_type"])):
+    """predicate for PathSpace values of BIP-32 templates: the key's program (see
+    addresses.to_programs) may be in bloom"""
+
+    def __call__(self, value) -> bool:
+        return to_program(value, self.address_type) in self.bloom
+
+
+def to_program(key: ExtendedKey, address_type: str = "p2wpkh") -> bytes:
+    """what a private key's address of address_type encodes"""
+    product = secp256k1.multiply_g(int.from_bytes(key.data, "big"))
+
+    return to_programs(secp256k1.to_affine_many([product]), address_type)[0]
+
+
+def to_target(text: str) -> Target:
+    """an extended key, a WIF, or (for BIP-85 templates) any output, such as a
+    password or a mnemonic"""
+    text = normalize(text)
+    if text[:4] in KEY_PREFIXES:
+        return Target(text, parse_ext_key(text), None)
+    try:
+        raw = base58.b58decode_check(text)
+    except ValueError:
+        raw = b""
+    if len(raw) in (33, 34) and raw[:1] in WIF_PREFIXES:
+        return Target(text, None, raw[1:33])
+
+    return Target(text, None, None)
+
+
+def normalize(text: str) -> str:
+    """text with runs of whitespace (line breaks in a PEM, say) as single spaces
+    and without enumerators, so that differently formatted copies compare equal"""
+    return " ".join(word for word in text.split() if not ENUMERATOR.fullmatch(word))
+
+
+def find(
+    master: ExtendedKey,
+    target: Union[str, Target, BloomFilter],
+    template: Union[str, Template],
+    start: int = 0,
+    stop: int = TYPED_CHILD_KEY_COUNT,
+    workers: int = 0,
+    checkpoint: Optional[str] = None,
+    progress: Optional[Callable[[Progress], None]] = None,
+    chunk_size: int = CHUNK_SIZE,
+    address_type: str = "p2wpkh",
+) -> Optional[Match]:
+    """the first index in [start, stop) at which template derives target from
+    master, or None; template.path(match.index) is where. For a BloomFilter, the
+    first candidate: confirm_all() it."""
+    matches = find_all(
+        master,
+        target,
+        template,
+        start,
+        stop,
+        1,
+        workers,
+        checkpoint,
+        progress,
+        chunk_size,
+        address_type,
+    )
+    match = next(matches, None)
+    matches.close()  # cancels the rest, saves the checkpoint
+
+    return match
+
+
+def find_all(
+    master: ExtendedKey,
+    target: Union[str, Target, BloomFilter],
+    template: Union[str, Template],
+    start: int = 0,
+    stop: int = TYPED_CHILD_KEY_COUNT,
+    limit: Optional[int] = None,
+    workers: int = 0,
+    checkpoint: Optional[str] = None,
+    progress: Optional[Callable[[Progress], None]] = None,
+    chunk_size: int = CHUNK_SIZE,
+    address_type: str = "p2wpkh",
+) -> Iterator[Match]:
+    """the indexes in [start, stop) at which template derives target from
+    master, in order, up to limit of them; for a BloomFilter target, candidates
+    whose programs of address_type may be targets"""
+    if not master.is_private():
+        raise ValueError("Expected a private master key")
+    if isinstance(template, str):
+        template = Template.parse(template)
+    if isinstance(target, str):
+        target = to_target(target)
+    if isinstance(target, BloomFilter):
+        if template.is_bip85():
+            raise ValueError(f"Expected a BIP-32 template for targets, got {template}")
+        target = Programs(target, address_type)
+    elif not template.is_bip85() and target.key is None and target.secret is None:
+        raise ValueError(f"Expected an xprv, xpub, or WIF to find at {template}")
+
+    return search(
+        PathSpace(master, template),
+        target,
+        start,
+        stop,
+        limit=limit,
+        workers=workers,
+        checkpoint=checkpoint,
+        progress=progress,
+        chunk_size=chunk_size,
+    )
+
+
+def confirm_all(
+    candidates: Iterable[Match],
+    targets: Iterable[bytes],
+    address_type: str = "p2wpkh",
+) -> List[Match]:
+    """the candidates of a BloomFilter whose programs are among targets (streamed
+    once, as by bloom.read_targets)"""
+    candidates = list(candidates)
+    programs = [(m.index, to_program(m.value, address_type)) for m in candidates]
+    confirmed = {index for index, _ in confirm(programs, targets)}
+
+    return [m for m in candidates if m.index in confirmed]
+
+
+@lru_cache(maxsize=16)
+def _parent(
+    master: ExtendedKey, path: DerivationPath
+) -> Tuple[ExtendedKey, bytes, bytes]:
+    """(key at path, its public key, its fingerprint), once per process"""
+    parent = derive_key(master, path, private=True)
+    (public_key,) = to_public_keys([parent.data])
+
+    return parent, public_key, public_fingerprint(public_key)
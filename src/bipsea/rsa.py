@@ -0,0 +1,309 @@
+"""
+Deterministic RSA key generation for the BIP-85 RSA application.
+https://github.com/bitcoin/bips/blob/master/bip-0085.mediawiki#rsa
+
+BIP-85 RSA keys are defined by the bytes a key generator draws from the DRNG,
+so we follow pycryptodome's `RSA.generate` (FIPS 186-4 B.3.1, B.3.3) draw for
+draw. Unlike pycryptodome we sieve candidates against small primes before
+Miller-Rabin. Sieved composites still draw their Miller-Rabin bases (so the
+DRNG stream stays aligned) but checking the base modulo the candidate's small
+factors usually proves it a witness without a full-size modular exponentiation.
+"""
+
+import base64
+import logging
+import math
+import textwrap
+from collections import namedtuple
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+from .bip85types import MAX_BITS, MIN_BITS
+from .util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+DEFAULT_E = 65537
+SIEVE_BOUND = 2**16
+# (bit size upper bound, Miller-Rabin iterations) s.t. p(composite) < 1E-30
+MR_ITERATIONS = (
+    (220, 30),
+    (280, 20),
+    (390, 15),
+    (512, 10),
+    (620, 7),
+    (740, 6),
+    (890, 5),
+    (1200, 4),
+    (1700, 3),
+    (3700, 2),
+)
+RSA_OID = bytes.fromhex("06092a864886f70d010101")  # 1.2.840.113549.1.1.1
+DER_NULL = bytes.fromhex("0500")
+
+
+class RSAKey(namedtuple("RSAKey", ["n", "e", "d", "p", "q", "u"])):
+    """RSA private key with p < q and u = p^-1 mod q"""
+
+    def private_der(self) -> bytes:
+        """PKCS#1 RSAPrivateKey"""
+        p, q, d = self.p, self.q, self.d
+        return der_sequence(
+            [0, self.n, self.e, d, p, q, d % (p - 1), d % (q - 1), pow(q, -1, p)]
+        )
+
+    def public_der(self) -> bytes:
+        """X.509 SubjectPublicKeyInfo"""
+        pkcs1 = der_sequence([self.n, self.e])
+        bit_string = b"\x03" + der_length(len(pkcs1) + 1) + b"\x00" + pkcs1
+
+        return der_sequence([der_tlv(0x30, RSA_OID + DER_NULL), bit_string])
+
+    def private_pem(self) -> str:
+        return to_pem(self.private_der(), "RSA PRIVATE KEY")
+
+    def public_pem(self) -> str:
+        return to_pem(self.public_der(), "PUBLIC KEY")
+
+
+def generate(bits: int, randfunc: Callable[[int], bytes], e: int = DEFAULT_E) -> RSAKey:
+    """Mirrors Crypto.PublicKey.RSA.generate: identical randfunc draws, same key"""
+    if not (MIN_BITS <= bits <= MAX_BITS):
+        raise ValueError(f"Expected RSA bits in [{MIN_BITS}, {MAX_BITS}], got {bits}")
+    if e % 2 == 0 or e < 3:
+        raise ValueError(f"RSA public exponent must be odd and > 2, got {e}")
+
+    d = n = 1
+    while n.bit_length() != bits or d < (1 << (bits // 2)):
+        size_q = bits // 2
+        size_p = bits - size_q
+        min_p = min_q = math.isqrt(1 << (2 * size_q - 1))
+        if size_q != size_p:
+            min_p = math.isqrt(1 << (2 * size_p - 1))
+
+        p = generate_probable_prime(
+            size_p,
+            randfunc,
+            lambda c: c > min_p and math.gcd(c - 1, e) == 1,
+        )
+        min_distance = 1 << (bits // 2 - 100)
+        q = generate_probable_prime(
+            size_q,
+            randfunc,
+            lambda c: (
+                c > min_q and math.gcd(c - 1, e) == 1 and abs(c - p) > min_distance
+            ),
+        )
+        n = p * q
+        lcm = (p - 1) * (q - 1) // math.gcd(p - 1, q - 1)
+        d = pow(e, -1, lcm)
+
+    if p > q:
+        p, q = q, p
+
+    return RSAKey(n=n, e=e, d=d, p=p, q=q, u=pow(p, -1, q))
+
+
+def generate_probable_prime(
+    exact_bits: int,
+    randfunc: Callable[[int], bytes],
+    prime_filter: Callable[[int], bool],
+) -> int:
+    while True:
+        candidate = random_int(randfunc, exact_bits, exact=True) | 1
+        if not prime_filter(candidate):
+            continue
+        if is_probable_prime(candidate, randfunc):
+            return candidate
+
+
+def is_probable_prime(candidate: int, randfunc: Callable[[int], bytes]) -> bool:
+    """Miller-Rabin with random bases, then Lucas"""
+    bit_size = candidate.bit_length()
+    iterations = next((i for limit, i in MR_ITERATIONS if bit_size < limit), 1)
+    small_part = math.gcd(candidate, primorial())
+    if not miller_rabin(
+        candidate,
+        iterations,
+        randfunc,
+        small_part=small_part if small_part > 1 else None,
+    ):
+        return False
+
+    return lucas(candidate)
+
+
+@lru_cache(maxsize=None)
+def small_primes(bound: int = SIEVE_BOUND) -> List[int]:
+    sieve = bytearray([1]) * bound
+    sieve[:2] = b"\x00\x00"
+    for i in range(2, math.isqrt(bound) + 1):
+        if sieve[i]:
+            square = i * i
+            sieve[square::i] = bytes(len(range(square, bound, i)))
+
+    return [i for i, is_prime in enumerate(sieve) if is_prime]
+
+
+@lru_cache(maxsize=None)
+def primorial(bound: int = SIEVE_BOUND) -> int:
+    """product of all primes < bound"""
+    return math.prod(small_primes(bound))
+
+
+def miller_rabin(
+    candidate: int,
+    iterations: int,
+    randfunc: Callable[[int], bytes],
+    small_part: Optional[int] = None,
+) -> bool:
+    """FIPS 186-4 C.3.1. small_part is an optional known divisor of candidate;
+    a base that is not a strong liar modulo small_part can't be one for candidate,
+    so we can call it a witness without the full-size exponentiation."""
+    minus_one = candidate - 1
+    m, a = minus_one, 0
+    while not m & 1:
+        m >>= 1
+        a += 1
+
+    for _ in range(iterations):
+        base = random_range(2, candidate - 2, randfunc)
+        if small_part is not None and not is_strong_liar(base, m, a, small_part):
+            return False
+        z = pow(base, m, candidate)
+        if z in (1, minus_one):
+            continue
+        for _ in range(1, a):
+            z = pow(z, 2, candidate)
+            if z == minus_one:
+                break
+            if z == 1:
+                return False
+        else:
+            return False
+
+    return True
+
+
+def is_strong_liar(base: int, m: int, a: int, modulus: int) -> bool:
+    """base^m = 1 or base^(m * 2^j) = -1 for some j < a, all mod modulus"""
+    z = pow(base, m, modulus)
+    if z in (1, modulus - 1):
+        return True
+    for _ in range(1, a):
+        z = z * z % modulus
+        if z == modulus - 1:
+            return True
+
+    return False
+
+
+def lucas(candidate: int) -> bool:
+    """FIPS 186-4 C.3.3"""
+    if candidate in (1, 2, 3, 5):
+        return True
+    if not candidate & 1 or math.isqrt(candidate) ** 2 == candidate:
+        return False
+
+    D = 5
+    while True:
+        if candidate not in (D, -D):
+            js = jacobi(D, candidate)
+            if js == 0:
+                return False
+            if js == -1:
+                break
+        D = -(D + 2) if D > 0 else -(D - 2)
+
+    K = candidate + 1
+    U, V = 1, 1
+    for i in range(K.bit_length() - 2, -1, -1):
+        U_temp = U * V % candidate
+        V_temp = U * U * D + V * V
+        if V_temp & 1:
+            V_temp += candidate
+        V_temp = (V_temp >> 1) % candidate
+        if (K >> i) & 1:
+            U = U_temp + V_temp
+            if U & 1:
+                U += candidate
+            U = (U >> 1) % candidate
+            V = V_temp + U_temp * D
+            if V & 1:
+                V += candidate
+            V = (V >> 1) % candidate
+        else:
+            U, V = U_temp, V_temp
+
+    return U == 0
+
+
+def jacobi(a: int, n: int) -> int:
+    a %= n
+    result = 1
+    while a:
+        while not a & 1:
+            a >>= 1
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == n % 4 == 3:
+            result = -result
+        a %= n
+
+    return result if n == 1 else 0
+
+
+def random_int(randfunc: Callable[[int], bytes], bits: int, exact: bool) -> int:
+    """exact: 2**bits > result >= 2**(bits - 1), else 2**bits > result >= 0"""
+    n_bytes = (bits - 1) // 8 + 1
+    msb_bits = 8 - (n_bytes * 8 - bits)
+    msb = randfunc(1)[0]
+    if exact:
+        msb |= 1 << (msb_bits - 1)
+    msb &= (1 << msb_bits) - 1
+
+    return int.from_bytes(bytes([msb]) + randfunc(n_bytes - 1), "big")
+
+
+def random_range(
+    min_inclusive: int, max_inclusive: int, randfunc: Callable[[int], bytes]
+) -> int:
+    norm_maximum = max_inclusive - min_inclusive
+    bits = norm_maximum.bit_length()
+    while True:
+        candidate = random_int(randfunc, bits, exact=False)
+        if candidate <= norm_maximum:
+            return candidate + min_inclusive
+
+
+def der_length(length: int) -> bytes:
+    if length < 0x80:
+        return bytes([length])
+    encoded = length.to_bytes((length.bit_length() + 7) // 8, "big")
+
+    return bytes([0x80 | len(encoded)]) + encoded
+
+
+def der_tlv(tag: int, value: bytes) -> bytes:
+    return bytes([tag]) + der_length(len(value)) + value
+
+
+def der_integer(value: int) -> bytes:
+    # non-negative only; the extra byte keeps the sign bit clear
+    return der_tlv(0x02, value.to_bytes(value.bit_length() // 8 + 1, "big"))
+
+
+def der_sequence(items: list) -> bytes:
+    return der_tlv(
+        0x30,
+        b"".join(der_integer(i) if isinstance(i, int) else i for i in items),
+    )
+
+
+def to_pem(der: bytes, label: str) -> str:
+    encoded = base64.b64encode(der).decode("ascii")
+    lines = textwrap.wrap(encoded, 64)
+
+    return "\n".join([f"-----BEGIN {label}-----", *lines, f"-----END {label}-----"])
@@ -0,0 +1,225 @@
+"""
+secp256k1 arithmetic on plain ints, in Jacobian coordinates, for bulk work.
+
+A Jacobian point (X, Y, Z) is the affine point (X / Z**2, Y / Z**3); Z == 0 is the
+point at infinity. Additions and doublings need no modular inversion, so a point
+only pays for one when it's converted back to affine for serialization, and
+to_affine_many() converts any number of points with a single inversion
+(Montgomery's simultaneous inversion). Multiples of the generator come from a
+table of 4-bit windows (built once per process, on first use), so k * G is at
+most 64 mixed additions and no doublings. CKDpub's a * G + Q is that plus one
+more addition (multiply_add).
+
+Not constant time (neither is python-ecdsa, which bip32 otherwise uses): these
+are for deriving and exporting public keys, not for signing.
+"""
+
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+# https://www.secg.org/sec2-v2.pdf 2.4.1; y**2 = x**3 + 7 over GF(P)
+P = 2**256 - 2**32 - 977
+N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+GX = 0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798
+GY = 0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8
+G = (GX, GY)
+INFINITY = (1, 1, 0)
+
+WINDOW = 4  # bits per generator table row
+ROWS = 256 // WINDOW
+
+DECOMPRESS_CACHE_SIZE = 1024  # public keys, e.g. account xpubs used again and again
+
+Affine = Tuple[int, int]
+Jacobian = Tuple[int, int, int]
+Table = Tuple[Tuple[Affine, ...], ...]
+
+
+def double(p: Jacobian) -> Jacobian:
+    # https://hyperelliptic.org/EFD/g1p/auto-shortw-jacobian-0.html#doubling-dbl-2009-l
+    x1, y1, z1 = p
+    if not z1 or not y1:
+        return INFINITY
+    a = x1 * x1 % P
+    b = y1 * y1 % P
+    c = b * b % P
+    d = 4 * x1 * b % P
+    e = 3 * a
+    x3 = (e * e - 2 * d) % P
+    y3 = (e * (d - x3) - 8 * c) % P
+    z3 = 2 * y1 * z1 % P
+
+    return x3, y3, z3
+
+
+def add(p: Jacobian, q: Jacobian) -> Jacobian:
+    # https://hyperelliptic.org/EFD/g1p/auto-shortw-jacobian-0.html#addition-add-2007-bl
+    x1, y1, z1 = p
+    x2, y2, z2 = q
+    if not z1:
+        return q
+    if not z2:
+        return p
+    z1z1 = z1 * z1 % P
+    z2z2 = z2 * z2 % P
+    u1 = x1 * z2z2 % P
+    u2 = x2 * z1z1 % P
+    s1 = y1 * z2 * z2z2 % P
+    s2 = y2 * z1 * z1z1 % P
+    h = (u2 - u1) % P
+    r = 2 * (s2 - s1) % P
+    if not h:
+        return double(p) if not r else INFINITY
+    i = 4 * h * h % P
+    j = h * i % P
+    v = u1 * i % P
+    x3 = (r * r - j - 2 * v) % P
+    y3 = (r * (v - x3) - 2 * s1 * j) % P
+    z3 = 2 * z1 * z2 * h % P
+
+    return x3, y3, z3
+
+
+def add_affine(p: Jacobian, q: Affine) -> Jacobian:
+    """p + q where q is affine (Z == 1), which saves a few multiplications"""
+    # https://hyperelliptic.org/EFD/g1p/auto-shortw-jacobian-0.html#addition-madd-2007-bl
+    x1, y1, z1 = p
+    x2, y2 = q
+    if not z1:
+        return x2, y2, 1
+    z1z1 = z1 * z1 % P
+    u2 = x2 * z1z1 % P
+    s2 = y2 * z1 * z1z1 % P
+    h = (u2 - x1) % P
+    r = 2 * (s2 - y1) % P
+    if not h:
+        return double(p) if not r else INFINITY
+    hh = h * h % P
+    i = 4 * hh
+    j = h * i % P
+    v = x1 * i % P
+    x3 = (r * r - j - 2 * v) % P
+    y3 = (r * (v - x3) - 2 * y1 * j) % P
+    z3 = 2 * z1 * h % P
+
+    return x3, y3, z3
+
+
+def multiply_g(k: int) -> Jacobian:
+    """k * G from the window table"""
+    return multiply_table(k, g_table())
+
+
+def multiply_table(k: int, table: Table, result: Jacobian = INFINITY) -> Jacobian:
+    """result + k * q, where table is window_table(q)"""
+    k %= N
+    mask = (1 << WINDOW) - 1
+    row = 0
+    while k:
+        digit = k & mask
+        if digit:
+            result = add_affine(result, table[row][digit - 1])
+        k >>= WINDOW
+        row += 1
+
+    return result
+
+
+@lru_cache(maxsize=None)
+def g_table() -> Table:
+    return window_table(G)
+
+
+def window_table(q: Affine) -> Table:
+    """row i holds d * 2**(WINDOW * i) * q for digits d = 1 .. 2**WINDOW - 1"""
+    points = []
+    base = (q[0], q[1], 1)
+    for _ in range(ROWS):
+        multiple = base
+        for _ in range((1 << WINDOW) - 1):
+            points.append(multiple)
+            multiple = add(multiple, base)
+        base = multiple  # 2**WINDOW * base
+    rows = iter(to_affine_many(points))
+    width = (1 << WINDOW) - 1
+
+    return tuple(tuple(islice(rows, width)) for _ in range(ROWS))
+
+
+def multiply_add(a: int, q: Affine) -> Jacobian:
+    """a * G + q, as in CKDpub"""
+    return add_affine(multiply_g(a), q)
+
+
+def batch_invert(values: Sequence[int], modulus: int = P) -> List[int]:
+    """[pow(v, -1, modulus) for v in values] with one inversion (Montgomery's
+    trick): invert the product of all values, then peel off one value at a time.
+    Values must be nonzero mod modulus."""
+    prefixes = []
+    product = 1
+    for value in values:
+        prefixes.append(product)
+        product = product * value % modulus
+    inverse = pow(product, -1, modulus)
+    inverses = [0] * len(values)
+    for index in range(len(values) - 1, -1, -1):
+        inverses[index] = inverse * prefixes[index] % modulus
+        inverse = inverse * values[index] % modulus
+
+    return inverses
+
+
+def to_affine(p: Jacobian) -> Optional[Affine]:
+    """None for the point at infinity"""
+    return to_affine_many([p])[0]
+
+
+def to_affine_many(points: Iterable[Jacobian]) -> List[Optional[Affine]]:
+    """affine points (None for infinity) with one modular inversion in all"""
+    points = list(points)
+    finite = [p for p in points if p[2]]
+    inverses = iter(batch_invert([p[2] for p in finite])) if finite else iter(())
+    affine = []
+    for x, y, z in points:
+        if not z:
+            affine.append(None)
+            continue
+        z_inverse = next(inverses)
+        z_inverse_2 = z_inverse * z_inverse % P
+        affine.append((x * z_inverse_2 % P, y * z_inverse_2 * z_inverse % P))
+
+    return affine
+
+
+def decompress(data: Union[bytes, bytearray, memoryview]) -> Affine:
+    """affine point from SEC1 compressed bytes, or any bytes-like object (such as
+    a memoryview record); raises ValueError if there is none. Memoized."""
+    return _decompress(bytes(data))
+
+
+def lift(data: bytes) -> Affine:
+    """decompress() without the cache, for keys that are mostly seen once.
+    Since P % 4 == 3, the square root of y**2 is y**2 ** ((P + 1) / 4), if any."""
+    if len(data) != 33 or data[0] not in (2, 3):
+        raise ValueError("Expected 33 bytes starting with 02 or 03")
+    x = int.from_bytes(data[1:], "big")
+    if x >= P:
+        raise ValueError("Expected x < P")
+    y_squared = (x * x * x + 7) % P
+    y = pow(y_squared, (P + 1) // 4, P)
+    if y * y % P != y_squared:
+        raise ValueError("Not a point on secp256k1")
+    if y & 1 != data[0] & 1:
+        y = P - y
+
+    return x, y
+
+
+_decompress = lru_cache(maxsize=DECOMPRESS_CACHE_SIZE)(lift)
+
+
+def compress(point: Affine) -> bytes:
+    """SEC1 compressed encoding, as in BIP-32 serialized public keys"""
+    x, y = point
+    return bytes([2 + (y & 1)]) + x.to_bytes(32, "big")
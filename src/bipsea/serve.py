@@ -0,0 +1,255 @@
+"""
+Long-running daemon that answers bipsea subcommands over a Unix domain socket.
+
+Requests run the very same click commands as the CLI, so the daemon accepts the same
+arguments and prints the same output, but it keeps the interpreter, wordlists,
+parsed masters, seeds, and derivations warm between requests.
+
+Protocol: one JSON object per line in each direction.
+    request  {"args": ["derive", "-a", "hex", ...], "piped": true, "stdin": null,
+              "cwd": "/home/..."}
+    response {"exit_code": 0, "stdout": "...", "stderr": "..."}
+If the command reads a pipe (piped) that the client hasn't sent (stdin is null), the
+response is {"need_stdin": true} and the client resends with "stdin" filled in.
+Like the CLI, a client only blocks on its stdin when the command needs it.
+Commands run in the client's working directory (cwd), so relative paths such as
+`vault -m manifest.csv` name the same files they would on the command line.
+"""
+
+import contextlib
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+from functools import lru_cache
+from typing import IO, TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import click
+
+from .util import LOGGER_NAME
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .bip32 import DerivationCache
+    from .bip32types import ExtendedKey
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+CACHE_SIZE = 1024  # masters, seeds
+DERIVATION_CACHE_SIZE = 4096  # keys per master
+REQUEST_TIMEOUT = 60  # seconds a connection may sit idle
+# commands that make no sense inside the daemon (pack and unpack do binary file io)
+LOCAL_ONLY = ("serve", "client", "pack", "unpack")
+
+
+class Warm:
+    """Memoized versions of the expensive CLI steps. Passed to click as ctx.obj;
+    every entry is a secret, so this only ever lives in memory."""
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        # imported here so that `bipsea client` doesn't load the EC machinery
+        from .bip32types import parse_ext_key, validate_prv_str
+
+        self.validate_prv_str = lru_cache(maxsize)(validate_prv_str)
+        self.parse_ext_key = lru_cache(maxsize)(parse_ext_key)
+        self._to_master_seed = lru_cache(maxsize)(self._seed)
+        self.derivation_cache = lru_cache(maxsize)(self._derivation_cache)
+
+    def to_master_seed(self, mnemonic: List[str], passphrase: str) -> bytes:
+        return self._to_master_seed(tuple(mnemonic), passphrase)
+
+    @staticmethod
+    def _seed(mnemonic: Tuple[str, ...], passphrase: str) -> bytes:
+        from .bip39 import to_master_seed
+
+        return to_master_seed(list(mnemonic), passphrase)
+
+    @staticmethod
+    def _derivation_cache(master: "ExtendedKey") -> "DerivationCache":
+        from .bip32 import DerivationCache
+
+        return DerivationCache(maxsize=DERIVATION_CACHE_SIZE)
+
+
+class NeedStdin(Exception):
+    pass
+
+
+class PipedInput(io.StringIO):
+    """stands in for sys.stdin so try_for_pipe_input sees the client's pipe"""
+
+    def __init__(self, piped: bool, text: Optional[str]):
+        super().__init__(text or "")
+        self.piped = piped
+        self.missing = piped and text is None
+
+    def isatty(self) -> bool:
+        return not self.piped
+
+    def read(self, *args) -> str:
+        self.check()
+        return super().read(*args)
+
+    def readline(self, *args) -> str:
+        self.check()
+        return super().readline(*args)
+
+    def __iter__(self):
+        self.check()
+        return super().__iter__()
+
+    def check(self):
+        if self.missing:
+            raise NeedStdin()
+
+
+class Handler(socketserver.StreamRequestHandler):
+    timeout = REQUEST_TIMEOUT  # an idle client only ties up its own thread
+
+    def handle(self):
+        try:
+            for line in self.rfile:
+                try:
+                    request = json.loads(line)
+                    with self.server.lock:
+                        response = run(self.server.cli, self.server.warm, **request)
+                except (TypeError, ValueError) as error:
+                    response = {
+                        "exit_code": 2,
+                        "stdout": "",
+                        "stderr": f"Error: {error}\n",
+                    }
+                self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+                self.wfile.flush()
+        except OSError:  # timed out, or the client went away
+            pass
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """A thread per connection, so an idle client doesn't block the others, but
+    one command at a time (lock): run() swaps sys.stdin/stdout/stderr and shares
+    warm, and the work is CPU-bound under the GIL anyway."""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, cli: click.Group, warm: Optional[Warm] = None):
+        self.cli = cli
+        self.warm = Warm() if warm is None else warm
+        self.lock = threading.Lock()
+        remove_stale_socket(path)
+        previous = os.umask(0o177)  # secrets: owner-only socket
+        try:
+            super().__init__(path, Handler)
+        finally:
+            os.umask(previous)
+
+    def server_close(self):
+        super().server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.server_address)
+
+
+def run(
+    cli: click.Group,
+    warm: Warm,
+    args: List[str],
+    piped: bool = False,
+    stdin: Optional[str] = None,
+    cwd: Optional[str] = None,
+) -> Dict:
+    """invoke a subcommand as if from the shell (in directory cwd, if given),
+    capturing its output; not reentrant, since it changes process state"""
+    if not (isinstance(args, list) and all(isinstance(a, str) for a in args)):
+        raise TypeError("args must be a list of strings")
+    if args and args[0] in LOCAL_ONLY:
+        raise ValueError(f"`{args[0]}` can't run inside the daemon")
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        with swap_stdin(PipedInput(piped, stdin)), working_directory(cwd):
+            try:
+                exit_code = cli.main(
+                    args=args, prog_name="bipsea", obj=warm, standalone_mode=False
+                )
+                exit_code = exit_code if isinstance(exit_code, int) else 0
+            except NeedStdin:
+                return {"need_stdin": True}
+            except click.ClickException as error:
+                error.show()
+                exit_code = error.exit_code
+            except click.Abort:
+                click.echo("Aborted!", err=True)
+                exit_code = 1
+            except Exception as error:  # keep serving
+                logger.exception("request failed")
+                click.echo(f"Error: {error}", err=True)
+                exit_code = 1
+
+    return {
+        "exit_code": exit_code,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+    }
+
+
+def request(path: str, args: List[str], stdin: Optional[IO[str]] = None) -> Dict:
+    """run a command on a daemon; stdin (e.g. sys.stdin) is read only if needed"""
+    piped = stdin is not None and not stdin.isatty()
+    message = {"args": args, "piped": piped, "stdin": None, "cwd": os.getcwd()}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        with sock.makefile("rwb") as stream:
+            while True:
+                stream.write(json.dumps(message).encode("utf-8") + b"\n")
+                stream.flush()
+                response = json.loads(stream.readline())
+                if not response.get("need_stdin"):
+                    return response
+                message["stdin"] = stdin.read()
+
+
+def remove_stale_socket(path: str):
+    """unlink path if it is a socket that nobody is listening on; raises OSError
+    if it is anything else, so we never delete a regular file"""
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise OSError(f"Not a socket: {path}")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(path)
+        else:
+            raise OSError(f"Daemon already listening on {path}")
+
+
+@contextlib.contextmanager
+def working_directory(path: Optional[str]):
+    if path is None:
+        yield
+        return
+    previous = os.getcwd()
+    try:
+        os.chdir(path)
+    except OSError as error:
+        raise ValueError(f"Can't run in the client's directory: {error}")
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+@contextlib.contextmanager
+def swap_stdin(stream):
+    previous, sys.stdin = sys.stdin, stream
+    try:
+        yield
+    finally:
+        sys.stdin = previous
@@ -0,0 +1,85 @@
+"""
+Thread-safe single-flight: concurrent calls with the same key share one computation.
+
+The first caller for a key (the leader) computes; callers that arrive while it is
+in flight block and receive the same result, or the same exception. Nothing is
+cached: once the flight lands, the next call computes again (put a cache in front
+if you want one). This flattens the CPU spike when a burst of requests asks for
+the same seed or derivation at once, e.g. after a cold restart.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, List, Optional, TypeVar, Union
+
+from .bip32types import DerivationPath, ExtendedKey
+from .bip39 import to_master_seed as to_master_seed_unshared
+from .bip85 import derive as derive_unshared
+from .bip85 import derive_application as derive_application_unshared
+from .util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, Future] = {}
+        self.shared = 0  # calls answered by another caller's flight
+
+    def do(self, key: Hashable, function: Callable[..., T], *args, **kwargs) -> T:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return flight.result()
+
+        try:
+            flight.set_result(function(*args, **kwargs))
+        except BaseException as error:
+            flight.set_exception(error)
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+        return flight.result()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+
+# shared by the functions below
+FLIGHTS = SingleFlight()
+
+
+def to_master_seed(mnemonic: List[str], passphrase: str) -> bytes:
+    key = ("seed", tuple(mnemonic), passphrase)
+    return FLIGHTS.do(key, to_master_seed_unshared, mnemonic, passphrase)
+
+
+def derive(
+    master: ExtendedKey, path: Union[DerivationPath, str], private: bool = True
+) -> ExtendedKey:
+    path = DerivationPath.parse(path)  # m/0h and m/0' share a flight
+    key = ("derive", master, path, private)
+    return FLIGHTS.do(key, derive_unshared, master, path, private)
+
+
+def derive_application(
+    master: ExtendedKey,
+    application: str,
+    number: Optional[int] = None,
+    index: int = 0,
+    special: int = 10,
+    language: str = "english",
+) -> str:
+    args = (master, application, number, index, special, language)
+    return FLIGHTS.do(("application", *args), derive_application_unshared, *args)
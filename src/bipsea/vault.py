@@ -0,0 +1,129 @@
+"""
+Derive a whole vault of labeled BIP-85 secrets in one pass.
+Entries share a DerivationCache so common ancestors (e.g. m/83696968'/707764'/20')
+and their fingerprints are derived once per vault instead of once per secret.
+"""
+
+import csv
+import io
+import json
+import logging
+from collections import namedtuple
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, Optional
+
+from .bip39 import ISO_TO_LANGUAGE
+from .bip85types import APPLICATIONS
+from .util import LOGGER_NAME
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .bip32 import DerivationCache
+    from .bip32types import ExtendedKey
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+# least recently used keys are evicted; plenty for the handful of shared ancestors
+CACHE_SIZE = 4096
+FORMATS = ("jsonl", "csv")
+FIELDS = ["label", "application", "length", "index", "path", "secret"]
+
+
+class VaultEntry(
+    namedtuple(
+        "VaultEntry",
+        ["label", "application", "length", "index", "special", "to"],
+        defaults=(None, 0, 10, "eng"),
+    )
+):
+    """length is --number (None for the default); to is a 3-letter ISO code"""
+
+    @classmethod
+    def from_dict(cls, record: Dict) -> "VaultEntry":
+        unknown = set(record) - set(cls._fields)
+        if unknown:
+            raise ValueError(f"Unexpected manifest fields: {sorted(unknown)}")
+        if record.get("application") not in APPLICATIONS:
+            raise ValueError(f"Unsupported application: {record.get('application')}")
+        # csv gives us strings and empty cells
+        values = {k: v for k, v in record.items() if v not in (None, "")}
+        for field in ("length", "index", "special"):
+            if field in values:
+                values[field] = int(values[field])
+        application = values["application"]
+        # rejected, as `bipsea derive` does, rather than silently ignored
+        if "length" in values and application in ("wif", "xprv"):
+            raise ValueError(f"length has no effect for {application}")
+        if values.get("to", "eng") != "eng" and application != "mnemonic":
+            raise ValueError(f"to requires application mnemonic, not {application}")
+        if values.get("to", "eng") not in ISO_TO_LANGUAGE:
+            raise ValueError(f"Unsupported language: {values['to']}")
+
+        return cls(**values)
+
+
+def read_manifest(lines: Iterable[str]) -> Iterator[VaultEntry]:
+    """CSV with a header row (label,application,length,index[,special,to]) or JSONL;
+    the first non-blank line decides which"""
+    lines = (line for line in lines if line.strip())
+    first = next(lines, None)
+    if first is None:
+        return
+    if first.lstrip().startswith("{"):
+        records = (json.loads(line) for line in _chain(first, lines))
+    else:
+        records = csv.DictReader(_chain(first, lines), skipinitialspace=True)
+    for number, record in enumerate(records, 1):
+        try:
+            yield VaultEntry.from_dict(record)
+        except (TypeError, ValueError) as error:
+            raise ValueError(f"Manifest entry {number}: {error}") from error
+
+
+def generate(
+    master: "ExtendedKey",
+    entries: Iterable[VaultEntry],
+    cache: Optional["DerivationCache"] = None,
+) -> Iterator[Dict]:
+    """yields one record per entry, lazily, in manifest order"""
+    # imported here so the CLI can read FORMATS without loading the EC machinery
+    from .bip32 import DerivationCache
+    from .bip85 import derive_application, to_path
+
+    if cache is None:
+        cache = DerivationCache(maxsize=CACHE_SIZE)
+    for entry in entries:
+        language = ISO_TO_LANGUAGE[entry.to]
+        args = (entry.application, entry.length, entry.index, entry.special, language)
+        yield {
+            "label": entry.label,
+            "application": entry.application,
+            "length": entry.length,
+            "index": entry.index,
+            "path": to_path(*args),
+            "secret": derive_application(master, *args, cache=cache),
+        }
+
+
+def format_records(records: Iterable[Dict], format: str) -> Iterator[str]:
+    """one line (no newline) per record, preceded by a header row for csv"""
+    if format == "jsonl":
+        for record in records:
+            yield json.dumps(record, ensure_ascii=False)
+    elif format == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=FIELDS, lineterminator="")
+        for row in _chain(None, records):
+            buffer.seek(0)
+            buffer.truncate()
+            if row is None:
+                writer.writeheader()
+            else:
+                writer.writerow(row)
+            yield buffer.getvalue()
+    else:
+        raise ValueError(f"Unsupported format {format}, expected one of {FORMATS}")
+
+
+def _chain(first, rest: Iterable) -> Iterator:
+    yield first
+    yield from rest
@@ -0,0 +1,162 @@
+import logging
+
+import pytest
+
+from bipsea import secp256k1
+from bipsea.addresses import (
+    decode_address,
+    derive_addresses,
+    descend,
+    parse_range,
+    segwit_address,
+    to_addresses,
+)
+from bipsea.bip32 import derive_key, derive_public_children, to_master_key
+from bipsea.bip39 import to_master_seed
+from bipsea.util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+MNEMONIC = "abandon " * 11 + "about"
+MASTER = to_master_key(to_master_seed(MNEMONIC.split(), ""), mainnet=True, private=True)
+# BIP-44, BIP-84, BIP-86 test vectors
+VECTORS = [
+    ("p2pkh", "m/44h/0h/0h/0/0", "1LqBGSKuX5yYUonjxT5qGfpUsXKYYWeabA"),
+    ("p2pkh", "m/44h/0h/0h/0/1", "1Ak8PffB2meyfYnbXZR9EGfLfFZVpzJvQP"),
+    ("p2wpkh", "m/84h/0h/0h/0/0", "bc1qcr8te4kr609gcawutmrza0j4xv80jy8z306fyu"),
+    ("p2wpkh", "m/84h/0h/0h/0/1", "bc1qnjg0jd8228aq7egyzacy8cys3knf9xvrerkf9g"),
+    ("p2wpkh", "m/84h/0h/0h/1/0", "bc1q8c6fshw2dlwun7ekn9qwf37cu2rn755upcp6el"),
+    (
+        "p2tr",
+        "m/86h/0h/0h/0/0",
+        "bc1p5cyxnuxmeuwuvkwfem96lqzszd02n6xdcjrs20cac6yqjjwudpxqkedrcr",
+    ),
+    (
+        "p2tr",
+        "m/86h/0h/0h/0/1",
+        "bc1p4qhjn9zdvkux4e44uhx8tc55attvtyu358kutcqkudyccelu0was9fqzwh",
+    ),
+    (
+        "p2tr",
+        "m/86h/0h/0h/1/0",
+        "bc1p3qkhfews2uk44qtvauqyr2ttdsw7svhkl9nkm9s9c3x4ax5h60wqwruhk7",
+    ),
+]
+
+
+@pytest.mark.parametrize("address_type, path, address", VECTORS)
+def test_vectors(address_type, path, address):
+    private = derive_key(MASTER, path, private=True)
+    public = derive_key(MASTER, path, private=False)
+    point = secp256k1.decompress(public.data)
+    keys = [private, public, public.data, bytearray(public.data), point]
+    assert list(to_addresses(keys, address_type)) == [address] * len(keys)
+    account = derive_key(MASTER, path.rsplit("/", 2)[0], private=False)
+    chain, index = map(int, path.split("/")[-2:])
+    derived = derive_addresses(descend(account, f"m/{chain}"), [index], address_type)
+    assert list(derived) == [address]
+
+
+def test_generator():
+    # BIP-173
+    (address,) = to_addresses([secp256k1.G])
+    assert address == "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4"
+    assert list(to_addresses([secp256k1.G], "p2pkh")) == [
+        "1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMH"
+    ]
+
+
+@pytest.mark.parametrize(
+    "address_type, prefixes",
+    [("p2pkh", ("m", "n")), ("p2wpkh", ("tb1q",)), ("p2tr", ("tb1p",))],
+)
+def test_testnet(address_type, prefixes):
+    addresses = to_addresses([secp256k1.G] * 5, address_type, "testnet")
+    assert all(a.startswith(prefixes) for a in addresses)
+
+
+@pytest.mark.parametrize("address_type", ["p2pkh", "p2wpkh", "p2tr"])
+def test_chunks(address_type):
+    parent = descend(MASTER, "m/0")
+    children = derive_public_children(parent, range(10))
+    expected = list(to_addresses(children, address_type))
+    assert len(set(expected)) == 10
+    assert list(derive_addresses(parent, range(10), address_type, 3)) == expected
+    mixed = [c if i % 2 else c.data for i, c in enumerate(children)]
+    assert list(to_addresses(iter(mixed), address_type, chunk_size=4)) == expected
+    assert list(to_addresses([], address_type)) == []
+
+
+def test_descend():
+    path = "m/84h/0h/0h/0"
+    assert descend(MASTER, path) == derive_key(MASTER, path, private=True)
+    account = derive_key(MASTER, "m/84h/0h/0h", private=False)
+    assert descend(account, "m/0/7") == derive_key(
+        MASTER, "m/84h/0h/0h/0/7", private=False
+    )
+    assert descend(account, "m") == account
+    with pytest.raises(ValueError, match="hardened"):
+        descend(account, "m/0h")
+
+
+@pytest.mark.parametrize(
+    "keys, address_type, network, error",
+    [
+        ([secp256k1.G], "p2sh", "mainnet", "Expected one of"),
+        ([secp256k1.G], "p2wpkh", "regtest", "mainnet or testnet"),
+        ([bytes(33)], "p2wpkh", "mainnet", "compressed"),
+        ([b"\x02" + bytes(31)], "p2pkh", "mainnet", "compressed"),
+        ([b"\x02" + (5).to_bytes(32, "big")], "p2tr", "mainnet", "secp256k1"),
+    ],
+)
+def test_invalid(keys, address_type, network, error):
+    with pytest.raises(ValueError, match=error):
+        list(to_addresses(keys, address_type, network))
+
+
+def test_parse_range():
+    assert parse_range("0-19") == range(20)
+    assert parse_range("7") == range(7, 8)
+    assert parse_range(f"{2**31 - 1}") == range(2**31 - 1, 2**31)
+    for text in ("", "a-b", "5-3", "-1", f"0-{2**31}"):
+        with pytest.raises(ValueError):
+            parse_range(text)
+
+
+def test_segwit_address():
+    # BIP-350: a version 1 program of 32 bytes uses bech32m
+    program = bytes.fromhex(
+        "79be667ef9dcbbac55a06295ce870b07029bfcdb2dce28d959f2815b16f81798"
+    )
+    assert segwit_address("bc", 1, program) == (
+        "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqzk5jj0"
+    )
+
+
+@pytest.mark.parametrize("network", ["mainnet", "testnet"])
+@pytest.mark.parametrize("address_type", ["p2pkh", "p2wpkh", "p2tr"])
+def test_decode_address(address_type, network):
+    (address,) = to_addresses([secp256k1.G], address_type, network)
+    decoded = decode_address(address)
+    assert decoded[:2] == (address_type, network)
+    assert len(decoded[2]) == (32 if address_type == "p2tr" else 20)
+    if address_type != "p2pkh":
+        assert decode_address(address.upper()) == decoded
+
+
+@pytest.mark.parametrize(
+    "address, error",
+    [
+        ("bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t5", "checksum"),
+        ("bc1qW508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4", "Mixed case"),
+        ("bc1qb", "Invalid bech32"),
+        ("1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMJ", "checksum"),
+        # BIP-350 witness version 2; P2SH
+        ("bc1zw508d6qejxtdg4y5r3zarvaryvaxxpcs", "Unsupported witness"),
+        ("3J98t1WpEZ73CNmQviecrnyiWrnqRhWNLy", "Unsupported address"),
+    ],
+)
+def test_decode_invalid(address, error):
+    with pytest.raises(ValueError, match=error):
+        decode_address(address)
@@ -0,0 +1,177 @@
+import hashlib
+import logging
+import tracemalloc
+
+import pytest
+
+from bipsea import addressindex
+from bipsea.addresses import derive_addresses, descend
+from bipsea.addressindex import (
+    HEADER_SIZE,
+    AddressIndex,
+    Location,
+    compact,
+    create,
+    extend,
+)
+from bipsea.bip32 import derive_key, to_master_key
+from bipsea.bip39 import to_master_seed
+from bipsea.util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+MNEMONIC = "abandon " * 11 + "about"
+MASTER = to_master_key(to_master_seed(MNEMONIC.split(), ""), mainnet=True, private=True)
+ACCOUNT = derive_key(MASTER, "m/84h/0h/0h", private=False)
+
+
+@pytest.fixture
+def index_path(tmp_path, monkeypatch):
+    # small segments and chunks, so that a few dozen keys span several
+    monkeypatch.setattr(addressindex, "SEGMENT_SIZE", 8)
+    monkeypatch.setattr(addressindex, "CHUNK_SIZE", 3)
+    path = str(tmp_path / "addresses.index")
+    create(path)
+
+    return path
+
+
+def test_lookup(index_path):
+    assert extend(index_path, ACCOUNT, 7, 0, 20) == 20
+    assert extend(index_path, ACCOUNT, 7, 1, 5) == 5
+    chain = descend(ACCOUNT, "m/0")
+    with AddressIndex(index_path) as index:
+        assert len(index) == 25 and len(index.segments) == 4
+        assert index.lookup("bc1qcr8te4kr609gcawutmrza0j4xv80jy8z306fyu") == [
+            Location(7, 0, 0)
+        ]
+        for address_type in ("p2pkh", "p2wpkh"):
+            addresses = derive_addresses(chain, range(20), address_type)
+            for i, address in enumerate(addresses):
+                assert index.lookup(address) == [Location(7, 0, i)]
+        public = descend(ACCOUNT, "m/1/4").data
+        assert index.lookup(public) == [Location(7, 1, 4)]
+        assert index.lookup(public.hex()) == [Location(7, 1, 4)]
+        assert index.lookup(descend(ACCOUNT, "m/1/5").data) == []
+        (taproot,) = derive_addresses(chain, [0], "p2tr")
+        with pytest.raises(ValueError, match="no p2tr"):
+            index.lookup(taproot)
+
+
+def test_extend_and_compact(index_path):
+    assert extend(index_path, ACCOUNT, 0, 0, 10) == 10
+    assert extend(index_path, ACCOUNT, 0, 0, 10) == 0
+    assert extend(index_path, ACCOUNT, 0, 0, 4) == 0
+    assert extend(index_path, ACCOUNT, 0, 0, 13) == 3
+    assert extend(index_path, ACCOUNT, 1, 0, 2) == 2
+    (address,) = derive_addresses(descend(ACCOUNT, "m/0"), [1])
+    with AddressIndex(index_path) as index:
+        assert len(index.segments) == 4
+        assert index.stop(0, 0) == 13 and index.stop(1, 0) == 2
+        # the same key under two accounts
+        assert index.lookup(address) == [Location(0, 0, 1), Location(1, 0, 1)]
+        before = {
+            i: index.lookup(a)
+            for i, a in enumerate(derive_addresses(descend(ACCOUNT, "m/0"), range(13)))
+        }
+    compact(index_path)
+    with AddressIndex(index_path) as index:
+        assert [s[:5] for s in index.segments] == [(0, 0, 0, 13, 13), (1, 0, 0, 2, 2)]
+        for i, address in enumerate(
+            derive_addresses(descend(ACCOUNT, "m/0"), range(13))
+        ):
+            assert index.lookup(address) == before[i]
+    assert extend(index_path, ACCOUNT, 0, 0, 14) == 1
+
+
+def test_extend_compacts(index_path):
+    # one segment per extend, all of the same (account, chain)
+    for stop in range(4, 32, 4):
+        extend(index_path, ACCOUNT, 0, 0, stop, max_extra_segments=2)
+        with AddressIndex(index_path) as index:
+            assert index.extra_segments() <= 2
+    extend(index_path, ACCOUNT, 1, 0, 4, max_extra_segments=0)
+    with AddressIndex(index_path) as index:
+        assert [s[:5] for s in index.segments] == [(0, 0, 0, 28, 28), (1, 0, 0, 4, 4)]
+        addresses = derive_addresses(descend(ACCOUNT, "m/0"), range(28))
+        for i, address in enumerate(addresses):
+            assert Location(0, 0, i) in index.lookup(address)
+    for stop in range(32, 64, 4):
+        extend(index_path, ACCOUNT, 0, 0, stop, max_extra_segments=None)
+    with AddressIndex(index_path) as index:
+        assert index.extra_segments() == 8
+
+
+def test_compact_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(addressindex, "READ_SIZE", 256)
+    # written directly, since deriving this many keys takes minutes
+    path = tmp_path / "big.index"
+    segments, size = 8, 5000
+    with open(path, "wb") as file:
+        file.write(addressindex.MAGIC + bytes([addressindex.FORMAT_VERSION, 0]))
+        for first in range(0, segments * size, size):
+            stop = first + size
+            file.write(addressindex.SEGMENT.pack(0, 0, first, stop, size))
+            keys = sorted(
+                hashlib.sha1(i.to_bytes(4, "big")).digest() for i in range(first, stop)
+            )
+            file.writelines(
+                addressindex.RECORD.pack(key, first + i) for i, key in enumerate(keys)
+            )
+    total = path.stat().st_size
+    tracemalloc.start()
+    try:
+        compact(str(path))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < total / 4
+    with AddressIndex(str(path)) as index:
+        (segment,) = index.segments
+        assert segment[:5] == (0, 0, 0, segments * size, segments * size)
+        keys = [key for key, _ in index.records(segment)]
+        assert keys == sorted(keys)
+
+
+def test_p2tr(tmp_path):
+    path = str(tmp_path / "taproot.index")
+    create(path, kind="p2tr")
+    account = derive_key(MASTER, "m/86h/0h/0h", private=False)
+    extend(path, account, 0, 0, 2)
+    with AddressIndex(path) as index:
+        assert index.kind == "p2tr"
+        address = "bc1p4qhjn9zdvkux4e44uhx8tc55attvtyu358kutcqkudyccelu0was9fqzwh"
+        assert index.lookup(address) == [Location(0, 0, 1)]
+        assert index.lookup(descend(account, "m/0/0").data) == [Location(0, 0, 0)]
+        with pytest.raises(ValueError, match="no p2pkh"):
+            index.lookup("1LqBGSKuX5yYUonjxT5qGfpUsXKYYWeabA")
+
+
+def test_invalid(index_path):
+    with pytest.raises(FileExistsError):
+        create(index_path)
+    with pytest.raises(ValueError, match="Expected one of"):
+        create(index_path + "2", kind="p2sh")
+    with pytest.raises(ValueError, match="chain"):
+        extend(index_path, ACCOUNT, 0, 2**31, 1)
+    with pytest.raises(ValueError, match="stop"):
+        extend(index_path, ACCOUNT, 0, 0, 2**31 + 1)
+
+
+@pytest.mark.parametrize(
+    "data, error",
+    [
+        (b"not an index", "Not a bipsea"),
+        (b"BIPIDX\x02\x00", "version"),
+        (b"BIPIDX\x01\x09", "kind"),
+        (b"BIPIDX\x01\x00" + bytes(10), "Truncated"),
+        (b"BIPIDX\x01\x00" + addressindex.SEGMENT.pack(0, 0, 0, 1, 1), "Truncated"),
+    ],
+)
+def test_bad_files(tmp_path, data, error):
+    assert len(data) >= HEADER_SIZE
+    path = tmp_path / "bad.index"
+    path.write_bytes(data)
+    with pytest.raises(ValueError, match=error):
+        AddressIndex(str(path))
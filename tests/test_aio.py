@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from data.bip85_vectors import COMMON_XPRV, PWD_BASE85
+
+from bipsea import aio
+from bipsea.bip32types import parse_ext_key
+from bipsea.bip39 import to_master_seed
+from bipsea.util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+MASTER = parse_ext_key(COMMON_XPRV)
+WORDS = "punch man spread gap size struggle clean crouch cloth swear erode fan".split()
+
+
+def test_module_functions():
+    async def main():
+        seed = await aio.to_master_seed(WORDS, "")
+        master = await aio.to_master_key(seed)
+        path = "m/83696968'/707785'/12'/0'"
+        derived = await aio.derive(MASTER, path)
+        pwd = (await aio.apply_85(derived, path))["application"]
+        return seed, master, pwd, await aio.derive_application(MASTER, "base85", 12)
+
+    seed, master, pwd, same_pwd = asyncio.run(main())
+    assert seed == to_master_seed(WORDS, "")
+    assert master.is_private()
+    assert pwd == same_pwd == PWD_BASE85[0]["derived_pwd"]
+
+
+@pytest.mark.parametrize("make", [aio.Runner.threads, aio.Runner.processes])
+def test_runners(make):
+    async def main():
+        async with make(2) as runner:
+            return await asyncio.gather(
+                *(runner.derive_application(MASTER, "hex", 16, i) for i in range(4))
+            )
+
+    secrets = asyncio.run(main())
+    assert len(set(secrets)) == 4
+
+
+def test_limit():
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def work():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+
+    runner = aio.Runner(ThreadPoolExecutor(8), limit=2, owns_executor=True)
+
+    async def main():
+        await asyncio.gather(*(runner.run(work) for _ in range(8)))
+
+    asyncio.run(main())
+    asyncio.run(main())  # the semaphore follows the loop
+    runner.close()
+    assert peak[0] == 2
+    with pytest.raises(ValueError):
+        aio.Runner(limit=0)
+
+
+def test_cancel_queued():
+    started, release = threading.Event(), threading.Event()
+    ran = []
+
+    async def main():
+        runner = aio.Runner(ThreadPoolExecutor(1), limit=1, owns_executor=True)
+        first = asyncio.ensure_future(runner.run(release.wait))
+        second = asyncio.ensure_future(runner.run(ran.append, "second"))
+        await asyncio.get_running_loop().run_in_executor(None, started.set)
+        await asyncio.sleep(0.01)
+        second.cancel()
+        release.set()
+        await first
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        runner.close()
+
+    asyncio.run(main())
+    assert started.is_set() and ran == []
+
+
+def test_loop_stays_responsive():
+    async def main():
+        ticks = 0
+        task = asyncio.ensure_future(aio.to_master_seed(WORDS, "slow"))
+        while not task.done():
+            await asyncio.sleep(0)
+            ticks += 1
+        await task
+        return ticks
+
+    assert asyncio.run(main()) > 1
@@ -0,0 +1,58 @@
+import logging
+
+from data.bip85_vectors import COMMON_XPRV
+
+from bipsea.batch import Record, chunked, option_params, process_records, read_records
+from bipsea.bipsea import derive_cli, derive_secret, validate
+from bipsea.util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def test_read_records():
+    lines = [
+        "plain words\n",
+        "  \n",
+        '{"from": "free", "mnemonic": "x"}',
+        '{"line": 7, "error": "upstream"}',
+        '{"from": "xyz"}',
+        "{not json",
+    ]
+    records = list(read_records(lines, validate, "mnemonic", {"from_": "eng"}))
+    assert records[:3] == [
+        Record(1, {"from_": "eng", "mnemonic": "plain words"}, None),
+        Record(3, {"from_": "free", "mnemonic": "x"}, None),
+        Record(7, None, "upstream"),
+    ]
+    assert records[3].line == 5 and "--from" in records[3].error
+    assert records[4].line == 6 and records[4].error
+
+
+def test_option_params():
+    params = option_params(derive_cli)
+    assert set(params) == {
+        "application",
+        "number",
+        "index",
+        "special",
+        "xprv",
+        "to",
+        "format",
+    }
+    assert params["index"].name == "index"
+    assert params["format"].name == "format_"
+
+
+def test_process_records():
+    defaults = dict(application="hex", number=16, special=10, xprv=COMMON_XPRV, to=None)
+    records = [Record(i, dict(defaults, index=i), None) for i in range(3)]
+    records.append(Record(3, dict(defaults, index=0, number=1), None))
+    results = list(process_records(derive_secret, records, "secret"))
+    for i in range(3):
+        assert results[i] == {"line": i, "secret": derive_secret(**records[i].kwargs)}
+    assert "out of range" in results[3]["error"]
+
+
+def test_chunked():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunked([], 2)) == []
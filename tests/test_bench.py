@@ -0,0 +1,54 @@
+import logging
+import re
+
+import pytest
+
+from bipsea import bip39
+from bipsea.bench import MIN_RUNS, cases, environment, measure, run
+from bipsea.bip85types import APPLICATIONS
+from bipsea.util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def test_measure():
+    result = measure("sum", lambda: sum(range(100)), min_time=0)
+    assert result.name == "sum" and result.runs == MIN_RUNS
+    assert result.ops_per_sec > 0
+    assert 0 < result.p50 <= result.p90 <= result.p99
+
+
+def test_cases():
+    names = set(cases())
+    for name in ("to_master_seed", "CKDpriv", "CKDpub", "ExtendedKey.__str__"):
+        assert name in names
+    applications = {re.match(r"apply_85\[(\w+)", n) for n in names}
+    assert {m.group(1) for m in applications if m} == set(APPLICATIONS) - {"drng"}
+    assert all(callable(setup()) for setup in cases().values())
+
+
+def test_lazy_setup(monkeypatch):
+    seeds = []
+    original = bip39.to_master_seed
+
+    def to_master_seed(*args):
+        seeds.append(args)
+        return original(*args)
+
+    # to_master_key's setup computes the seed (PBKDF2) it times with
+    monkeypatch.setattr(bip39, "to_master_seed", to_master_seed)
+    list(run(r"^hash160$", min_time=0))
+    assert not seeds
+    list(run(r"^to_master_key$", min_time=0))
+    assert len(seeds) == 1
+
+
+@pytest.mark.parametrize("pattern", [r"^DRNG\.read\[64\]$", r"ExtendedKey\.__str__"])
+def test_run(pattern):
+    results = list(run(pattern, min_time=0))
+    assert len(results) == 1
+    assert results[0].peak_memory > 0
+
+
+def test_environment():
+    assert {"bipsea", "python", "platform", "cpus"} <= set(environment())
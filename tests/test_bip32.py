@@ -1,4 +1,7 @@
+import hmac
 import logging
+import random
+import threading
 
 import pytest
 from data.bip32_vectors import INVALID_KEYS, VECTORS
@@ -7,27 +10,47 @@ from ecdsa.ellipticcurve import INFINITY
 from ecdsa.errors import MalformedPointError
 
 from bipsea.bip32 import (
+    EC_BACKENDS,
     TYPED_CHILD_KEY_COUNT,
     CKDpriv,
     CKDpub,
+    DerivationCache,
     N,
+    derive_key,
+    derive_public_children,
+    hmac_sha512,
+    set_ec_backend,
     to_master_key,
+    to_public_key,
+    to_public_keys,
     validate_private_child_params,
     validate_public_child_params,
 )
-from bipsea.bip32types import parse_ext_key, validate_prv_str
+from bipsea.bip32types import (
+    DerivationPath,
+    parse_ext_key,
+    parse_raw_key,
+    validate_prv_str,
+)
 from bipsea.bip85 import derive
 from bipsea.util import LOGGER_NAME, no_raise
 
 logger = logging.getLogger(LOGGER_NAME)
 
 
+@pytest.fixture(params=EC_BACKENDS)
+def ec_backend(request):
+    set_ec_backend(request.param)
+    yield request.param
+    set_ec_backend("ecdsa")
+
+
 @pytest.mark.parametrize(
     "vector",
     VECTORS,
     ids=lambda v: f"Vector-{VECTORS.index(v) + 1}",
 )
-def test_vectors_and_parse_ext_key(vector):
+def test_vectors_and_parse_ext_key(vector, ec_backend):
     seed = bytes.fromhex(vector["seed_hex"])
     for ch, tests in vector["chain"].items():
         for type_, expected in tests.items():
@@ -90,6 +113,77 @@ def test_parse_invalid_keys(key_str: str, reason: str):
         parse_ext_key(key_str)
 
 
+@pytest.mark.parametrize(
+    "vector",
+    VECTORS,
+    ids=lambda v: f"Vector-{VECTORS.index(v) + 1}",
+)
+def test_derive_public_children(vector):
+    master = to_master_key(bytes.fromhex(vector["seed_hex"]), True, True)
+    for path in vector["chain"]:
+        for private in (True, False):
+            parent = derive(master, path, private=private)
+            children = derive_public_children(parent, [0, 1, 2**31 - 1])
+            for index, child in zip([0, 1, 2**31 - 1], children):
+                assert child == derive(master, f"{path}/{index}", private=False)
+    with pytest.raises(ValueError, match="hardened"):
+        derive_public_children(master, [0, 2**31])
+    assert derive_public_children(master, []) == []
+
+
+def test_to_public_keys():
+    master = to_master_key(bytes.fromhex(VECTORS[0]["seed_hex"]), True, True)
+    keys = [derive(master, f"m/{i}").data for i in range(8)]
+    assert to_public_keys(keys) == [to_public_key(k) for k in keys]
+    assert to_public_keys([]) == []
+    with pytest.raises(ValueError):
+        to_public_keys([bytes(33)])
+
+
+@pytest.mark.parametrize("child_number", [7, TYPED_CHILD_KEY_COUNT + 7])
+def test_ckdpriv_shared_parent(child_number):
+    master = to_master_key(bytes.fromhex(VECTORS[0]["seed_hex"]), True, True)
+    args = (master.data, master.chain_code, child_number, b"\x01", master.version)
+    public_key = to_public_key(master.data)
+    assert CKDpriv(*args, public_key=public_key) == CKDpriv(*args)
+    assert CKDpriv(*args, finger=bytes(4)).finger == bytes(4)
+
+
+@pytest.mark.parametrize("checksum", [False, True])
+def test_raw_keys(checksum):
+    for vector in VECTORS:
+        for tests in vector["chain"].values():
+            for expected in tests.values():
+                key = parse_ext_key(expected)
+                raw = key.to_raw(checksum)
+                assert len(raw) == 78 + 4 * checksum
+                assert raw[:78] == bytes(key)
+                assert parse_raw_key(memoryview(raw), checksum=checksum) == key
+                with pytest.raises(ValueError):
+                    parse_raw_key(raw, checksum=not checksum)
+    corrupt = bytearray(raw)
+    corrupt[50] ^= 1  # still a valid key: only the checksum can tell
+    if checksum:
+        with pytest.raises(ValueError, match="checksum"):
+            parse_raw_key(corrupt, checksum=True)
+    else:
+        assert parse_raw_key(corrupt) != key
+
+
+@pytest.mark.parametrize(
+    "key_str, reason",
+    INVALID_KEYS,
+    ids=[f"Vector-5-{reason[:32]}-{key[:8]}" for key, reason in INVALID_KEYS],
+)
+def test_parse_raw_invalid_keys(key_str: str, reason: str):
+    try:
+        raw = bytes(parse_ext_key(key_str, validate=False))
+    except (ValueError, AssertionError):
+        pytest.skip("not 78 bytes of base58check")
+    with pytest.raises(ValueError):
+        parse_raw_key(raw)
+
+
 def test_validate_private_params():
     with pytest.raises(ValueError):
         validate_private_child_params(SECP256k1.order + 1, 1, 0)
@@ -155,7 +249,7 @@ def test_ckdpriv_invalid_keys(key_str: str, reason: str):
     INVALID_KEYS,
     ids=[f"Vector-5-{reason[:32]}-{key[:8]}" for key, reason in INVALID_KEYS],
 )
-def test_ckdpub_invalid_keys(key_str: str, reason: str):
+def test_ckdpub_invalid_keys(key_str: str, reason: str, ec_backend):
     with pytest.raises(ValueError):
         parse_ext_key(key_str)
     if "checksum" in reason:
@@ -189,7 +283,24 @@ def test_ckdpub_invalid_keys(key_str: str, reason: str):
             )
 
 
-def test_ckd_pub_bad_child_number():
+def test_ec_backend():
+    with pytest.raises(ValueError):
+        set_ec_backend("openssl")
+    key = parse_ext_key(VECTORS[0]["chain"]["m"]["ext pub"])
+    args = dict(
+        public_key=key.data,
+        chain_code=key.chain_code,
+        child_number=bytes(4),
+        depth=bytes([1]),
+        version=key.version,
+        finger=bytes(4),
+    )
+    assert CKDpub(**args, backend="secp256k1") == CKDpub(**args, backend="ecdsa")
+    with pytest.raises(ValueError):
+        CKDpub(**args, backend="openssl")
+
+
+def test_ckd_pub_bad_child_number(ec_backend):
     key = parse_ext_key(
         "xpub661MyMwAqRbcFtXgS5sYJABqqG9YLmC4Q1Rdap9gSE8NqtwybGhePY2gZ29ESFjqJoCu1Rupje8YtGqsefD265TMg7usUDFdp6W1EGMcet8"
     )
@@ -202,3 +313,113 @@ def test_ckd_pub_bad_child_number():
             version=key.version,
             finger=key.finger,
         )
+
+
+@pytest.mark.parametrize(
+    "path, indexes, canonical",
+    [
+        ("m", (), "m"),
+        ("m/0", (0,), "m/0"),
+        (
+            "m/0H/1/2h",
+            (TYPED_CHILD_KEY_COUNT, 1, 2 + TYPED_CHILD_KEY_COUNT),
+            "m/0'/1/2'",
+        ),
+        ("m/83696968'/39'", (83696968 + 2**31, 39 + 2**31), "m/83696968'/39'"),
+    ],
+)
+def test_derivation_path(path, indexes, canonical):
+    parsed = DerivationPath.parse(path)
+    assert parsed == indexes
+    assert str(parsed) == canonical
+    assert DerivationPath.parse(canonical) == parsed
+    assert DerivationPath.parse(parsed) is parsed
+    assert hash(parsed) == hash(DerivationPath(indexes))
+    assert {parsed: 1}[DerivationPath.parse(canonical)] == 1
+
+
+def test_derivation_path_ops():
+    path = DerivationPath.parse("m/44'/0'/0'")
+    child = path.child(7)
+    assert str(child) == "m/44'/0'/0'/7"
+    assert not child.is_hardened()
+    assert path.child(7, hardened=True).is_hardened()
+    assert child.parent() == path
+    assert child.depth == 4
+    assert path.is_prefix_of(child)
+    assert not child.is_prefix_of(path)
+    assert child.prefix(1) == DerivationPath.parse("m/44h")
+    assert isinstance(path + (1,), DerivationPath)
+    sliced = child[1:3]
+    assert isinstance(sliced, DerivationPath)
+    assert str(sliced) == "m/0'/0'"
+    assert str(child[:-1]) == "m/44'/0'/0'" and child[:-1] == path
+    assert child[-1] == 7 and isinstance(child[-1], int)
+    with pytest.raises(ValueError):
+        DerivationPath().parent()
+    with pytest.raises(ValueError):
+        path.child(TYPED_CHILD_KEY_COUNT)
+
+
+@pytest.mark.parametrize("path", ["x/1", "m/1/8*", "m/-1", f"m/{2**31}", "m/1/"])
+def test_derivation_path_invalid(path):
+    with pytest.raises(ValueError):
+        DerivationPath.parse(path)
+
+
+def test_derive_accepts_path_types():
+    master = to_master_key(bytes.fromhex(VECTORS[0]["seed_hex"]), True, True)
+    expected = VECTORS[0]["chain"]["m/0H/1"]["ext prv"]
+    for path in ("m/0H/1", DerivationPath.parse("m/0'/1")):
+        assert str(derive(master, path)) == expected
+    assert str(derive_key(master, ["m", "0H", "1"], private=True)) == expected
+
+
+@pytest.mark.parametrize("key_len", [0, 12, 32, 128, 129, 300])
+def test_hmac_sha512(key_len):
+    key = bytes(range(256))[:key_len] * (1 + key_len // 256)
+    for data in (b"", b"\x00" * 37, b"bip-entropy-from-k" * 10):
+        expected = hmac.new(key=key, msg=data, digestmod="sha512").digest()
+        # twice to exercise the cached keyed HMAC
+        assert hmac_sha512(key, data) == expected
+        assert hmac_sha512(key, data) == expected
+
+
+@pytest.mark.parametrize("maxsize", [None, 1, 3])
+@pytest.mark.parametrize("private", [True, False])
+def test_derivation_cache(maxsize, private):
+    master = to_master_key(bytes.fromhex(VECTORS[1]["seed_hex"]), True, True)
+    cache = DerivationCache(maxsize=maxsize)
+    # twice, to hit the cache
+    for _ in range(2):
+        for path, tests in VECTORS[1]["chain"].items():
+            type_ = "ext prv" if private else "ext pub"
+            assert str(derive_key(master, path, private, cache=cache)) == tests[type_]
+    if maxsize:
+        assert len(cache) <= maxsize
+
+
+def test_derivation_cache_threads():
+    master = to_master_key(bytes.fromhex(VECTORS[0]["seed_hex"]), True, True)
+    paths = [f"m/{a}h/{b}" for a in range(4) for b in range(6)]
+    expected = {p: derive_key(master, p, True) for p in paths}
+    cache = DerivationCache(maxsize=3)  # tiny, so threads evict each other's keys
+    errors = []
+
+    def hammer(seed):
+        rng = random.Random(seed)
+        try:
+            for _ in range(150):
+                path = rng.choice(paths)
+                assert derive_key(master, path, True, cache=cache) == expected[path]
+        except Exception as error:  # pragma: no cover
+            errors.append(error)
+
+    threads = [threading.Thread(target=hammer, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(cache) <= 3
+    assert cache.get(DerivationPath.parse("m/99")) is None
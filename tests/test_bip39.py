@@ -14,11 +14,11 @@ from bipsea.bip39 import (
     N_WORDS_META,
     bip39_words,
     entropy_to_words,
-    files,
     to_master_seed,
     validate_mnemonic_words,
+    wordlist_bytes,
 )
-from bipsea.util import LOGGER_NAME, __app_name__
+from bipsea.util import LOGGER_NAME
 
 MNEMONIC_12 = {
     "words": [
@@ -128,9 +128,7 @@ def test_bip39_words_bad_language():
 @pytest.mark.parametrize("language", LANGUAGES.keys())
 def test_wordlists(language):
     file_name = LANGUAGES[language]["file"]
-    list_path = files(__app_name__) / "wordlists" / file_name
-    with list_path.open("r") as f:
-        raw = f.read()
+    raw = wordlist_bytes(language).decode("utf-8")
     file_hash = hashlib.sha256(raw.encode("utf-8")).hexdigest()
     assert (
         file_hash == LANGUAGES[language]["hash"]
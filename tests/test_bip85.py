@@ -1,3 +1,4 @@
+import hashlib
 import logging
 import os
 from hashlib import sha256
@@ -17,6 +18,7 @@ from data.bip85_vectors import (
     XPRV,
 )
 
+from bipsea.bip32 import fingerprint
 from bipsea.bip32types import parse_ext_key
 from bipsea.bip39 import LANGUAGES, validate_mnemonic_words
 from bipsea.bip85 import (
@@ -25,6 +27,8 @@ from bipsea.bip85 import (
     INDEX_TO_LANGUAGE,
     apply_85,
     derive,
+    derive_application,
+    derive_full,
     split_and_validate,
     to_entropy,
 )
@@ -97,6 +101,34 @@ def test_mnemonic(vector):
     assert validate_mnemonic_words(words, "english")
 
 
+@pytest.mark.parametrize(
+    "vector",
+    BIP_39,
+    ids=[f"BIP_39-{v['mnemonic_length']}" for v in BIP_39],
+)
+def test_derive_full(vector):
+    master = parse_ext_key(vector["master"])
+    derivation = derive_full(master, "mnemonic", vector["mnemonic_length"])
+    assert derivation.path == vector["path"]
+    assert derivation.xprv == derive(master, vector["path"])
+    assert to_hex_string(derivation.entropy) == vector["derived_entropy"]
+    assert derivation.output == vector["derived_mnemonic"]
+    details = derivation.to_dict()
+    assert details["xpub"] == str(derive(master, vector["path"], private=False))
+    assert details["fingerprint"] == to_hex_string(fingerprint(derivation.xprv.data))
+    assert details["parent_fingerprint"] == to_hex_string(derivation.xprv.finger)
+    assert details["output"] == derivation.output
+
+
+@pytest.mark.parametrize("application", ["drng", "hex", "dice"])
+def test_derive_full_output(application):
+    master = parse_ext_key(COMMON_XPRV)
+    derivation = derive_full(master, application, index=3)
+    assert derivation.output == derive_application(master, application, index=3)
+    if application == "drng":
+        assert derivation.entropy == to_entropy(derivation.xprv.data[1:])
+
+
 @pytest.mark.filterwarnings("ignore:.*184 bits")
 @pytest.mark.parametrize("lang", LANGUAGES, ids=[lang for lang in LANGUAGES])
 @pytest.mark.parametrize(
@@ -235,6 +267,13 @@ def test_derive_public():
         derive(master, "m/1'")
 
 
+@pytest.mark.parametrize("sizes", [[1] * 3000, [7, 1500, 0, 3, 2000], [5000]])
+def test_drng_streaming(sizes):
+    drng = DRNG(bytes(64))
+    streamed = b"".join(drng.read(n) for n in sizes)
+    assert streamed == hashlib.shake_256(bytes(64)).digest(sum(sizes))
+
+
 def test_drng_input():
     DRNG(bytes(64))
     with pytest.raises(ValueError):
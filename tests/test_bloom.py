@@ -0,0 +1,90 @@
+import logging
+import math
+import random
+
+import pytest
+
+from bipsea.addresses import derive_addresses, descend, to_programs
+from bipsea.bip32 import derive_key, derive_public_points, to_master_key
+from bipsea.bip39 import to_master_seed
+from bipsea.bloom import BloomFilter, confirm, read_targets, scan, to_target
+from bipsea.hash160 import hash160
+from bipsea.util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+MNEMONIC = "abandon " * 11 + "about"
+MASTER = to_master_key(to_master_seed(MNEMONIC.split(), ""), mainnet=True, private=True)
+CHAIN = descend(derive_key(MASTER, "m/84h/0h/0h", private=False), "m/0")
+
+
+def random_keys(count, seed):
+    rng = random.Random(seed)
+    return [bytes(rng.getrandbits(8) for _ in range(20)) for _ in range(count)]
+
+
+@pytest.mark.parametrize("error_rate", [0.1, 0.01, 0.001])
+def test_bloom_filter(error_rate):
+    keys = random_keys(2000, 0)
+    bloom = BloomFilter.from_keys(keys, error_rate)
+    assert all(key in bloom for key in keys)
+    assert len(bloom) == 2000
+    # -log2(error_rate) * 1.44 bits a key
+    assert bloom.nbytes == pytest.approx(
+        -2000 * 1.44 * math.log2(error_rate) / 8, rel=0.01
+    )
+    others = random_keys(20000, 1)
+    false_positives = sum(key in bloom for key in others) / len(others)
+    assert false_positives < 2 * error_rate
+    assert bloom.estimated_error_rate() == pytest.approx(error_rate, rel=0.1)
+    assert repr(BloomFilter.from_keys(keys, error_rate)) == repr(bloom)
+    assert repr(BloomFilter.from_keys(keys[1:], error_rate)) != repr(bloom)
+
+
+def test_bloom_filter_invalid():
+    for capacity, error_rate in ((0, 0.01), (10, 0), (10, 1)):
+        with pytest.raises(ValueError):
+            BloomFilter(capacity, error_rate)
+    assert b"anything" not in BloomFilter(1)
+
+
+@pytest.mark.parametrize("address_type", ["p2pkh", "p2wpkh", "p2tr"])
+def test_scan(address_type):
+    wanted = [3, 17, 40]
+    addresses = list(derive_addresses(CHAIN, range(50), address_type))
+    targets = [to_target(addresses[i]) for i in wanted] + random_keys(500, 2)
+    # a high error rate, so that there are false positives to confirm away
+    bloom = BloomFilter.from_keys(targets, error_rate=0.2)
+    candidates = list(scan(CHAIN, range(50), bloom, address_type, chunk_size=7))
+    assert set(wanted) <= {number for number, _ in candidates}
+    confirmed = confirm(candidates, iter(targets))
+    assert [number for number, _ in confirmed] == wanted
+
+
+def test_read_targets(tmp_path):
+    point = derive_public_points(CHAIN, [5])
+    public = descend(CHAIN, "m/5").data
+    (address,) = derive_addresses(CHAIN, [5])
+    (taproot,) = derive_addresses(CHAIN, [5], "p2tr")
+    (output_key,) = to_programs(point, "p2tr")
+    path = tmp_path / "targets.txt"
+    path.write_text(
+        "\n".join(
+            [
+                "# child 5",
+                address,
+                f"{public.hex()}  # its public key",
+                hash160(public).hex().upper(),
+                "",
+                taproot,
+                output_key.hex(),
+            ]
+        )
+    )
+    assert list(read_targets(str(path))) == [hash160(public)] * 3 + [output_key] * 2
+    bloom = BloomFilter.from_file(str(path))
+    assert len(bloom) == 5 and hash160(public) in bloom and output_key in bloom
+    path.write_text(f"{address}\nnot a target\n")
+    with pytest.raises(ValueError, match="line 2"):
+        list(read_targets(str(path)))
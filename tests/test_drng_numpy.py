@@ -0,0 +1,70 @@
+import hashlib
+import logging
+
+import pytest
+from data.bip85_vectors import EXT_KEY_TO_ENTROPY
+
+from bipsea.bip32types import parse_ext_key
+from bipsea.bip85 import DRNG
+from bipsea.util import LOGGER_NAME, to_hex_string
+
+np = pytest.importorskip("numpy")
+from bipsea import drng_numpy  # noqa: E402
+from bipsea.drng_numpy import NumpyDRNG  # noqa: E402
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+VECTOR = next(v for v in EXT_KEY_TO_ENTROPY if "drng" in v)
+
+
+def test_vector():
+    master = parse_ext_key(VECTOR["master"])
+    drng = NumpyDRNG.from_master(master, index=0)
+    assert to_hex_string(drng.read(VECTOR["drng_length"])) == VECTOR["drng"]
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 4096])
+def test_matches_drng(block_size):
+    seed = bytes(range(64))
+    drng = NumpyDRNG(seed, block_size=block_size)
+    out = np.zeros((3, 5), dtype=np.uint32)
+    drng.fill(out)
+    raw = drng.random_raw(10)
+    single = drng.random_raw()
+    stream = hashlib.shake_256(seed).digest(60 + 88)
+    assert out.tobytes() == stream[:60]
+    assert raw.dtype == np.uint64
+    words = np.frombuffer(stream[60:140], dtype="<u8")
+    assert [int(r) for r in raw] == [int(w) for w in words]
+    assert int(words[0]) == int.from_bytes(stream[60:68], "little")
+    assert single == int.from_bytes(stream[140:148], "little")
+    assert drng.cursor == len(stream)
+    assert DRNG(seed).read(148) == stream
+
+
+@pytest.mark.parametrize("block_size", [7, 4096])
+def test_fallback(monkeypatch, block_size):
+    seed = bytes(range(64))
+    expected = NumpyDRNG(seed, block_size=block_size).random_raw(600)
+    monkeypatch.setattr(drng_numpy, "SHAKE256", None)
+    fallback = NumpyDRNG(seed, block_size=block_size)
+    assert fallback._squeeze.__self__.__class__ is DRNG
+    assert (fallback.random_raw(600) == expected).all()
+    assert fallback.read(9) == hashlib.shake_256(seed).digest(4809)[4800:]
+
+
+def test_random():
+    drng = NumpyDRNG(bytes(64))
+    floats = drng.random((100, 10))
+    assert floats.shape == (100, 10)
+    assert ((0 <= floats) & (floats < 1)).all()
+    assert 0 <= drng.random() < 1
+    assert (NumpyDRNG(bytes(64)).random((100, 10)) == floats).all()
+
+
+def test_bad_inputs():
+    with pytest.raises(ValueError):
+        NumpyDRNG(bytes(63))
+    with pytest.raises(ValueError):
+        NumpyDRNG(bytes(64)).fill(np.zeros((4, 4))[:, 0])
@@ -0,0 +1,73 @@
+import hashlib
+import logging
+import random
+
+import pytest
+
+from bipsea import hash160 as module
+from bipsea.hash160 import (
+    NATIVE_RIPEMD160,
+    hash160,
+    hash160_many,
+    native_ripemd160,
+    python_ripemd160,
+    ripemd160,
+)
+from bipsea.util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+# https://homes.esat.kuleuven.be/~bosselae/ripemd160.html
+VECTORS = [
+    (b"", "9c1185a5c5e9fc54612808977ee8f548b2258d31"),
+    (b"a", "0bdc9d2d256b3ee9daae347be6f4dc835a467ffe"),
+    (b"abc", "8eb208f7e05d987a9b044a8e98c6b087f15a0bfc"),
+    (b"message digest", "5d0689ef49d2fae572b881b123a85ffa21595f36"),
+    (b"abcdefghijklmnopqrstuvwxyz", "f71c27109c692c1b56bbdceb5b9d2865b3708dbc"),
+    (
+        b"abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq",
+        "12a053384a9c0c88e405a06c27dcf49ada62eb2b",
+    ),
+    (
+        b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789",
+        "b0e20b6e3116640286ed3a87a5713079b21f5189",
+    ),
+    (b"1234567890" * 8, "9b752e45573d4b39f4dbd3323cab82bf63326bfb"),
+]
+
+
+@pytest.mark.parametrize("data, expected", VECTORS)
+def test_vectors(data, expected):
+    assert python_ripemd160(data).hex() == expected
+    assert ripemd160(data).hex() == expected
+
+
+@pytest.mark.skipif(not NATIVE_RIPEMD160, reason="hashlib has no RIPEMD-160")
+def test_python_matches_native():
+    # every padding case: 55, 56, and 64 bytes are the block boundaries
+    rng = random.Random(160)
+    for size in list(range(130)) + [1000]:
+        data = bytes(rng.getrandbits(8) for _ in range(size))
+        assert python_ripemd160(data) == hashlib.new("ripemd160", data).digest()
+
+
+def test_hash160():
+    # BIP-32 test vector 1: the master's fingerprint is 3442193e
+    public = bytes.fromhex(
+        "0339a36013301597daef41fbe593a02cc513d0b55527ec2df1050e2e8ff49c85c2"
+    )
+    assert hash160(public).hex().startswith("3442193e")
+    assert hash160(public) == python_ripemd160(hashlib.sha256(public).digest())
+    keys = [public, bytes(33), b"", memoryview(public)]
+    assert hash160_many(keys) == [hash160(k) for k in keys]
+    assert hash160_many(iter(keys)) == hash160_many(keys)
+    assert hash160_many([]) == []
+
+
+def test_no_native(monkeypatch):
+    def new(name, *args, **kwargs):
+        raise ValueError(f"unsupported hash type {name}")
+
+    monkeypatch.setattr(module.hashlib, "new", new)
+    assert native_ripemd160() is None
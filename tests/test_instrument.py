@@ -0,0 +1,95 @@
+import logging
+import threading
+
+import pytest
+from data.bip85_vectors import COMMON_XPRV, PWD_BASE85
+
+import bipsea.bip32
+import bipsea.bip32types
+import bipsea.bip85
+from bipsea import instrument, secp256k1
+from bipsea.bip32types import ExtendedKey, parse_ext_key
+from bipsea.bip85 import derive_application
+from bipsea.util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+@pytest.fixture
+def enabled():
+    instrument.enable()
+    yield
+    instrument.disable()
+
+
+def test_disabled_is_untouched():
+    originals = (
+        bipsea.bip32.CKDpriv,
+        bipsea.bip85.derive_key_bip32,
+        ExtendedKey.__dict__["__str__"],
+    )
+    instrument.enable()
+    assert bipsea.bip32.CKDpriv is not originals[0]
+    assert bipsea.bip85.derive_key_bip32 is not originals[1]
+    instrument.disable()
+    assert not instrument.enabled()
+    assert originals == (
+        bipsea.bip32.CKDpriv,
+        bipsea.bip85.derive_key_bip32,
+        ExtendedKey.__dict__["__str__"],
+    )
+
+
+def test_stages(enabled):
+    master = parse_ext_key(COMMON_XPRV)
+    assert derive_application(master, "base85", 12) == PWD_BASE85[0]["derived_pwd"]
+    stats = instrument.stats
+    # m/83696968'/707785'/12'/0': 4 hardened children
+    assert stats["bipsea.bip32.CKDpriv"][0] == 4
+    calls, total, own, _ = stats["bipsea.bip32.derive_key"]
+    assert calls == 1 and 0 < own < total
+    # parse_ext_key, plus the parent fingerprints
+    assert instrument.count(instrument.EC_MULTIPLY) == 5
+
+    report = instrument.report()
+    assert "bipsea.bip32.CKDpriv" in report
+    assert "bipsea.rsa.generate" not in report  # never called
+    assert "EC scalar multiplications: 5" in report
+    assert "keyed_hmac_sha512 cache" in report
+
+
+def test_exceptions_still_counted(enabled):
+    with pytest.raises(ValueError):
+        # by module attribute, since names imported before enable() aren't wrapped
+        bipsea.bip32types.parse_ext_key("xprv-nope")
+    assert instrument.stats["bipsea.bip32types.parse_ext_key"][0] == 1
+    assert not instrument._local.stack
+
+
+def test_multiplications(enabled):
+    q = secp256k1.to_affine_many([secp256k1.multiply_g(7)])[0]
+    assert instrument.count(instrument.EC_MULTIPLY) == 1
+    # a * G + q adds q to multiply_g(a): one multiplication, not two
+    secp256k1.multiply_add(3, q)
+    secp256k1.multiply_add(4, q)
+    assert instrument.stats["bipsea.secp256k1.multiply_g"][0] == 3
+    assert instrument.count(instrument.EC_MULTIPLY) == 3
+
+
+def test_threads(enabled):
+    master = parse_ext_key(COMMON_XPRV)
+
+    def derive():
+        for index in range(10):
+            bipsea.bip85.derive_application(master, "base85", 12, index)
+
+    threads = [threading.Thread(target=derive) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    derive()
+    for thread in threads:
+        thread.join()
+    assert instrument.stats["bipsea.bip85.derive_application"][0] == 50
+    assert not instrument._local.stack
+    for calls, total, own, _ in instrument.stats.values():
+        assert 0 <= own <= total
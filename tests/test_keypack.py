@@ -0,0 +1,71 @@
+import logging
+
+import pytest
+from data.bip85_vectors import COMMON_XPRV
+
+from bipsea.bip32types import parse_ext_key
+from bipsea.bip85 import derive
+from bipsea.keypack import HEADER_SIZE, KeyPack, header, write_keys
+from bipsea.util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+MASTER = parse_ext_key(COMMON_XPRV)
+KEYS = [MASTER] + [derive(MASTER, f"m/{i}/{i}'") for i in range(4)]
+
+
+def pack(tmp_path, keys=KEYS, checksum=True):
+    path = tmp_path / "keys.pack"
+    with open(path, "wb") as file:
+        assert write_keys(file, keys, checksum=checksum) == len(keys)
+
+    return path
+
+
+@pytest.mark.parametrize("checksum", [False, True])
+def test_round_trip(tmp_path, checksum):
+    path = pack(tmp_path, checksum=checksum)
+    assert path.stat().st_size == HEADER_SIZE + len(KEYS) * (78 + 4 * checksum)
+    with KeyPack(path) as keys:
+        assert keys.checksum == checksum
+        assert len(keys) == len(KEYS)
+        assert list(keys) == KEYS
+        assert keys[-1] == KEYS[-1]
+        assert [bytes(r) for r in keys.records()] == [k.to_raw(checksum) for k in KEYS]
+        with pytest.raises(IndexError):
+            keys[len(KEYS)]
+    with KeyPack(path, validate=True) as keys:
+        assert list(keys) == KEYS
+
+
+def test_empty(tmp_path):
+    with KeyPack(pack(tmp_path, keys=[])) as keys:
+        assert len(keys) == 0
+        assert list(keys) == []
+
+
+def test_corrupt(tmp_path):
+    path = pack(tmp_path)
+    data = bytearray(path.read_bytes())
+    data[HEADER_SIZE + 60] ^= 1
+    path.write_bytes(data)
+    with KeyPack(path) as keys:
+        assert keys[1] == KEYS[1]
+        with pytest.raises(ValueError, match="checksum"):
+            keys[0]
+
+
+@pytest.mark.parametrize(
+    "data, error",
+    [
+        (b"not a key pack", "Not a bipsea"),
+        (b"BIPSEA\x02\x00", "version"),
+        (header(checksum=True) + bytes(81), "Truncated"),
+    ],
+)
+def test_bad_files(tmp_path, data, error):
+    path = tmp_path / "bad.pack"
+    path.write_bytes(data)
+    with pytest.raises(ValueError, match=error):
+        KeyPack(path)
@@ -0,0 +1,165 @@
+import logging
+
+import base58
+import pytest
+from data.bip85_vectors import COMMON_XPRV
+
+from bipsea.addresses import to_addresses
+from bipsea.bip32 import derive_key
+from bipsea.bip32types import DerivationPath, parse_ext_key
+from bipsea.bip85 import derive_full
+from bipsea.bloom import BloomFilter
+from bipsea.bloom import to_target as to_program_target
+from bipsea.reverse import (
+    PathSpace,
+    Template,
+    confirm_all,
+    find,
+    find_all,
+    normalize,
+    to_program,
+    to_target,
+)
+from bipsea.util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+MASTER = parse_ext_key(COMMON_XPRV)
+
+
+def to_wif(key):
+    return base58.b58encode_check(b"\x80" + key.data[1:] + b"\x01").decode()
+
+
+@pytest.mark.parametrize(
+    "text, path",
+    [
+        ("m/84'/0'/*'", "m/84'/0'/5'"),
+        ("m/44h/0h/0h/0/*", "m/44'/0'/0'/0/5"),
+        ("m/84'/0'/*'/0/1", "m/84'/0'/5'/0/1"),
+        ("m/*", "m/5"),
+    ],
+)
+def test_template(text, path):
+    template = Template.parse(text)
+    assert template.path(5) == DerivationPath.parse(path)
+    assert Template.parse(str(template)) == template
+    assert not template.is_bip85()
+    assert Template.parse("m/83696968'/39'/0'/12'/*'").is_bip85()
+
+
+@pytest.mark.parametrize(
+    "text, error",
+    [
+        ("m/0", "one \\* segment"),
+        ("m/*/*", "one \\* segment"),
+        ("*", "one \\* segment"),
+        ("m/0/x*", "one \\* segment"),
+        ("m/*/0x", "Unexpected path"),
+        ("m/83696968'/707785'/20'/*", "hardened"),
+        ("m/83696968'/999'/*'", "BIP-85 application"),
+        ("m/83696968'/*'", "BIP-85 application"),
+        ("m/83696968'/0'/0'/*'", "drng"),
+    ],
+)
+def test_template_invalid(text, error):
+    with pytest.raises(ValueError, match=error):
+        Template.parse(text)
+
+
+def test_path_space():
+    template = Template.parse("m/84'/0'/*'/0/1")
+    values = PathSpace(MASTER, template).values(range(3, 6))
+    assert values == [
+        (i, derive_key(MASTER, template.path(i), private=True)) for i in range(3, 6)
+    ]
+    (_, derivation), *_ = PathSpace(
+        MASTER, Template.parse("m/83696968'/707785'/20'/*'")
+    ).values(range(9, 10))
+    assert derivation == derive_full(MASTER, "base85", 20, 9)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+@pytest.mark.parametrize(
+    "template, index, target",
+    [
+        ("m/84'/0'/*'", 1500, lambda p: str(derive_key(MASTER, p, private=False))),
+        ("m/84'/0'/*'", 40, lambda p: str(derive_key(MASTER, p, private=True))),
+        ("m/44'/0'/0'/0/*", 700, lambda p: to_wif(derive_key(MASTER, p, True))),
+        ("m/0'/*/3", 30, lambda p: str(derive_key(MASTER, p, private=False))),
+    ],
+)
+def test_find_keys(workers, template, index, target):
+    template = Template.parse(template)
+    text = target(template.path(index))
+    match = find(MASTER, text, template, workers=workers, chunk_size=128)
+    assert match.index == index
+    assert find(MASTER, text, template, 0, index) is None
+
+
+@pytest.mark.parametrize(
+    "application, number, template",
+    [
+        ("base85", 20, "m/83696968'/707785'/20'/*'"),
+        ("wif", None, "m/83696968'/2'/*'"),
+        ("mnemonic", 12, "m/83696968'/39'/0'/12'/*'"),
+    ],
+)
+def test_find_bip85(application, number, template):
+    output = derive_full(MASTER, application, number, 1234).output
+    match = find(MASTER, f"  {output}\n", template)
+    assert match.index == 1234
+    assert match.value.output == output
+    assert match.value.path == str(Template.parse(template).path(1234))
+
+
+def test_find_formatted():
+    words = derive_full(MASTER, "mnemonic", 12, 7).output.split()
+    pretty = "\n".join(f"{i + 1}) {word}" for i, word in enumerate(words))
+    match = find(MASTER, pretty, "m/83696968'/39'/0'/12'/*'", 0, 10)
+    assert match.index == 7
+    pem = derive_full(MASTER, "rsa", 1024, 2).output
+    assert "\n" in pem.strip()
+    match = find(
+        MASTER, pem.replace("\n", "\r\n"), "m/83696968'/828365'/1024'/*'", 0, 3
+    )
+    assert match.index == 2
+    assert match.value.output == pem
+
+
+@pytest.mark.parametrize("address_type", ["p2pkh", "p2wpkh", "p2tr"])
+def test_find_all_targets(address_type):
+    template = Template.parse("m/84'/0'/0'/0/*")
+    keys = [derive_key(MASTER, template.path(i), private=True) for i in (3, 17, 41)]
+    addresses = list(to_addresses(keys, address_type))
+    targets = [to_program_target(address) for address in addresses]
+    assert targets == [to_program(key, address_type) for key in keys]
+    # a poor filter, so that there are false positives to weed out
+    bloom = BloomFilter.from_keys(targets, error_rate=0.3)
+    candidates = list(
+        find_all(MASTER, bloom, template, 0, 60, address_type=address_type)
+    )
+    assert {3, 17, 41} < {m.index for m in candidates}
+    confirmed = confirm_all(candidates, iter(targets), address_type)
+    assert [m.index for m in confirmed] == [3, 17, 41]
+    assert confirmed[0].value == keys[0]
+    assert find(MASTER, bloom, template, 4, 60, address_type=address_type).index > 3
+    with pytest.raises(ValueError, match="BIP-32 template"):
+        find(MASTER, bloom, "m/83696968'/2'/*'")
+
+
+def test_find_invalid():
+    with pytest.raises(ValueError, match="Expected an xprv"):
+        find(MASTER, "password", "m/84'/0'/*'")
+    xpub = derive_key(MASTER, "m/84'/0'", private=False)
+    with pytest.raises(ValueError, match="private master"):
+        find(xpub, str(xpub), "m/*")
+
+
+def test_to_target():
+    key = derive_key(MASTER, "m/1", private=True)
+    assert to_target(str(key)).key == key
+    assert to_target(to_wif(key)).secret == key.data[1:]
+    assert to_target(" two  words ") == ("two words", None, None)
+    assert normalize("1) two\r\n2) words\n") == "two words"
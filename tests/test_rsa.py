@@ -0,0 +1,78 @@
+import logging
+import os
+
+import pytest
+from Crypto.Math.Primality import PROBABLY_PRIME, lucas_test
+from Crypto.PublicKey import RSA
+from data.bip85_vectors import COMMON_XPRV
+
+from bipsea.bip32types import parse_ext_key
+from bipsea.bip85 import DRNG, apply_85, derive, to_entropy
+from bipsea.rsa import generate, jacobi, lucas, miller_rabin, small_primes
+from bipsea.util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+@pytest.mark.parametrize("index", [0, 1])
+def test_rsa_vectors(index):
+    master = parse_ext_key(COMMON_XPRV)
+    path = f"m/83696968'/828365'/1024'/{index}'"
+    derived = derive(master, path)
+    output = apply_85(derived, path)
+    key = RSA.import_key(output["application"])
+    file_path = os.path.join("tests", "data", "rsa", f"1024-{index}-public.pem")
+    with open(file_path, "rb") as f:
+        assert key.public_key().export_key() == f.read()
+
+    entropy = to_entropy(derived.data[1:])
+    ours = generate(1024, DRNG(entropy).read)
+    assert ours.public_pem().encode() == key.public_key().export_key()
+    assert ours.private_pem() == output["application"]
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_pycryptodome(seed):
+    entropy = bytes([seed]) * 64
+    ours = generate(1024, DRNG(entropy).read)
+    theirs = RSA.generate(1024, randfunc=DRNG(entropy).read)
+    assert ours.private_pem().encode() == theirs.export_key()
+    assert ours.public_pem().encode() == theirs.public_key().export_key()
+    assert ours.p < ours.q
+    assert ours.n == ours.p * ours.q
+    assert (ours.u * ours.p) % ours.q == 1
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("bits", [2048, 4096])
+def test_matches_pycryptodome_slow(bits):
+    entropy = bytes(64)
+    ours = generate(bits, DRNG(entropy).read)
+    theirs = RSA.generate(bits, randfunc=DRNG(entropy).read)
+    assert ours.private_pem().encode() == theirs.export_key()
+
+
+@pytest.mark.parametrize("bits", [512, 16385])
+def test_bad_bits(bits):
+    with pytest.raises(ValueError):
+        generate(bits, DRNG(bytes(64)).read)
+
+
+def test_primality():
+    primes = set(small_primes(2000))
+    # 2**127 - 1 is prime; Carmichael 561 and 2**128 + 1 are not
+    for n, expected in ((2**127 - 1, True), (561, False), (2**128 + 1, False)):
+        assert miller_rabin(n, 10, DRNG(bytes(64)).read) == expected
+        assert lucas(n) == expected
+    assert all(lucas(p) for p in primes if p > 2)
+    # same verdicts as pycryptodome, including Lucas pseudoprimes like 323
+    assert all(lucas(n) == (lucas_test(n) == PROBABLY_PRIME) for n in range(7, 2000, 2))
+    # sieved and unsieved paths agree
+    for small, big in ((3 * 5, 2**61 - 1), (7, 2**89 - 1)):
+        n = small * big
+        sieved = DRNG(bytes(64))
+        unsieved = DRNG(bytes(64))
+        assert not miller_rabin(n, 4, sieved.read, small_part=small)
+        assert not miller_rabin(n, 4, unsieved.read)
+        assert sieved.cursor == unsieved.cursor
+    assert jacobi(2, 7) == 1 and jacobi(3, 7) == -1 and jacobi(7, 21) == 0
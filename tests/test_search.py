@@ -0,0 +1,126 @@
+import json
+import logging
+import re
+
+import pytest
+from data.bip85_vectors import COMMON_XPRV
+
+from bipsea.addresses import descend
+from bipsea.bip32 import derive_public_children
+from bipsea.bip32types import parse_ext_key
+from bipsea.bip85 import derive_full
+from bipsea.search import (
+    BIP85Space,
+    ChildSpace,
+    Match,
+    Pattern,
+    Progress,
+    search,
+    to_text,
+)
+from bipsea.util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+MASTER = parse_ext_key(COMMON_XPRV)
+SPACE = BIP85Space(MASTER, "base85", 12)
+LOWER = Pattern("^[a-z]{3}")
+
+
+def has_digit(value):
+    return any(c.isdigit() for c in value.output)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_search(workers):
+    expected = [
+        i
+        for i in range(300)
+        if re.search("^[a-z]{3}", derive_full(MASTER, "base85", 12, i).output)
+    ]
+    assert expected
+    matches = list(search(SPACE, LOWER, 0, 300, workers=workers, chunk_size=16))
+    assert [m.index for m in matches] == expected
+    assert matches[0].value == derive_full(MASTER, "base85", 12, expected[0])
+    limited = search(SPACE, LOWER, 0, 300, limit=2, workers=workers, chunk_size=16)
+    assert list(limited) == matches[:2]
+
+
+def test_children():
+    parent = descend(MASTER, "m/0")
+    children = derive_public_children(parent, range(40))
+    matches = list(search(ChildSpace(parent), Pattern("^0", "fingerprint"), 0, 40))
+    assert matches == [
+        Match(i, child)
+        for i, child in enumerate(children)
+        if to_text(child, "fingerprint").startswith("0")
+    ]
+
+
+def test_to_text():
+    derivation = derive_full(MASTER, "hex", 16)
+    assert to_text(derivation) == derivation.output
+    assert to_text(derivation, "fingerprint") == derivation.to_dict()["fingerprint"]
+    with pytest.raises(ValueError):
+        to_text(derivation, "xprv")
+
+
+def test_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / "search.json")
+    expected = [m.index for m in search(SPACE, has_digit, 0, 64)]
+    first = list(search(SPACE, has_digit, 0, 64, limit=2, checkpoint=checkpoint))
+    assert [m.index for m in first] == expected[:2]
+    with open(checkpoint) as file:
+        state = json.load(file)
+    assert state["next"] == expected[1] + 1
+    assert state["matches"] == expected[:2]
+    assert MASTER.data.hex() not in json.dumps(state)
+    # resumes after the last match, and repeats the earlier ones
+    resumed = list(search(SPACE, has_digit, 0, 64, checkpoint=checkpoint))
+    assert [m.index for m in resumed] == expected
+    assert resumed[0].value.output == first[0].value.output
+    with pytest.raises(ValueError, match="different search"):
+        list(search(SPACE, LOWER, 0, 64, checkpoint=checkpoint))
+
+
+def test_checkpoint_identity(tmp_path):
+    checkpoint = str(tmp_path / "search.json")
+
+    def starting(prefix):
+        return lambda value: value.output.startswith(prefix)
+
+    list(search(SPACE, starting("a"), 0, 32, checkpoint=checkpoint))
+    # the same lambda and closure, made again, resumes
+    assert list(search(SPACE, starting("a"), 0, 32, checkpoint=checkpoint)) == list(
+        search(SPACE, starting("a"), 0, 32)
+    )
+    for other in (starting("b"), lambda value: value.output.startswith("a")):
+        with pytest.raises(ValueError, match="different search"):
+            list(search(SPACE, other, 0, 32, checkpoint=checkpoint))
+    marker = object()
+    with pytest.raises(ValueError, match="differs by run"):
+        list(search(SPACE, lambda value: value is marker, 0, 32, checkpoint=checkpoint))
+
+
+def test_checkpoint_interrupted(tmp_path):
+    checkpoint = str(tmp_path / "search.json")
+    matches = search(SPACE, has_digit, 0, 64, checkpoint=checkpoint)
+    first = next(matches)
+    matches.close()
+    with open(checkpoint) as file:
+        assert json.load(file)["next"] == first.index + 1
+
+
+def test_progress():
+    reports = []
+    list(search(SPACE, has_digit, 0, 40, progress=reports.append, chunk_size=16))
+    assert [p.scanned for p in reports] == [16, 32, 40, 40]
+    assert reports[-1].rate > 0
+    assert "Scanned 40 indexes" in str(reports[-1])
+    assert Progress(10, 0, 0).rate == 0
+
+
+def test_invalid_range():
+    with pytest.raises(ValueError):
+        next(search(SPACE, has_digit, 5, 4))
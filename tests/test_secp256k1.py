@@ -0,0 +1,124 @@
+import logging
+import random
+
+import pytest
+from ecdsa import SECP256k1
+
+from bipsea import secp256k1
+from bipsea.secp256k1 import (
+    GX,
+    INFINITY,
+    N,
+    P,
+    add,
+    add_affine,
+    batch_invert,
+    compress,
+    decompress,
+    double,
+    g_table,
+    multiply_add,
+    multiply_g,
+    to_affine,
+    to_affine_many,
+)
+from bipsea.util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+SCALARS = [1, 2, 3, 15, 16, 17, N - 1, N - 2, 2**255, 2**128 + 1] + [
+    random.Random(i).randrange(1, N) for i in range(20)
+]
+
+
+def reference(k: int):
+    point = SECP256k1.generator * k
+    return point.x(), point.y()
+
+
+@pytest.mark.parametrize("k", SCALARS)
+def test_multiply_g(k):
+    assert to_affine(multiply_g(k)) == reference(k)
+
+
+def test_multiply_g_edges():
+    assert to_affine(multiply_g(0)) is None
+    assert to_affine(multiply_g(N)) is None
+    assert to_affine(multiply_g(N + 5)) == reference(5)
+    # 4-bit windows
+    assert len(g_table()) == 64 and all(len(row) == 15 for row in g_table())
+
+
+@pytest.mark.parametrize("k", SCALARS)
+def test_multiply_add(k):
+    q = SECP256k1.generator * 7919
+    expected = SECP256k1.generator * k + q
+    assert to_affine(multiply_add(k, (q.x(), q.y()))) == (expected.x(), expected.y())
+
+
+def test_multiply_add_cancels():
+    q = reference(5)
+    assert to_affine(multiply_add(N - 5, q)) is None
+    assert to_affine(multiply_add(0, q)) == q
+
+
+def test_group_law():
+    a, b = SCALARS[-2:]
+    pa, pb = multiply_g(a), multiply_g(b)
+    assert to_affine(add(pa, pb)) == reference(a + b)
+    assert to_affine(add_affine(pa, to_affine(pb))) == reference(a + b)
+    assert to_affine(double(pa)) == reference(2 * a)
+    # P + P and P + -P
+    assert to_affine(add(pa, pa)) == reference(2 * a)
+    assert to_affine(add_affine(pa, to_affine(pa))) == reference(2 * a)
+    assert to_affine(add(pa, multiply_g(N - a))) is None
+    assert add(INFINITY, pa) == pa and add(pa, INFINITY) == pa
+
+
+def test_batch_invert():
+    values = [random.Random(i).randrange(1, P) for i in range(50)]
+    assert batch_invert(values) == [pow(v, -1, P) for v in values]
+    assert batch_invert([3, 5], 7) == [5, 3]
+    assert batch_invert([]) == []
+
+
+def test_to_affine_many():
+    points = [multiply_g(k) for k in SCALARS] + [INFINITY]
+    assert to_affine_many(points) == [reference(k) for k in SCALARS] + [None]
+    assert to_affine_many([]) == []
+
+
+def test_compress():
+    for k in SCALARS:
+        point = SECP256k1.generator * k
+        expected = bytes([2 + (point.y() & 1)]) + point.x().to_bytes(32, "big")
+        assert compress(reference(k)) == expected
+
+
+def test_decompress():
+    for k in SCALARS:
+        assert decompress(compress(reference(k))) == reference(k)
+    secp256k1._decompress.cache_clear()
+    data = compress(reference(7))
+    decompress(data)
+    # bytes-like records (KeyPack, AddressIndex) share the cache with bytes
+    assert decompress(memoryview(bytearray(data))) == reference(7)
+    assert decompress(bytearray(data)) == reference(7)
+    assert secp256k1._decompress.cache_info().hits == 2
+    assert secp256k1.lift(data) == reference(7)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"\x04" + GX.to_bytes(32, "big"),
+        b"\x02" + GX.to_bytes(32, "big")[1:],
+        b"\x02" + P.to_bytes(32, "big"),
+        # x**3 + 7 is not a square mod P
+        b"\x02" + (5).to_bytes(32, "big"),
+    ],
+)
+def test_decompress_invalid(data):
+    with pytest.raises(ValueError):
+        decompress(data)
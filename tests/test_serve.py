@@ -0,0 +1,155 @@
+import io
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from click.testing import CliRunner
+from data.bip85_vectors import COMMON_XPRV
+
+from bipsea.bip32types import parse_ext_key
+from bipsea.bip85 import derive_application
+from bipsea.bipsea import cli
+from bipsea.serve import Server, Warm, remove_stale_socket, request, run
+from bipsea.util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+MNEMONIC = (
+    "elder major green sting survey canoe inmate funny bright jewel anchor volcano"
+)
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / "bipsea.sock")
+    with Server(path, cli) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        thread.join()
+
+
+def test_run_matches_library():
+    warm = Warm()
+    args = ["derive", "-a", "base85", "-n", "20", "-x", COMMON_XPRV]
+    expected = derive_application(parse_ext_key(COMMON_XPRV), "base85", 20)
+    for _ in range(2):
+        response = run(cli, warm, args)
+        assert response == {"exit_code": 0, "stdout": expected + "\n", "stderr": ""}
+    assert warm.parse_ext_key.cache_info().hits == 1
+    master = parse_ext_key(COMMON_XPRV)
+    assert len(warm.derivation_cache(master)) > 0
+
+
+def test_run_errors():
+    warm = Warm()
+    response = run(cli, warm, ["derive", "-a", "base85", "-n", "5", "-x", COMMON_XPRV])
+    assert response["exit_code"] == 2
+    assert "out of range" in response["stderr"]
+    with pytest.raises(ValueError, match="daemon"):
+        run(cli, warm, ["serve", "-s", "x"])
+    with pytest.raises(TypeError):
+        run(cli, warm, "derive")
+
+
+def test_run_stdin():
+    warm = Warm()
+    args = ["derive", "-a", "hex", "-n", "16"]
+    assert run(cli, warm, args, piped=True) == {"need_stdin": True}
+    response = run(cli, warm, args, piped=True, stdin=COMMON_XPRV + "\n")
+    master = parse_ext_key(COMMON_XPRV)
+    assert response["stdout"] == derive_application(master, "hex", 16) + "\n"
+
+
+def test_request(server):
+    path = server.server_address
+    xprv = request(path, ["xprv", "-m", MNEMONIC])["stdout"].strip()
+    assert xprv.startswith("xprv")
+    # a tty-like stdin is never read; a piped one is read only on demand
+    response = request(path, ["mnemonic", "-n", "12"], stdin=io.StringIO("unused"))
+    assert len(response["stdout"].split()) == 12
+    response = request(path, ["derive", "-a", "hex"], stdin=io.StringIO(xprv))
+    assert response["exit_code"] == 0
+    assert response == request(path, ["derive", "-a", "hex", "-x", xprv])
+
+
+def test_stale_socket(server, tmp_path):
+    with pytest.raises(OSError, match="already listening"):
+        remove_stale_socket(server.server_address)
+    remove_stale_socket(str(tmp_path / "missing.sock"))
+
+
+def test_regular_file_survives(tmp_path):
+    notes = tmp_path / "notes.txt"
+    notes.write_text("keep me")
+    with pytest.raises(OSError, match="Not a socket"):
+        remove_stale_socket(str(notes))
+    result = CliRunner().invoke(cli, ["serve", "-s", str(notes)])
+    assert result.exit_code == 1
+    assert "Not a socket" in result.output
+    assert notes.read_text() == "keep me"
+
+
+def test_idle_connection(server):
+    path = server.server_address
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as idle:
+        idle.connect(path)
+        # a second client gets answered while the first sits idle
+        response = request(path, ["mnemonic", "-n", "12"])
+        assert len(response["stdout"].split()) == 12
+
+
+def test_client_directory(tmp_path, monkeypatch):
+    daemon_dir, client_dir = tmp_path / "daemon", tmp_path / "client"
+    daemon_dir.mkdir()
+    client_dir.mkdir()
+    (client_dir / "m.csv").write_text("label,application,length,index\nx,hex,16,0\n")
+    path = str(tmp_path / "bipsea.sock")
+    # a process of its own, since the working directory is per process
+    daemon = subprocess.Popen(
+        [sys.executable, "-c", "from bipsea.bipsea import cli; cli()", "serve"]
+        + ["-s", path],
+        cwd=daemon_dir,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while not os.path.exists(path):
+            assert time.monotonic() < deadline and daemon.poll() is None
+            time.sleep(0.05)
+        monkeypatch.chdir(client_dir)
+        args = ["vault", "-m", "m.csv", "-x", COMMON_XPRV]
+        response = request(path, args)
+        local = CliRunner().invoke(cli, args)
+        assert response["exit_code"] == 0, response["stderr"]
+        assert response["stdout"] == local.output
+        checkpoint = ["search", "-x", COMMON_XPRV, "-a", "hex", "-r", "0-9"]
+        checkpoint += ["-m", "^0", "--checkpoint", "search.json"]
+        assert request(path, checkpoint)["exit_code"] == 0
+        assert (client_dir / "search.json").exists()
+        assert not (daemon_dir / "search.json").exists()
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+
+def test_run_cwd(tmp_path):
+    response = run(cli, Warm(), ["mnemonic"], cwd=str(tmp_path))
+    assert response["exit_code"] == 0
+    with pytest.raises(ValueError, match="client's directory"):
+        run(cli, Warm(), ["mnemonic"], cwd=str(tmp_path / "missing"))
+
+
+def test_run_batch_stdin():
+    warm = Warm()
+    args = ["derive", "--batch", "-a", "hex", "-x", COMMON_XPRV]
+    assert run(cli, warm, args, piped=True) == {"need_stdin": True}
+    response = run(cli, warm, args, piped=True, stdin='{"index": 1}\n')
+    assert response["exit_code"] == 0
+    assert '"line": 1' in response["stdout"]
@@ -0,0 +1,85 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from data.bip85_vectors import COMMON_XPRV, PWD_BASE85
+
+from bipsea import singleflight
+from bipsea.bip32types import parse_ext_key
+from bipsea.bip85 import derive
+from bipsea.singleflight import SingleFlight
+from bipsea.util import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+MASTER = parse_ext_key(COMMON_XPRV)
+N_THREADS = 8
+
+
+def burst(function, n=N_THREADS):
+    """n threads call function at (nearly) the same moment"""
+    barrier = threading.Barrier(n)
+
+    def call(_):
+        barrier.wait()
+        return function()
+
+    with ThreadPoolExecutor(n) as pool:
+        return list(pool.map(call, range(n)))
+
+
+def test_coalesce():
+    flights, runs = SingleFlight(), []
+
+    def slow(x):
+        runs.append(x)
+        time.sleep(0.05)
+        return x * 2
+
+    assert burst(lambda: flights.do("k", slow, 21)) == [42] * N_THREADS
+    assert len(runs) == 1
+    assert flights.shared == N_THREADS - 1
+    assert flights.in_flight() == 0
+    # nothing is cached once the flight lands
+    assert flights.do("k", slow, 1) == 2 and len(runs) == 2
+
+
+def test_keys_are_independent():
+    flights = SingleFlight()
+    results = burst(lambda: flights.do(threading.get_ident(), threading.get_ident))
+    assert len(set(results)) == N_THREADS
+    assert flights.shared == 0
+
+
+def test_shared_exception():
+    flights, runs = SingleFlight(), []
+
+    def fail():
+        runs.append(1)
+        time.sleep(0.05)
+        raise ValueError("nope")
+
+    def call():
+        with pytest.raises(ValueError, match="nope"):
+            flights.do("k", fail)
+
+    burst(call)
+    assert len(runs) == 1
+    assert flights.in_flight() == 0
+
+
+def test_derivations():
+    path = "m/83696968'/707785'/12'/0'"
+    same = [
+        singleflight.derive(MASTER, path),
+        singleflight.derive(MASTER, path.replace("'", "h")),
+    ]
+    assert same[0] == same[1] == derive(MASTER, path)
+    pwds = burst(lambda: singleflight.derive_application(MASTER, "base85", 12))
+    assert pwds == [PWD_BASE85[0]["derived_pwd"]] * N_THREADS
+    words = "punch man spread gap size struggle clean crouch cloth swear erode fan"
+    seeds = burst(lambda: singleflight.to_master_seed(words.split(), ""))
+    assert len(set(seeds)) == 1
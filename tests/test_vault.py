@@ -0,0 +1,91 @@
+import json
+import logging
+
+import pytest
+from data.bip85_vectors import COMMON_XPRV
+
+from bipsea.bip32types import parse_ext_key
+from bipsea.bip85 import derive_application
+from bipsea.util import LOGGER_NAME
+from bipsea.vault import VaultEntry, format_records, generate, read_manifest
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+CSV_MANIFEST = """
+label,application,length,index,special,to
+github,base85,20,0,,
+bank,base64,32,3,,
+pin,dice,6,0,6,
+phrase,mnemonic,12,1,,jpn
+key,wif,,0,,
+"""
+
+ENTRIES = [
+    VaultEntry("github", "base85", 20, 0),
+    VaultEntry("bank", "base64", 32, 3),
+    VaultEntry("pin", "dice", 6, 0, special=6),
+    VaultEntry("phrase", "mnemonic", 12, 1, to="jpn"),
+    VaultEntry("key", "wif", None, 0),
+]
+
+
+def test_read_manifest():
+    assert list(read_manifest(CSV_MANIFEST.splitlines())) == ENTRIES
+    jsonl = [json.dumps({k: v for k, v in e._asdict().items()}) for e in ENTRIES]
+    assert list(read_manifest(["", *jsonl])) == ENTRIES
+    assert list(read_manifest([])) == []
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        ["label,application,length", "x,google,20"],
+        ["label,application,length,color", "x,hex,20,red"],
+        ["label,application,length", "x,hex,twenty"],
+        ['{"label": "x", "application": "mnemonic", "to": "xyz"}'],
+    ],
+)
+def test_read_bad_manifest(lines):
+    with pytest.raises(ValueError, match="Manifest entry 1"):
+        list(read_manifest(lines))
+
+
+@pytest.mark.parametrize(
+    "lines, number, error",
+    [
+        (["label,application,length", "x,hex,20", "y,wif,20"], 2, "length has no"),
+        (['{"label": "x", "application": "xprv", "length": 64}'], 1, "length has no"),
+        (["label,application,to", "x,mnemonic,jpn", "y,hex,jpn"], 2, "to requires"),
+        (['{"label": "x", "application": "base85", "to": "spa"}'], 1, "to requires"),
+    ],
+)
+def test_read_ignored_fields(lines, number, error):
+    with pytest.raises(ValueError, match=f"Manifest entry {number}: {error}"):
+        list(read_manifest(lines))
+
+
+def test_generate():
+    master = parse_ext_key(COMMON_XPRV)
+    records = list(generate(master, ENTRIES))
+    assert [r["label"] for r in records] == [e.label for e in ENTRIES]
+    for entry, record in zip(ENTRIES, records):
+        assert record["secret"] == derive_application(
+            master,
+            entry.application,
+            entry.length,
+            entry.index,
+            entry.special,
+            {"eng": "english", "jpn": "japanese"}[entry.to],
+        )
+    assert records[4]["path"] == "m/83696968'/2'/0'"
+
+
+def test_format_records():
+    records = [{"label": "a,b", "application": "hex", "secret": "00"}]
+    assert list(format_records(records, "jsonl")) == [json.dumps(records[0])]
+    header, row = format_records(records, "csv")
+    assert header == "label,application,length,index,path,secret"
+    assert row == '"a,b",hex,,,,00'
+    with pytest.raises(ValueError):
+        list(format_records(records, "xml"))